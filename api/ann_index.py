@@ -0,0 +1,310 @@
+"""
+Finans Akademi - ANN Index Types
+Flat, IVF and HNSW FAISS indexes with optional fp16/int8/PQ vector
+quantization, persisted build parameters and query-time search parameters
+"""
+
+import math
+import os
+import time
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, Optional
+
+import numpy as np
+from loguru import logger
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+QUANTIZATIONS = ("none", "fp16", "int8", "pq")
+
+# index_factory storage suffix per scalar quantization
+SCALAR_CODES = {"none": "Flat", "fp16": "SQfp16", "int8": "SQ8"}
+
+# FAISS wants roughly this many training points per IVF centroid
+IVF_MIN_POINTS_PER_CENTROID = 39
+# ... and never uses more than this many (it subsamples beyond that)
+MAX_POINTS_PER_CENTROID = 256
+
+
+@dataclass
+class IndexConfig:
+    """
+    Index type and its parameters
+
+    Build parameters (nlist, hnsw_m, ef_construction, quantization) are
+    fixed once the index is built and are persisted next to it; search
+    parameters (nprobe, ef_search) can be changed at any time.
+    """
+    index_type: str = "flat"
+    quantization: str = "none"    # vector storage: none (float32), fp16, int8, pq
+    pq_m: int = 48                # PQ: sub-quantizers (must divide the dimension)
+    pq_nbits: int = 8             # PQ: bits per sub-quantizer code
+    nlist: int = 256              # IVF: number of centroids
+    nprobe: int = 16              # IVF: centroids visited per query
+    hnsw_m: int = 32              # HNSW: graph neighbours per node
+    ef_construction: int = 200    # HNSW: candidate list size while building
+    ef_search: int = 64           # HNSW: candidate list size while searching
+    recall_report: bool = True    # measure recall@k against exact search after building
+    compact_ratio: float = 0.2    # rebuild from scratch once this share of vectors is tombstoned
+    built_with: Dict[str, Any] = field(default_factory=dict)  # effective values (e.g. clamped nlist)
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {self.index_type} (expected one of {INDEX_TYPES})")
+        if self.quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {self.quantization} (expected one of {QUANTIZATIONS})")
+        if self.index_type == "hnsw" and self.quantization == "pq":
+            # FAISS builds HNSW over PQ codes with an L2 metric whatever metric is asked for
+            raise ValueError("hnsw does not support pq quantization; use ivf with pq, or hnsw with int8")
+
+    def same_build(self, other: "IndexConfig") -> bool:
+        """Whether an index built with other can be extended under this config"""
+        fields = ("index_type", "quantization", "pq_m", "pq_nbits", "nlist", "hnsw_m", "ef_construction")
+        return all(getattr(self, name) == getattr(other, name) for name in fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndexConfig":
+        known = {name: data[name] for name in cls.__dataclass_fields__ if name in data}
+        return cls(**known)
+
+
+def index_config_from_env() -> IndexConfig:
+    """IndexConfig from FAISS_INDEX_TYPE / FAISS_IVF_* / FAISS_HNSW_* settings"""
+    return IndexConfig(
+        index_type=os.getenv("FAISS_INDEX_TYPE", "flat").lower(),
+        quantization=os.getenv("FAISS_QUANTIZATION", "none").lower(),
+        pq_m=int(os.getenv("FAISS_PQ_M", "48")),
+        pq_nbits=int(os.getenv("FAISS_PQ_NBITS", "8")),
+        nlist=int(os.getenv("FAISS_IVF_NLIST", "256")),
+        nprobe=int(os.getenv("FAISS_IVF_NPROBE", "16")),
+        hnsw_m=int(os.getenv("FAISS_HNSW_M", "32")),
+        ef_construction=int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200")),
+        ef_search=int(os.getenv("FAISS_HNSW_EF_SEARCH", "64")),
+        recall_report=os.getenv("FAISS_RECALL_REPORT", "true").lower() == "true",
+        compact_ratio=float(os.getenv("FAISS_COMPACT_RATIO", "0.2")),
+    )
+
+
+def _storage_code(config: IndexConfig, dim: int, count: int, built_with: Dict[str, Any]) -> str:
+    """index_factory suffix for the vector storage (Flat, SQfp16, SQ8 or PQ<m>x<nbits>)"""
+    if config.quantization != "pq":
+        return SCALAR_CODES[config.quantization]
+
+    # Largest sub-quantizer count <= pq_m that divides the dimension
+    m = max(d for d in range(1, min(config.pq_m, dim) + 1) if dim % d == 0)
+    # Each sub-quantizer trains 2^nbits centroids; keep enough points per centroid
+    nbits = max(1, min(config.pq_nbits, int(math.log2(max(2, count // IVF_MIN_POINTS_PER_CENTROID)))))
+    if (m, nbits) != (config.pq_m, config.pq_nbits):
+        logger.warning(f"PQ{config.pq_m}x{config.pq_nbits} adjusted to PQ{m}x{nbits} for {count} vectors of dim {dim}")
+
+    built_with.update({"pq_m": m, "pq_nbits": nbits})
+    return f"PQ{m}x{nbits}"
+
+
+def new_index(config: IndexConfig, dim: int, count: int):
+    """
+    Empty inner-product index of config.index_type for count vectors of dim
+
+    Vectors must be L2-normalized float32 (inner product = cosine). They
+    are stored as given or quantized to fp16, int8 or PQ codes. nlist and
+    PQ bits are clamped so each centroid gets enough training points. If
+    the index is not trained yet, train it on training_sample_size()
+    vectors before adding.
+    """
+    import faiss
+
+    built_with: Dict[str, Any] = {"quantization": config.quantization}
+    storage = _storage_code(config, dim, count, built_with)
+
+    if config.index_type == "flat":
+        description = storage
+
+    elif config.index_type == "ivf":
+        nlist = max(1, min(config.nlist, count // IVF_MIN_POINTS_PER_CENTROID))
+        if nlist < config.nlist:
+            logger.warning(f"IVF nlist clamped from {config.nlist} to {nlist} for {count} vectors")
+        built_with["nlist"] = nlist
+        description = f"IVF{nlist},{storage}"
+
+    else:
+        built_with.update({"hnsw_m": config.hnsw_m, "ef_construction": config.ef_construction})
+        description = f"HNSW{config.hnsw_m},{storage}"
+
+    index = faiss.index_factory(dim, description, faiss.METRIC_INNER_PRODUCT)
+    # Scores are read as similarities (higher is better) everywhere
+    if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+        raise ValueError(f"FAISS index '{description}' does not use the inner-product metric")
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efConstruction = config.ef_construction
+
+    built_with["factory"] = description
+    config.built_with = built_with
+    return index
+
+
+def training_sample_size(index, count: int) -> int:
+    """Vectors to train index on (0 when it needs no training), at most count"""
+    import faiss
+
+    if index.is_trained:
+        return 0
+    ivf = faiss.try_extract_index_ivf(index)
+    centroids = max(ivf.nlist if ivf is not None else 1, 256)
+    return min(count, centroids * MAX_POINTS_PER_CENTROID)
+
+
+def create_index(config: IndexConfig, vectors: np.ndarray):
+    """Build an index of config.index_type over vectors, training it on the vectors themselves"""
+    index = new_index(config, vectors.shape[1], len(vectors))
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def index_size(index) -> int:
+    """
+    Bytes of index's vector codes, IDs, PQ codebooks and HNSW links
+
+    Computed from the index structure (within a few hundred bytes of the
+    serialized size) instead of serializing, which would copy the index.
+    """
+    import faiss
+
+    index = faiss.downcast_index(index)
+    pq = getattr(index, "pq", None)
+    codebooks = pq.centroids.size() * 4 if pq is not None else 0
+
+    if isinstance(index, faiss.IndexHNSW):
+        hnsw = index.hnsw
+        links = hnsw.neighbors.size() * 4 + hnsw.offsets.size() * 8 + hnsw.levels.size() * 4
+        return links + index_size(index.storage)
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # Each inverted list entry stores its code and a 64-bit ID
+        return ivf.ntotal * (ivf.code_size + 8) + codebooks + index_size(ivf.quantizer)
+
+    return index.ntotal * index.code_size + codebooks
+
+
+def memory_report(index, count: int, dim: int) -> Dict[str, Any]:
+    """Size of index vs the same vectors in a float32 flat index"""
+    index_bytes = index_size(index)
+    flat_bytes = count * dim * 4
+    return {
+        "vectors": count,
+        "index_bytes": index_bytes,
+        "flat_bytes": flat_bytes,
+        "bytes_per_vector": round(index_bytes / count, 1) if count else 0.0,
+        "compression_ratio": round(flat_bytes / index_bytes, 2) if index_bytes else 0.0,
+    }
+
+
+def search_parameters(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None, sel=None):
+    """
+    Per-call FAISS search parameters for index (None when there is nothing to set)
+
+    Passed to index.search(..., params=...) instead of mutating the shared
+    index, so concurrent searches with different settings do not race.
+    sel is an optional faiss.IDSelector restricting which positions may be
+    returned; the caller must keep it alive for the duration of the search.
+    """
+    import faiss
+
+    if isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        if nprobe is not None:
+            params.nprobe = nprobe
+    elif isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        if ef_search is not None:
+            params.efSearch = ef_search
+    elif sel is not None and isinstance(index, faiss.IndexPQ):
+        params = faiss.SearchParametersPQ()
+    elif sel is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+
+    if sel is not None:
+        params.sel = sel
+    return params
+
+
+def supports_selector(index) -> bool:
+    """Whether index.search honours params.sel (plain PQ indexes do not)"""
+    import faiss
+
+    return not isinstance(index, faiss.IndexPQ)
+
+
+def exact_search(vectors: np.ndarray, queries: np.ndarray, k: int, block_size: int = 65536) -> np.ndarray:
+    """Positions of the k highest inner products per query, scanning vectors block by block"""
+    best_scores = np.full((len(queries), 0), -np.inf, dtype="float32")
+    best_ids = np.zeros((len(queries), 0), dtype="int64")
+
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start:start + block_size], dtype="float32")
+        scores = np.hstack([best_scores, queries @ block.T])
+        ids = np.hstack([best_ids, np.broadcast_to(np.arange(start, start + len(block)), (len(queries), len(block)))])
+        if scores.shape[1] > k:
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(scores, keep, axis=1)
+            ids = np.take_along_axis(ids, keep, axis=1)
+        best_scores, best_ids = scores, ids
+
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_ids, order, axis=1)
+
+
+def recall_report(
+    index,
+    vectors: np.ndarray,
+    config: IndexConfig,
+    k: int = 10,
+    sample_size: int = 200,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Recall@k and latency of index against exact (flat) search
+
+    Queries are a random sample of the indexed vectors, which mirrors
+    real traffic closely enough to compare settings. vectors may be a
+    memory-mapped array: exact search reads it in blocks.
+    """
+    if (config.index_type == "flat" and config.quantization == "none") or len(vectors) == 0:
+        return {"recall_at_k": 1.0, "k": k, "queries": 0}
+
+    k = min(k, len(vectors))
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False))
+    queries = np.ascontiguousarray(vectors[sample], dtype="float32")
+
+    start = time.perf_counter()
+    truth = exact_search(vectors, queries, k)
+    flat_ms = (time.perf_counter() - start) * 1000
+
+    params = search_parameters(index, nprobe=config.nprobe, ef_search=config.ef_search)
+    start = time.perf_counter()
+    _, found = index.search(queries, k, params=params)
+    ann_ms = (time.perf_counter() - start) * 1000
+
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    report = {
+        "k": k,
+        "queries": len(queries),
+        "recall_at_k": round(hits / (len(queries) * k), 4),
+        "flat_ms_per_query": round(flat_ms / len(queries), 4),
+        "ann_ms_per_query": round(ann_ms / len(queries), 4),
+        "nprobe": config.nprobe if config.index_type == "ivf" else None,
+        "ef_search": config.ef_search if config.index_type == "hnsw" else None,
+    }
+
+    logger.info(
+        f"{config.index_type}/{config.quantization} recall@{k} = {report['recall_at_k']:.3f} "
+        f"({report['ann_ms_per_query']:.3f} ms vs {report['flat_ms_per_query']:.3f} ms flat per query)"
+    )
+    return report
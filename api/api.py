@@ -4,14 +4,19 @@ Main API server for chatbot
 """
 
 import os
+import json
+import threading
+import time
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 
 from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, field_validator
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -19,6 +24,15 @@ from dotenv import load_dotenv
 from loguru import logger
 
 from langchain_chatbot import EnhancedFinansChatbot
+from chat_executor import ChatExecutor, QueueFullError
+from llm_client import LLMTimeoutError
+from session_store import SessionStore, create_session_store
+from index_jobs import IndexJobManager, IndexJobConflictError
+from audit_log import AuditLogWriter, create_audit_writer
+from ann_index import index_config_from_env
+from embedding_backends import embedding_settings_from_env
+from metadata_filters import FILTER_FIELDS, normalize_filters
+from metrics import REGISTRY, REQUEST_LATENCY, RESPONSES, ERRORS, CHAT_QUEUE, AUDIT_LOG
 
 # Load environment variables
 load_dotenv()
@@ -47,13 +61,20 @@ app.add_middleware(
 
 # Initialize chatbot (singleton)
 chatbot: Optional[EnhancedFinansChatbot] = None
+chatbot_lock = threading.Lock()
 
 
 def get_chatbot() -> EnhancedFinansChatbot:
-    """Get or create chatbot instance"""
+    """Get or create chatbot instance (cheap; heavy components load lazily)"""
     global chatbot
 
-    if chatbot is None:
+    if chatbot is not None:
+        return chatbot
+
+    with chatbot_lock:
+        if chatbot is not None:
+            return chatbot
+
         openai_key = os.getenv("OPENAI_API_KEY")
         if not openai_key:
             raise RuntimeError("OPENAI_API_KEY not configured")
@@ -65,13 +86,169 @@ def get_chatbot() -> EnhancedFinansChatbot:
             top_k=int(os.getenv("RAG_TOP_K", "5")),
             similarity_threshold=float(os.getenv("RAG_SIMILARITY_THRESHOLD", "0.7")),
             web_search_enabled=os.getenv("WEB_SEARCH_ENABLED", "true").lower() == "true",
+            web_search_speculative=os.getenv("WEB_SEARCH_SPECULATIVE", "true").lower() == "true",
+            web_search_cache_enabled=os.getenv("WEB_SEARCH_CACHE_ENABLED", "true").lower() == "true",
+            web_search_cache_ttl=float(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS", "600")),
+            web_search_cache_fresh_ttl=float(os.getenv("WEB_SEARCH_CACHE_FRESH_TTL_SECONDS", "60")),
+            web_search_cache_stale=float(os.getenv("WEB_SEARCH_CACHE_STALE_SECONDS", "300")),
+            web_search_cache_size=int(os.getenv("WEB_SEARCH_CACHE_SIZE", "500")),
+            web_search_cache_refresh_backoff=float(os.getenv("WEB_SEARCH_CACHE_REFRESH_BACKOFF_SECONDS", "30")),
             web_search_threshold=float(os.getenv("RAG_SIMILARITY_THRESHOLD", "0.6")),
+            answer_cache_enabled=os.getenv("CACHE_ENABLED", "true").lower() == "true",
+            answer_cache_similarity=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92")),
+            answer_cache_size=int(os.getenv("CACHE_MAX_SIZE", "1000")),
+            answer_cache_ttl=int(os.getenv("CACHE_TTL_SECONDS", "3600")),
+            index_mmap=os.getenv("FAISS_INDEX_MMAP", "false").lower() == "true",
+            index_config=index_config_from_env(),
+            query_cache_size=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "10000")),
+            query_cache_path=os.getenv("QUERY_EMBEDDING_CACHE_PATH") or None,
+            embedding_batch_size=int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32")),
+            embedding_batch_wait_ms=float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "2")),
+            **embedding_settings_from_env(),
+            glossary_enabled=os.getenv("GLOSSARY_ENABLED", "true").lower() == "true",
+            glossary_fuzzy_threshold=float(os.getenv("GLOSSARY_FUZZY_THRESHOLD", "0.85")),
+            filter_exact_max=int(os.getenv("RAG_FILTER_EXACT_MAX", "2048")),
+            auto_filters=os.getenv("RAG_AUTO_FILTERS", "false").lower() == "true",
+            build_workers=int(os.getenv("INDEX_BUILD_WORKERS", "0")),
+            encoder_processes=int(os.getenv("INDEX_BUILD_ENCODER_PROCESSES", "1")),
+            dedup_enabled=os.getenv("DEDUP_ENABLED", "true").lower() == "true",
+            dedup_threshold=float(os.getenv("DEDUP_THRESHOLD", "0.85")),
+            context_token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500")),
+            llm_base_url=os.getenv("OPENAI_BASE_URL") or None,
+            llm_timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "30")),
+            llm_max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+            llm_hedge=os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true",
+            llm_hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
         )
         logger.info("Chatbot initialized")
 
     return chatbot
 
 
+# Background warm-up state (model, index and clients load after startup)
+warm_up_state: Dict[str, Any] = {"status": "pending", "error": None}
+
+
+def warm_up_chatbot():
+    """Load heavy chatbot components in the background"""
+    warm_up_state["status"] = "running"
+    try:
+        get_chatbot().warm_up()
+        warm_up_state["status"] = "ready"
+    except Exception as e:
+        warm_up_state["status"] = "failed"
+        warm_up_state["error"] = str(e)
+        logger.error(f"Chatbot warm-up failed: {e}")
+
+
+# Chat worker pool (singleton)
+chat_executor: Optional[ChatExecutor] = None
+
+
+def get_chat_executor() -> ChatExecutor:
+    """Get or create the chat worker pool"""
+    global chat_executor
+
+    if chat_executor is None:
+        chat_executor = ChatExecutor(
+            max_workers=int(os.getenv("CHAT_MAX_WORKERS", "8")),
+            max_queue=int(os.getenv("CHAT_MAX_QUEUE", "32")),
+        )
+
+        for state, key in (("running", "running"), ("streaming", "streaming"), ("queued", "queue_depth")):
+            CHAT_QUEUE.set_function(lambda key=key: chat_executor.stats()[key], state=state)
+
+    return chat_executor
+
+
+# Session store (singleton)
+session_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    """Get or create the server-side session store"""
+    global session_store
+
+    if session_store is None:
+        session_store = create_session_store(
+            backend=os.getenv("SESSION_BACKEND", "memory"),
+            db_path=os.getenv("SESSION_DB_PATH", "./data/sessions.db"),
+            max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", "10000")),
+            ttl_seconds=int(os.getenv("SESSION_TTL_SECONDS", "3600")),
+            max_turns=int(os.getenv("SESSION_MAX_TURNS", "5")),
+            max_tokens=int(os.getenv("SESSION_MAX_TOKENS", "1000")),
+        )
+
+    return session_store
+
+
+# Audit log writer (singleton, None when disabled)
+audit_writer: Optional[AuditLogWriter] = None
+
+
+def get_audit_writer() -> Optional[AuditLogWriter]:
+    """Get or create the write-behind audit log writer"""
+    global audit_writer
+
+    if audit_writer is None and os.getenv("AUDIT_LOG_ENABLED", "true").lower() == "true":
+        dsn = (
+            f"host={os.getenv('DB_HOST', 'localhost')} port={os.getenv('DB_PORT', '5432')} "
+            f"dbname={os.getenv('DB_NAME', 'finans_chatbot')} user={os.getenv('DB_USER', '')} "
+            f"password={os.getenv('DB_PASSWORD', '')}"
+        )
+        audit_writer = create_audit_writer(
+            backend=os.getenv("AUDIT_BACKEND", "sqlite"),
+            db_path=os.getenv("AUDIT_SQLITE_PATH", "./data/chat_audit.db"),
+            dsn=dsn,
+            max_batch=int(os.getenv("AUDIT_BATCH_SIZE", "200")),
+            flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL", "2.0")),
+            max_queue=int(os.getenv("AUDIT_MAX_QUEUE", "10000")),
+        )
+
+        for state in ("backlog", "written", "dropped", "failed", "rejected"):
+            AUDIT_LOG.set_function(lambda state=state: audit_writer.stats()[state], state=state)
+
+    return audit_writer
+
+
+def audit_turn(session_id: str, message: str, result: Dict[str, Any], req: Request):
+    """Queue a chat turn for the audit log (never blocks the request)"""
+    writer = get_audit_writer()
+    if writer is not None:
+        writer.log_turn(
+            session_id,
+            message,
+            result,
+            ip_address=req.client.host if req.client else None,
+            user_agent=req.headers.get("user-agent"),
+        )
+
+
+def resolve_history(session_id: str, request: "ChatRequest") -> List[Dict[str, str]]:
+    """
+    Conversation history for a request
+
+    Server-side history wins; the client-sent history is only used to
+    seed sessions the server does not know yet (e.g. after a restart).
+    Blocking (the SQLite backend does file I/O): call it off the event loop.
+    """
+    store = get_session_store()
+
+    if request.session_id:
+        stored = store.get_history(session_id)
+        if stored:
+            return stored
+
+    return store.compact([
+        {"role": msg.role, "content": msg.content}
+        for msg in (request.history or [])
+    ])
+
+
+# Background index rebuild jobs
+index_jobs = IndexJobManager()
+
+
 # Pydantic models
 class ChatMessage(BaseModel):
     role: str = Field(..., description="Message role: user or assistant")
@@ -81,8 +258,23 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=1000, description="User message")
     session_id: Optional[str] = Field(None, description="Session ID for conversation continuity")
-    history: Optional[List[ChatMessage]] = Field(default=[], description="Conversation history")
+    history: Optional[List[ChatMessage]] = Field(
+        default=[],
+        description="Conversation history (deprecated: history is kept server-side per session_id; "
+                    "only the newest turns are used)"
+    )
     force_web_search: Optional[bool] = Field(default=False, description="Force web search")
+    filters: Optional[Dict[str, Union[str, int, List[Union[str, int]]]]] = Field(
+        None,
+        description=f"Restrict site content to chunks whose metadata matches, e.g. {{\"type\": \"market_data\"}} "
+                    f"or {{\"week\": 3}} (fields: {', '.join(FILTER_FIELDS)})"
+    )
+
+    @field_validator("filters")
+    @classmethod
+    def check_filters(cls, filters):
+        normalize_filters(filters)  # raises ValueError (-> 422) for unknown fields
+        return filters
 
 
 class ChatResponse(BaseModel):
@@ -96,6 +288,42 @@ class ChatResponse(BaseModel):
     metadata: Dict[str, Any] = Field(default={}, description="Additional metadata")
 
 
+class BatchChatRequest(BaseModel):
+    questions: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=int(os.getenv("CHAT_BATCH_MAX_QUESTIONS", "500")),
+        description="Questions to answer"
+    )
+    generate_answers: Optional[bool] = Field(default=True, description="Call the LLM (false = retrieval only)")
+    filters: Optional[Dict[str, Union[str, int, List[Union[str, int]]]]] = Field(
+        None,
+        description="Metadata filters applied to every question (see ChatRequest.filters)"
+    )
+
+    @field_validator("filters")
+    @classmethod
+    def check_filters(cls, filters):
+        normalize_filters(filters)  # raises ValueError (-> 422) for unknown fields
+        return filters
+
+
+class BatchChatResult(BaseModel):
+    question: str = Field(..., description="Original question")
+    answer: Optional[str] = Field(None, description="Chatbot response (null when generate_answers is false)")
+    source_type: str = Field(..., description="Response source type")
+    confidence: float = Field(..., description="Confidence score")
+    documents_retrieved: int = Field(..., description="Number of retrieved documents")
+    similarity_scores: List[float] = Field(default=[], description="Similarity scores of retrieved documents")
+    sources: List[Dict[str, Any]] = Field(default=[], description="Retrieved document sources")
+
+
+class BatchChatResponse(BaseModel):
+    results: List[BatchChatResult] = Field(..., description="One result per question, in order")
+    count: int = Field(..., description="Number of questions answered")
+    response_time_ms: int = Field(..., description="Total response time in milliseconds")
+
+
 class FeedbackRequest(BaseModel):
     session_id: str = Field(..., description="Session ID")
     message_id: Optional[int] = Field(None, description="Message ID from database")
@@ -105,6 +333,12 @@ class FeedbackRequest(BaseModel):
 
 class IndexRequest(BaseModel):
     pages: Optional[List[str]] = Field(None, description="List of pages to index")
+    full_rebuild: Optional[bool] = Field(default=False, description="Re-index everything instead of only changed chunks")
+
+
+class SearchParamsRequest(BaseModel):
+    nprobe: Optional[int] = Field(None, ge=1, description="IVF: centroids visited per query")
+    ef_search: Optional[int] = Field(None, ge=1, description="HNSW: candidate list size per query")
 
 
 # API Routes
@@ -120,20 +354,45 @@ async def root():
     }
 
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving (never touches the chatbot)"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe: 200 only once the model, index and clients are warm"""
+    bot = chatbot
+    ready = bot is not None and bot.ready
+
+    content = {
+        "status": "ready" if ready else "warming_up",
+        "warm_up": warm_up_state["status"],
+        "error": warm_up_state["error"],
+        "startup_timings": dict(bot.startup_timings) if bot else {},
+        "timestamp": datetime.now().isoformat()
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
     try:
         bot = get_chatbot()
         has_index = bot.index is not None
-        doc_count = len(bot.documents) if bot.documents else 0
+        doc_count = bot.document_count
 
         return {
             "status": "healthy",
             "chatbot_initialized": True,
+            "ready": bot.ready,
+            "startup_timings": bot.startup_timings,
             "faiss_index_loaded": has_index,
             "document_count": doc_count,
             "web_search_enabled": bot.web_search_enabled,
+            "chat_queue": get_chat_executor().stats(),
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -154,24 +413,25 @@ async def chat(request: ChatRequest, req: Request):
     Returns:
         Chat response with answer and metadata
     """
+    request_start = time.perf_counter()
+
     try:
         # Get or create session ID
         session_id = request.session_id or str(uuid.uuid4())
 
-        # Convert history to chatbot format
-        history = [
-            {"role": msg.role, "content": msg.content}
-            for msg in (request.history or [])
-        ]
+        # Load server-side history for this session
+        history = await run_in_threadpool(resolve_history, session_id, request)
 
         # Get chatbot
         bot = get_chatbot()
 
-        # Get response
-        result = bot.chat(
+        # Get response (blocking pipeline runs on the worker pool)
+        result = await get_chat_executor().run(
+            bot.chat,
             message=request.message,
             session_history=history,
-            force_web_search=request.force_web_search
+            force_web_search=request.force_web_search,
+            filters=request.filters
         )
 
         # Build response
@@ -185,18 +445,222 @@ async def chat(request: ChatRequest, req: Request):
             response_time_ms=result["response_time_ms"],
             metadata={
                 "documents_retrieved": result.get("documents_retrieved", 0),
-                "similarity_scores": result.get("similarity_scores", [])[:3]  # Top 3
+                "similarity_scores": result.get("similarity_scores", [])[:3],  # Top 3
+                "cache_hit": result.get("cache_hit", False)
             }
         )
 
+        await run_in_threadpool(get_session_store().append_turn, session_id, request.message, result["answer"])
+        audit_turn(session_id, request.message, result, req)
+
+        RESPONSES.inc(source_type=result["source_type"])
+        REQUEST_LATENCY.observe(time.perf_counter() - request_start, endpoint="/chat")
+
         logger.info(f"Chat response generated for session {session_id}")
         return response
 
+    except QueueFullError as e:
+        ERRORS.inc(component="chat_queue_full")
+        logger.warning(f"Chat queue full, rejecting request (retry after {e.retry_after}s)")
+        raise HTTPException(
+            status_code=503,
+            detail="Chat service is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except LLMTimeoutError as e:
+        logger.warning(f"Chat LLM deadline exceeded: {e}")
+        raise HTTPException(status_code=504, detail="The answer took too long, please retry")
     except Exception as e:
+        ERRORS.inc(component="chat")
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
 
+@app.post("/chat/stream")
+@limiter.limit(os.getenv("RATE_LIMIT_PER_MINUTE", "20/minute"))
+async def chat_stream(request: ChatRequest, req: Request):
+    """
+    Streaming chat endpoint (Server-Sent Events)
+
+    Emits a "metadata" event (similarity scores, sources, web search
+    info) before the first token, then "token" events as the LLM
+    generates, and a final "done" event.
+
+    Args:
+        request: Chat request with message and optional history
+        req: FastAPI request object (for rate limiting)
+
+    Returns:
+        text/event-stream response
+    """
+    request_start = time.perf_counter()
+    session_id = request.session_id or str(uuid.uuid4())
+
+    try:
+        history = await run_in_threadpool(resolve_history, session_id, request)
+        bot = get_chatbot()
+        executor = get_chat_executor()
+        slot = executor.admit()
+    except QueueFullError as e:
+        ERRORS.inc(component="chat_queue_full")
+        logger.warning(f"Chat queue full, rejecting stream (retry after {e.retry_after}s)")
+        raise HTTPException(
+            status_code=503,
+            detail="Chat service is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        ERRORS.inc(component="chat_stream")
+        logger.error(f"Chat stream error: {e}")
+        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+
+    async def event_source():
+        answer_parts = []
+        stream_meta: Dict[str, Any] = {}
+        try:
+            async for event in executor.stream(
+                bot.stream_chat,
+                message=request.message,
+                session_history=history,
+                force_web_search=request.force_web_search,
+                filters=request.filters
+            ):
+                data = event["data"]
+                if event["event"] == "metadata":
+                    stream_meta.update(data)
+                    data = {**data, "session_id": session_id}
+                elif event["event"] == "token":
+                    answer_parts.append(data["text"])
+                elif event["event"] == "done":
+                    answer = "".join(answer_parts)
+                    await run_in_threadpool(get_session_store().append_turn, session_id, request.message, answer)
+                    audit_turn(session_id, request.message, {**stream_meta, **data, "answer": answer}, req)
+                    RESPONSES.inc(source_type=data["source_type"])
+                    REQUEST_LATENCY.observe(time.perf_counter() - request_start, endpoint="/chat/stream")
+                yield _format_sse(event["event"], data)
+        except LLMTimeoutError as e:
+            logger.warning(f"Chat stream LLM deadline exceeded: {e}")
+            yield _format_sse("error", {"detail": "The answer took too long, please retry"})
+        except Exception as e:
+            ERRORS.inc(component="chat_stream")
+            logger.error(f"Chat stream error: {e}")
+            yield _format_sse("error", {"detail": "Chat failed"})
+        finally:
+            slot.release()
+
+        logger.info(f"Chat stream finished for session {session_id}")
+
+    # The slot is also released after the response if the body never ran
+    # (client gone before it started); release() is idempotent
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(slot.release)
+    )
+
+
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/batch", response_model=BatchChatResponse)
+@limiter.limit(os.getenv("CHAT_BATCH_RATE_LIMIT", "10/minute"))
+async def chat_batch(request: BatchChatRequest, req: Request):
+    """
+    Batch chat endpoint for evaluation and FAQ pre-generation jobs
+
+    All questions are embedded and searched in one vectorized pass;
+    answers come from site content only (no web search).
+
+    Args:
+        request: Questions and whether to generate answers
+        req: FastAPI request object (for rate limiting)
+
+    Returns:
+        Per-question results in request order
+    """
+    try:
+        start_time = datetime.now()
+        bot = get_chatbot()
+
+        results = await get_chat_executor().run(
+            bot.get_answers_batch,
+            request.questions,
+            generate=request.generate_answers,
+            max_concurrency=int(os.getenv("CHAT_BATCH_LLM_CONCURRENCY", "8")),
+            filters=request.filters
+        )
+
+        response = BatchChatResponse(
+            results=[
+                BatchChatResult(
+                    question=result["question"],
+                    answer=result["answer"],
+                    source_type=result["source_type"],
+                    confidence=result["confidence"],
+                    documents_retrieved=result["documents_retrieved"],
+                    similarity_scores=result["similarity_scores"],
+                    sources=bot.format_sources(result["metadata"])
+                )
+                for result in results
+            ],
+            count=len(results),
+            response_time_ms=int((datetime.now() - start_time).total_seconds() * 1000)
+        )
+
+        for result in results:
+            RESPONSES.inc(source_type=result["source_type"])
+        REQUEST_LATENCY.observe(response.response_time_ms / 1000, endpoint="/chat/batch")
+
+        logger.info(f"Batch chat answered {response.count} questions in {response.response_time_ms}ms")
+        return response
+
+    except QueueFullError as e:
+        ERRORS.inc(component="chat_queue_full")
+        logger.warning(f"Chat queue full, rejecting batch (retry after {e.retry_after}s)")
+        raise HTTPException(
+            status_code=503,
+            detail="Chat service is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except LLMTimeoutError as e:
+        logger.warning(f"Batch chat LLM deadline exceeded: {e}")
+        raise HTTPException(status_code=504, detail="The answers took too long, please retry")
+    except Exception as e:
+        ERRORS.inc(component="chat_batch")
+        logger.error(f"Batch chat error: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch chat failed: {str(e)}")
+
+
+@app.get("/chat/queue")
+async def chat_queue_stats():
+    """Get chat worker pool queue depth and wait times, plus embedding micro-batching"""
+    batcher = get_chatbot().embedding_batcher
+    return {
+        **get_chat_executor().stats(),
+        "embedding_batcher": batcher.stats() if batcher is not None else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/sessions/stats")
+async def sessions_stats():
+    """Get session store size, evictions and memory usage"""
+    return {
+        **await run_in_threadpool(get_session_store().stats),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Forget the server-side history of a session"""
+    await run_in_threadpool(get_session_store().delete, session_id)
+    return {"status": "success", "session_id": session_id}
+
+
 @app.post("/feedback")
 @limiter.limit("10/minute")
 async def submit_feedback(request: FeedbackRequest, req: Request):
@@ -211,7 +675,15 @@ async def submit_feedback(request: FeedbackRequest, req: Request):
         Success confirmation
     """
     try:
-        # TODO: Store feedback in database via PHP API
+        writer = get_audit_writer()
+        if writer is not None:
+            writer.log_feedback(
+                request.session_id,
+                request.rating,
+                feedback_text=request.feedback_text,
+                message_id=request.message_id,
+            )
+
         logger.info(f"Feedback received for session {request.session_id}: {request.rating}/5")
 
         return {
@@ -225,43 +697,84 @@ async def submit_feedback(request: FeedbackRequest, req: Request):
         raise HTTPException(status_code=500, detail=f"Feedback failed: {str(e)}")
 
 
-@app.post("/index/rebuild")
+@app.post("/index/rebuild", status_code=202)
 async def rebuild_index(request: IndexRequest):
     """
-    Rebuild FAISS index from site content
+    Start a background rebuild of the FAISS index from site content
+
+    The new index is built next to the live one and swapped in
+    atomically; poll /index/jobs/{job_id} for progress.
 
     Args:
         request: Optional list of pages to index
 
     Returns:
-        Indexing result
+        Job id and status URL
     """
     try:
-        from data_loader import SiteContentLoader
+        bot = get_chatbot()
 
-        # Load site content
-        loader = SiteContentLoader()
-        documents = loader.load_html_files(request.pages)
+        def run_rebuild(progress):
+            from data_loader import SiteContentLoader
 
-        if not documents:
-            raise HTTPException(status_code=400, detail="No documents found to index")
+            # Load site content
+            progress("loading", 0.0)
+            loader = SiteContentLoader()
+            documents = loader.load_html_files(request.pages)
 
-        # Get chatbot and rebuild index
-        bot = get_chatbot()
-        bot.build_index(documents)
+            if not documents:
+                raise ValueError("No documents found to index")
+
+            snapshot = bot.build_index(documents, progress=progress, incremental=not request.full_rebuild)
+
+            return {
+                "document_count": len(documents),
+                "chunk_count": snapshot.live_count,
+                "index_generation": snapshot.generation,
+                "index_type": snapshot.config.index_type,
+                "recall": snapshot.recall,
+                "build": snapshot.build_stats
+            }
+
+        job = index_jobs.submit(run_rebuild, params={"pages": request.pages, "full_rebuild": request.full_rebuild})
 
         return {
-            "status": "success",
-            "message": "Index rebuilt successfully",
-            "document_count": len(documents),
+            "status": "accepted",
+            "message": "Index rebuild started",
+            "job_id": job.job_id,
+            "status_url": f"/index/jobs/{job.job_id}",
             "timestamp": datetime.now().isoformat()
         }
 
+    except IndexJobConflictError as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "An index rebuild is already running", "job_id": e.job.job_id}
+        )
     except Exception as e:
         logger.error(f"Index rebuild error: {e}")
         raise HTTPException(status_code=500, detail=f"Index rebuild failed: {str(e)}")
 
 
+@app.get("/index/jobs")
+async def list_index_jobs():
+    """List recent index rebuild jobs (newest first)"""
+    return {
+        "jobs": [job.to_dict() for job in index_jobs.list()],
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/index/jobs/{job_id}")
+async def get_index_job(job_id: str):
+    """Get status and progress of an index rebuild job"""
+    job = index_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Index job not found")
+
+    return job.to_dict()
+
+
 @app.get("/index/stats")
 async def index_stats():
     """Get FAISS index statistics"""
@@ -270,9 +783,11 @@ async def index_stats():
 
         return {
             "index_exists": bot.index is not None,
-            "document_count": len(bot.documents) if bot.documents else 0,
+            "document_count": bot.document_count,
             "embedding_dimension": bot.embedding_dim,
             "index_path": str(bot.faiss_index_path),
+            "index_generation": bot.index_generation,
+            "snapshots": bot.snapshot_stats(),
             "timestamp": datetime.now().isoformat()
         }
 
@@ -281,11 +796,67 @@ async def index_stats():
         raise HTTPException(status_code=500, detail=f"Stats failed: {str(e)}")
 
 
+@app.put("/index/search-params")
+async def update_search_params(request: SearchParamsRequest):
+    """Tune query-time nprobe (IVF) / ef_search (HNSW) of the live index"""
+    bot = get_chatbot()
+    bot.set_search_params(nprobe=request.nprobe, ef_search=request.ef_search)
+    return {"status": "success", "search_params": bot.search_params()}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Get semantic answer cache hit/miss statistics"""
+    try:
+        bot = get_chatbot()
+        query_cache = bot.query_cache.stats() if bot.query_cache is not None else None
+        web_search_cache = bot.web_search_cache.stats() if bot.web_search_cache is not None else None
+        glossary = {"enabled": bot.glossary_enabled, **bot.glossary_stats.stats()}
+
+        if bot.answer_cache is None:
+            return {
+                "enabled": False,
+                "query_embedding_cache": query_cache,
+                "web_search_cache": web_search_cache,
+                "glossary": glossary,
+                "timestamp": datetime.now().isoformat()
+            }
+
+        return {
+            "enabled": True,
+            **bot.answer_cache.stats(),
+            "query_embedding_cache": query_cache,
+            "web_search_cache": web_search_cache,
+            "glossary": glossary,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        logger.error(f"Cache stats error: {e}")
+        raise HTTPException(status_code=500, detail=f"Cache stats failed: {str(e)}")
+
+
+@app.get("/audit/stats")
+async def audit_stats():
+    """Audit log write-behind queue statistics"""
+    writer = get_audit_writer()
+    if writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **writer.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text-format metrics (stage latency histograms, counters, queue gauges)"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 # Error handlers
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler"""
+    ERRORS.inc(component="unhandled")
     logger.error(f"Unhandled exception: {exc}")
     return JSONResponse(
         status_code=500,
@@ -303,12 +874,13 @@ async def startup_event():
     """Initialize services on startup"""
     logger.info("Starting Finans Akademi Chatbot API")
 
-    # Pre-load chatbot
-    try:
-        get_chatbot()
-        logger.info("Chatbot pre-loaded successfully")
-    except Exception as e:
-        logger.warning(f"Could not pre-load chatbot: {e}")
+    get_chat_executor()
+    get_session_store()
+    get_audit_writer()
+
+    # Warm up the chatbot in the background so the server starts
+    # accepting connections (and liveness probes) immediately
+    threading.Thread(target=warm_up_chatbot, name="chatbot-warm-up", daemon=True).start()
 
 
 @app.on_event("shutdown")
@@ -316,6 +888,16 @@ async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down Finans Akademi Chatbot API")
 
+    if chat_executor is not None:
+        chat_executor.shutdown()
+
+    if audit_writer is not None:
+        audit_writer.stop()
+
+    if chatbot is not None:
+        chatbot.save_query_cache()
+        chatbot.close()
+
 
 # Run server
 if __name__ == "__main__":
@@ -0,0 +1,453 @@
+"""
+Finans Akademi - Chat Audit Log
+Write-behind, batched persistence of chat messages and feedback
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from loguru import logger
+
+# Values allowed by the chat_messages.source_type CHECK constraint
+AUDIT_SOURCE_TYPES = {"site_content", "web_search", "hybrid", "fallback"}
+# Finer-grained chatbot source types recorded under an allowed value
+AUDIT_SOURCE_ALIASES = {"glossary": "site_content"}
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id TEXT,
+    ip_address TEXT,
+    user_agent TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    last_activity TEXT DEFAULT CURRENT_TIMESTAMP,
+    message_count INTEGER DEFAULT 0,
+    is_active INTEGER DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES chat_sessions(session_id) ON DELETE CASCADE,
+    message_type TEXT NOT NULL CHECK (message_type IN ('user', 'assistant', 'system')),
+    message_text TEXT NOT NULL,
+    source_type TEXT CHECK (source_type IN ('site_content', 'web_search', 'hybrid', 'fallback')),
+    confidence_score REAL,
+    response_time_ms INTEGER,
+    documents_retrieved INTEGER,
+    similarity_scores TEXT,
+    web_search_performed INTEGER DEFAULT 0,
+    web_sources TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS chat_feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id INTEGER NOT NULL REFERENCES chat_messages(id) ON DELETE CASCADE,
+    session_id TEXT NOT NULL REFERENCES chat_sessions(session_id) ON DELETE CASCADE,
+    rating INTEGER CHECK (rating BETWEEN 1 AND 5),
+    feedback_text TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages(session_id);
+CREATE INDEX IF NOT EXISTS idx_chat_feedback_message_id ON chat_feedback(message_id);
+"""
+
+
+class AuditBackend(ABC):
+    """Bulk writer for a batch of session, message and feedback rows"""
+
+    @abstractmethod
+    def write_batch(self, sessions: List[Dict], messages: List[Dict], feedback: List[Dict]) -> int:
+        """
+        Write one batch in a transaction and return the number of feedback
+        rows rejected
+
+        Feedback carries client-supplied session and message ids, so each
+        row is inserted under its own savepoint: a row naming an unknown
+        message or session (or, without a message id, a session with no
+        answer yet) is skipped instead of failing the batch.
+        """
+
+    def close(self):
+        pass
+
+
+class SQLiteAuditBackend(AuditBackend):
+    """Local SQLite file mirroring database/create_chat_audit_logs.sql"""
+
+    def __init__(self, db_path: str = "./data/chat_audit.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Only the writer thread uses the connection; the timeout covers
+        # lock waits when several API workers share the file
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SQLITE_SCHEMA)
+
+    def write_batch(self, sessions: List[Dict], messages: List[Dict], feedback: List[Dict]) -> int:
+        with self._conn:
+            self._conn.executemany(
+                """INSERT INTO chat_sessions (session_id, user_id, ip_address, user_agent)
+                   VALUES (:session_id, :user_id, :ip_address, :user_agent)
+                   ON CONFLICT(session_id) DO UPDATE SET last_activity = CURRENT_TIMESTAMP""",
+                sessions
+            )
+            self._conn.executemany(
+                """INSERT INTO chat_messages (
+                       session_id, message_type, message_text, source_type, confidence_score,
+                       response_time_ms, documents_retrieved, similarity_scores,
+                       web_search_performed, web_sources, created_at
+                   ) VALUES (
+                       :session_id, :message_type, :message_text, :source_type, :confidence_score,
+                       :response_time_ms, :documents_retrieved, :similarity_scores,
+                       :web_search_performed, :web_sources, :created_at
+                   )""",
+                messages
+            )
+            # Postgres does this with a trigger
+            self._conn.executemany(
+                """UPDATE chat_sessions
+                   SET message_count = message_count + 1, last_activity = CURRENT_TIMESTAMP
+                   WHERE session_id = :session_id""",
+                messages
+            )
+            return self._insert_feedback(feedback)
+
+    def _insert_feedback(self, feedback: List[Dict]) -> int:
+        rejected = 0
+        for row in feedback:
+            self._conn.execute("SAVEPOINT feedback_row")
+            try:
+                if row["message_id"] is not None:
+                    cursor = self._conn.execute(
+                        """INSERT INTO chat_feedback (message_id, session_id, rating, feedback_text, created_at)
+                           VALUES (:message_id, :session_id, :rating, :feedback_text, :created_at)""",
+                        row
+                    )
+                else:
+                    # Without a message id, rate the latest answer of the session
+                    cursor = self._conn.execute(
+                        """INSERT INTO chat_feedback (message_id, session_id, rating, feedback_text, created_at)
+                           SELECT id, :session_id, :rating, :feedback_text, :created_at
+                           FROM chat_messages
+                           WHERE session_id = :session_id AND message_type = 'assistant'
+                           ORDER BY id DESC LIMIT 1""",
+                        row
+                    )
+                if cursor.rowcount == 0:
+                    rejected += 1
+            except sqlite3.IntegrityError as e:
+                self._conn.execute("ROLLBACK TO SAVEPOINT feedback_row")
+                rejected += 1
+                logger.warning(f"Audit feedback skipped for session '{row['session_id']}': {e}")
+            self._conn.execute("RELEASE SAVEPOINT feedback_row")
+        return rejected
+
+    def close(self):
+        self._conn.close()
+
+
+class PostgresAuditBackend(AuditBackend):
+    """Production backend for the schema in database/create_chat_audit_logs.sql"""
+
+    def __init__(self, dsn: str):
+        import psycopg2
+
+        self._psycopg2 = psycopg2
+        self.dsn = dsn
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = self._psycopg2.connect(self.dsn)
+        return self._conn
+
+    def write_batch(self, sessions: List[Dict], messages: List[Dict], feedback: List[Dict]) -> int:
+        from psycopg2.extras import execute_values
+
+        conn = self._connection()
+        try:
+            with conn, conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    """INSERT INTO chat_sessions (session_id, user_id, ip_address, user_agent)
+                       VALUES %s
+                       ON CONFLICT (session_id) DO UPDATE SET last_activity = CURRENT_TIMESTAMP""",
+                    [(s["session_id"], s["user_id"], s["ip_address"], s["user_agent"]) for s in sessions]
+                )
+                # message_count / last_activity are maintained by the schema's trigger
+                execute_values(
+                    cur,
+                    """INSERT INTO chat_messages (
+                           session_id, message_type, message_text, source_type, confidence_score,
+                           response_time_ms, documents_retrieved, similarity_scores,
+                           web_search_performed, web_sources, created_at
+                       ) VALUES %s""",
+                    [
+                        (
+                            m["session_id"], m["message_type"], m["message_text"], m["source_type"],
+                            m["confidence_score"], m["response_time_ms"], m["documents_retrieved"],
+                            m["similarity_scores"], bool(m["web_search_performed"]), m["web_sources"],
+                            m["created_at"]
+                        )
+                        for m in messages
+                    ]
+                )
+                rejected = 0
+                for row in feedback:
+                    cur.execute("SAVEPOINT feedback_row")
+                    try:
+                        if row["message_id"] is not None:
+                            cur.execute(
+                                """INSERT INTO chat_feedback (message_id, session_id, rating, feedback_text, created_at)
+                                   VALUES (%(message_id)s, %(session_id)s, %(rating)s, %(feedback_text)s, %(created_at)s)""",
+                                row
+                            )
+                        else:
+                            cur.execute(
+                                """INSERT INTO chat_feedback (message_id, session_id, rating, feedback_text, created_at)
+                                   SELECT id, %(session_id)s, %(rating)s, %(feedback_text)s, %(created_at)s
+                                   FROM chat_messages
+                                   WHERE session_id = %(session_id)s AND message_type = 'assistant'
+                                   ORDER BY id DESC LIMIT 1""",
+                                row
+                            )
+                        if cur.rowcount == 0:
+                            rejected += 1
+                    except (self._psycopg2.IntegrityError, self._psycopg2.DataError) as e:
+                        cur.execute("ROLLBACK TO SAVEPOINT feedback_row")
+                        rejected += 1
+                        logger.warning(f"Audit feedback skipped for session '{row['session_id']}': {e}")
+                    cur.execute("RELEASE SAVEPOINT feedback_row")
+            return rejected
+        except Exception:
+            # Drop a broken connection so the next batch reconnects
+            conn.close()
+            raise
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+
+class AuditLogWriter:
+    """
+    Write-behind queue for audit rows
+
+    log_* calls only enqueue (never block, never raise); a background
+    thread drains the queue and writes rows in bulk whenever max_batch
+    rows are waiting or flush_interval seconds have passed. When the
+    queue is full, new rows are dropped and counted; feedback rows the
+    database rejects are skipped and counted without failing the batch.
+    """
+
+    def __init__(
+        self,
+        backend: AuditBackend,
+        max_batch: int = 200,
+        flush_interval: float = 2.0,
+        max_queue: int = 10000
+    ):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._lock = threading.Lock()
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._rejected = 0
+        self._batches = 0
+        self._last_flush_ms = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Audit log writer started (batch={self.max_batch}, interval={self.flush_interval}s)")
+
+    def stop(self, timeout: float = 10.0):
+        """Flush what is queued and stop the writer thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.backend.close()
+        logger.info(f"Audit log writer stopped ({self._queue.qsize()} rows left unwritten)")
+
+    def _enqueue(self, kind: str, row: Dict[str, Any]):
+        try:
+            self._queue.put_nowait((kind, row))
+            with self._lock:
+                self._enqueued += 1
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+
+    def log_turn(
+        self,
+        session_id: str,
+        user_message: str,
+        result: Dict[str, Any],
+        user_id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ):
+        """Queue a session upsert plus the user and assistant messages of one turn"""
+        now = datetime.now().isoformat()
+        source_type = AUDIT_SOURCE_ALIASES.get(result.get("source_type"), result.get("source_type"))
+        if source_type not in AUDIT_SOURCE_TYPES:
+            source_type = "fallback"
+
+        self._enqueue("session", {
+            "session_id": session_id,
+            "user_id": user_id,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+        })
+        self._enqueue("message", self._message_row(session_id, "user", user_message, now))
+        self._enqueue("message", self._message_row(
+            session_id,
+            "assistant",
+            result.get("answer", ""),
+            now,
+            source_type=source_type,
+            confidence_score=result.get("confidence"),
+            response_time_ms=result.get("response_time_ms"),
+            documents_retrieved=result.get("documents_retrieved"),
+            similarity_scores=json.dumps(result.get("similarity_scores", [])),
+            web_search_performed=int(bool(result.get("web_search_performed", False))),
+            web_sources=json.dumps(result.get("web_sources", []), ensure_ascii=False),
+        ))
+
+    def _message_row(self, session_id: str, message_type: str, text: str, created_at: str, **meta) -> Dict[str, Any]:
+        row = {
+            "session_id": session_id,
+            "message_type": message_type,
+            "message_text": text,
+            "source_type": None,
+            "confidence_score": None,
+            "response_time_ms": None,
+            "documents_retrieved": None,
+            "similarity_scores": None,
+            "web_search_performed": 0,
+            "web_sources": None,
+            "created_at": created_at,
+        }
+        row.update(meta)
+        return row
+
+    def log_feedback(
+        self,
+        session_id: str,
+        rating: int,
+        feedback_text: Optional[str] = None,
+        message_id: Optional[int] = None
+    ):
+        """Queue a feedback row (without message_id it rates the session's latest answer)"""
+        self._enqueue("feedback", {
+            "session_id": session_id,
+            "message_id": message_id,
+            "rating": rating,
+            "feedback_text": feedback_text,
+            "created_at": datetime.now().isoformat(),
+        })
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def _collect(self) -> List[tuple]:
+        """Wait for rows until max_batch is reached or flush_interval expires"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+            if self._stop.is_set():
+                # Shutting down: drain without waiting
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                break
+
+        return batch
+
+    def _flush(self, batch: List[tuple]):
+        # Deduplicate session upserts within the batch
+        sessions = list({row["session_id"]: row for kind, row in batch if kind == "session"}.values())
+        messages = [row for kind, row in batch if kind == "message"]
+        feedback = [row for kind, row in batch if kind == "feedback"]
+
+        start = time.perf_counter()
+        try:
+            rejected = self.backend.write_batch(sessions, messages, feedback)
+            with self._lock:
+                self._written += len(messages) + len(feedback) - rejected
+                self._rejected += rejected
+                self._batches += 1
+                self._last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+        except Exception as e:
+            with self._lock:
+                self._failed += len(messages) + len(feedback)
+            logger.error(f"Audit log flush failed ({len(batch)} rows): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue backlog and write/drop counters"""
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "backlog": self._queue.qsize(),
+                "enqueued": self._enqueued,
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "batches": self._batches,
+                "last_flush_ms": self._last_flush_ms,
+            }
+
+
+def create_audit_writer(
+    backend: str = "sqlite",
+    db_path: str = "./data/chat_audit.db",
+    dsn: Optional[str] = None,
+    max_batch: int = 200,
+    flush_interval: float = 2.0,
+    max_queue: int = 10000
+) -> AuditLogWriter:
+    """Build and start an AuditLogWriter with the named backend ("sqlite" or "postgres")"""
+    if backend == "sqlite":
+        audit_backend = SQLiteAuditBackend(db_path)
+    elif backend == "postgres":
+        audit_backend = PostgresAuditBackend(dsn)
+    else:
+        raise ValueError(f"Unknown audit backend: {backend}")
+
+    writer = AuditLogWriter(audit_backend, max_batch=max_batch, flush_interval=flush_interval, max_queue=max_queue)
+    writer.start()
+    return writer
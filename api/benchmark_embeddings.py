@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Finans Akademi - Embedding Backend Benchmark
+Load time, single-query latency and batch throughput of the Sentence
+Transformers and ONNX Runtime backends on the current machine
+
+Usage:
+    python3 api/benchmark_embeddings.py --onnx-path ./data/onnx/minilm
+    python3 api/benchmark_embeddings.py --onnx-path ./data/onnx/minilm --queries 500 --json report.json
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from loguru import logger
+
+from embedding_backends import (
+    DEFAULT_MODEL,
+    VERIFY_SENTENCES,
+    EmbeddingBackend,
+    OnnxEmbeddingBackend,
+    SentenceTransformerBackend,
+    verify_backend,
+)
+
+
+def benchmark_backend(
+    load: Callable[[], EmbeddingBackend],
+    queries: List[str],
+    batch_texts: List[str],
+    batch_size: int,
+    warmup: int = 5
+) -> Dict[str, Any]:
+    """
+    Measure one backend
+
+    Returns:
+        load_seconds, per-query latency percentiles (ms) and batch
+        throughput (texts per second)
+    """
+    start = time.perf_counter()
+    backend = load()
+    load_seconds = time.perf_counter() - start
+
+    for query in queries[:warmup]:
+        backend.encode([query])
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        backend.encode([query])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for offset in range(0, len(batch_texts), batch_size):
+        backend.encode(batch_texts[offset:offset + batch_size])
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "backend": backend.name,
+        "load_seconds": round(load_seconds, 3),
+        "query_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+        "query_ms_p95": round(float(np.percentile(latencies, 95)), 3),
+        "query_ms_mean": round(float(np.mean(latencies)), 3),
+        "batch_size": batch_size,
+        "batch_texts_per_second": round(len(batch_texts) / batch_seconds, 1),
+        "_backend": backend,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Sentence Transformers model name")
+    parser.add_argument("--onnx-path", required=True, help="Directory written by embedding_backends.py export")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0 = default)")
+    parser.add_argument("--queries", type=int, default=200, help="Single-query encodes to time")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--batch-texts", type=int, default=1024, help="Texts encoded in the throughput test")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    # Vary the sample texts so the numbers reflect mixed query and chunk lengths
+    queries = [VERIFY_SENTENCES[i % len(VERIFY_SENTENCES)] + f" ({i})" for i in range(args.queries)]
+    batch_texts = [
+        " ".join(VERIFY_SENTENCES[(i + j) % len(VERIFY_SENTENCES)] for j in range(1 + i % 8))
+        for i in range(args.batch_texts)
+    ]
+
+    results = [
+        benchmark_backend(lambda: SentenceTransformerBackend(args.model), queries, batch_texts, args.batch_size),
+        benchmark_backend(
+            lambda: OnnxEmbeddingBackend(args.onnx_path, num_threads=args.threads),
+            queries, batch_texts, args.batch_size
+        ),
+    ]
+
+    reference, candidate = (result.pop("_backend") for result in results)
+    report = {
+        "model": args.model,
+        "onnx_path": args.onnx_path,
+        "results": results,
+        "accuracy": verify_backend(reference, candidate),
+        "speedup": {
+            "query_p50": round(results[0]["query_ms_p50"] / results[1]["query_ms_p50"], 2),
+            "batch_throughput": round(results[1]["batch_texts_per_second"] / results[0]["batch_texts_per_second"], 2),
+        },
+    }
+
+    print(f"{'backend':<24}{'load s':>10}{'p50 ms':>10}{'p95 ms':>10}{'texts/s':>12}")
+    for result in results:
+        print(
+            f"{result['backend']:<24}{result['load_seconds']:>10}{result['query_ms_p50']:>10}"
+            f"{result['query_ms_p95']:>10}{result['batch_texts_per_second']:>12}"
+        )
+    print(json.dumps({"speedup": report["speedup"], "accuracy": report["accuracy"]}, indent=2))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
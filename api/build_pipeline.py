@@ -0,0 +1,198 @@
+"""
+Finans Akademi - Index Build Pipeline
+Parallel chunking, disk-backed embedding buffers, producer/consumer
+overlap of encoding and indexing, and peak memory sampling for builds
+"""
+
+import hashlib
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+CHUNK_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+# Below this many documents a process pool costs more than it saves
+PARALLEL_CHUNKING_MIN_DOCUMENTS = 64
+
+_splitter = None
+
+
+def document_id(doc: Dict[str, Any]) -> str:
+    """Stable id of a source document, shared by all its chunks"""
+    payload = str(doc["metadata"].get("source", "")) + "\x00" + doc["content"]
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def split_document(doc: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """(chunk, metadata) pairs of one document (runs in chunking worker processes)"""
+    global _splitter
+    if _splitter is None:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        _splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            separators=CHUNK_SEPARATORS
+        )
+
+    chunks = _splitter.split_text(doc["content"])
+    doc_id = document_id(doc)
+    return [
+        (chunk, {**doc["metadata"], "doc_id": doc_id, "chunk_id": i, "total_chunks": len(chunks)})
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def chunk_documents(
+    documents: List[Dict[str, Any]],
+    workers: int = 1,
+    progress: Optional[Callable[[str, float], None]] = None
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Split documents into chunks, in a pool of worker processes when workers > 1
+
+    Chunks come back in document order. Workers are spawned (not forked)
+    because builds run inside the API process next to torch threads.
+    """
+    pool = None
+    if workers > 1 and len(documents) >= PARALLEL_CHUNKING_MIN_DOCUMENTS:
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        results = pool.map(split_document, documents, chunksize=max(1, len(documents) // (workers * 8)))
+    else:
+        results = map(split_document, documents)
+
+    all_chunks = []
+    all_metadata = []
+    try:
+        for doc_number, pairs in enumerate(results):
+            for chunk, metadata in pairs:
+                all_chunks.append(chunk)
+                all_metadata.append(metadata)
+            if progress:
+                progress("chunking", (doc_number + 1) / len(documents))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return all_chunks, all_metadata
+
+
+def disk_buffer(directory: Path, rows: int, dim: int) -> np.ndarray:
+    """
+    Memory-mapped float32 (rows, dim) scratch matrix in directory
+
+    The file is unlinked right away where the OS allows it, so the pages
+    live only as long as the array and never pile up in memory.
+    """
+    if rows == 0:
+        return np.zeros((0, dim), dtype="float32")
+
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="build_vectors.", suffix=".npy", dir=directory)
+    os.close(fd)
+    matrix = np.lib.format.open_memmap(path, mode="w+", dtype="float32", shape=(rows, dim))
+    try:
+        os.unlink(path)
+    except OSError:
+        # Windows keeps mapped files; remove it once the array is gone
+        weakref.finalize(matrix, lambda: Path(path).unlink(missing_ok=True))
+    return matrix
+
+
+_DONE = object()
+
+
+def run_pipelined(items: Iterable[Any], consume: Callable[[Any], None], depth: int = 2):
+    """
+    Call consume(item) on a background thread while items are produced
+
+    At most depth items wait between the two stages, which bounds memory;
+    an exception in either stage stops both and is raised here.
+    """
+    pending: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    errors: List[BaseException] = []
+
+    def worker():
+        while True:
+            item = pending.get()
+            if item is _DONE:
+                return
+            if errors:
+                continue
+            try:
+                consume(item)
+            except BaseException as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=worker, name="index-build-consumer", daemon=True)
+    thread.start()
+    try:
+        for item in items:
+            if errors:
+                break
+            pending.put(item)
+    finally:
+        pending.put(_DONE)
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (peak so far where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def children_peak_rss() -> int:
+    """Largest peak RSS of any waited-for child process (chunking / encoder workers), in bytes"""
+    try:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+class PeakRSSMonitor:
+    """Samples this process's resident set size on a background thread while active"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        self.peak_bytes = max(self.peak_bytes, current_rss())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "PeakRSSMonitor":
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="rss-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
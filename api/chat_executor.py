@@ -0,0 +1,209 @@
+"""
+Finans Akademi - Chat Worker Pool
+Runs the blocking chat pipeline off the event loop with bounded admission
+"""
+
+import asyncio
+import math
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional
+
+from loguru import logger
+
+from metrics import STAGE_LATENCY
+
+
+class QueueFullError(Exception):
+    """Raised when the chat admission queue has no free slot"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Chat queue is full")
+        self.retry_after = retry_after
+
+
+class AdmissionSlot:
+    """
+    One admitted job's place in the queue
+
+    release() is idempotent, and a slot that is dropped without being
+    released (e.g. a response object that was never sent) is released
+    when it is garbage collected.
+    """
+
+    def __init__(self, executor: "ChatExecutor"):
+        self._finalizer = weakref.finalize(self, executor._release)
+
+    def release(self):
+        self._finalizer()
+
+
+class ChatExecutor:
+    """
+    Bounded worker pool for the synchronous chat pipeline
+
+    Embedding, FAISS search, the OpenAI HTTP call and DuckDuckGo all
+    release the GIL while they wait, so a thread pool lets one process
+    keep many conversations in flight. Admission is capped at
+    max_workers + max_queue jobs; anything beyond that is rejected
+    immediately instead of piling up behind slow LLM calls.
+    """
+
+    def __init__(self, max_workers: int = 8, max_queue: int = 32):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat-worker")
+
+        self._lock = threading.Lock()
+        self._admitted = 0  # queued + running
+        self._running = 0
+        self._streaming = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._service_avg = 1.0  # seconds, exponential moving average
+
+        logger.info(f"Chat executor started (workers={max_workers}, queue={max_queue})")
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of admitted (queued + running) jobs"""
+        return self.max_workers + self.max_queue
+
+    def admit(self) -> AdmissionSlot:
+        """Reserve a slot or raise QueueFullError"""
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self._rejected += 1
+                raise QueueFullError(self._retry_after())
+            self._admitted += 1
+        return AdmissionSlot(self)
+
+    def _release(self):
+        with self._lock:
+            self._admitted -= 1
+
+    def _retry_after(self) -> int:
+        """Estimate seconds until a slot frees up (lock must be held)"""
+        waves = max(self._admitted - self.max_workers, 0) / self.max_workers + 1
+        return max(1, math.ceil(waves * self._service_avg))
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on the pool and await its result
+
+        Raises:
+            QueueFullError: if the pool and its queue are saturated
+        """
+        slot = self.admit()
+        enqueued_at = time.perf_counter()
+
+        try:
+            future = self._pool.submit(self._execute, enqueued_at, fn, args, kwargs)
+        except Exception:
+            slot.release()
+            raise
+
+        # Release on completion *or* cancellation of a job that never started,
+        # so a disconnected client cannot leak a slot
+        future.add_done_callback(lambda _: slot.release())
+        return await asyncio.wrap_future(future)
+
+    async def stream(self, fn: Callable[..., Iterable[Any]], *args, **kwargs) -> AsyncIterator[Any]:
+        """
+        Drive the blocking iterator returned by fn(*args, **kwargs) on its own thread
+
+        Streams do not run on the job pool: a token read would otherwise
+        wait behind whole non-streaming answers. Their number is still
+        bounded, because the caller must reserve a slot with admit() before
+        the response starts (so a full queue still maps to a 503) and
+        releases it when the response ends. If the client goes away the
+        iterator is closed after its next item.
+        """
+        loop = asyncio.get_running_loop()
+        items: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def put(item: Any, error: Optional[BaseException] = None):
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, (item, error))
+            except RuntimeError:
+                pass  # the event loop is gone
+
+        def produce():
+            iterator = None
+            try:
+                iterator = iter(fn(*args, **kwargs))
+                for item in iterator:
+                    if stop.is_set():
+                        break
+                    put(item)
+                put(done)
+            except Exception as e:
+                put(None, e)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+
+        with self._lock:
+            self._streaming += 1
+
+        try:
+            threading.Thread(target=produce, name="chat-stream", daemon=True).start()
+            while True:
+                item, error = await items.get()
+                if error is not None:
+                    raise error
+                if item is done:
+                    break
+                yield item
+        finally:
+            stop.set()
+            with self._lock:
+                self._streaming -= 1
+
+    def _execute(self, enqueued_at: float, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        started_at = time.perf_counter()
+        wait = started_at - enqueued_at
+        STAGE_LATENCY.observe(wait, stage="queue_wait")
+
+        with self._lock:
+            self._running += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            service = time.perf_counter() - started_at
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._service_avg = 0.8 * self._service_avg + 0.2 * service
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and wait-time statistics"""
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "streaming": self._streaming,
+                "queue_depth": max(self._admitted - self._running - self._streaming, 0),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_total / started * 1000, 2) if started else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 2),
+                "avg_service_ms": round(self._service_avg * 1000, 2),
+            }
+
+    def shutdown(self):
+        """Stop accepting work and let running jobs finish"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        logger.info("Chat executor stopped")
@@ -0,0 +1,192 @@
+"""
+Finans Akademi - Context Packer
+Assembles retrieved chunks and web snippets into an LLM prompt context
+that fits a token budget
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from build_pipeline import CHUNK_OVERLAP
+
+# Below this many tokens left, a truncated passage is not worth including
+MIN_PARTIAL_TOKENS = 48
+
+PASSAGE_SEPARATOR = "\n\n"
+GAP_MARKER = "\n…\n"
+
+
+class TokenCounter:
+    """Token counts in the LLM's tiktoken encoding, estimated when tiktoken is missing"""
+
+    # Turkish text averages about three characters per cl100k token
+    CHARS_PER_TOKEN = 3.0
+
+    def __init__(self, model: str):
+        try:
+            import tiktoken
+
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            logger.warning("tiktoken not installed, estimating prompt token counts")
+            self._encoding = None
+
+    def count(self, text: str) -> int:
+        if self._encoding is None:
+            return int(len(text) / self.CHARS_PER_TOKEN) + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """text cut to at most max_tokens, at the last sentence or word boundary"""
+        if self.count(text) <= max_tokens:
+            return text
+        if self._encoding is None:
+            cut = text[:int((max_tokens - 1) * self.CHARS_PER_TOKEN)]
+        else:
+            cut = self._encoding.decode(self._encoding.encode(text, disallowed_special=())[:max_tokens - 1])
+
+        sentence_end = max(cut.rfind(". "), cut.rfind(".\n"))
+        if sentence_end > len(cut) // 2:
+            return cut[:sentence_end + 1]
+        return cut.rsplit(None, 1)[0] + " …" if " " in cut else cut
+
+
+def merge_overlap(left: str, right: str, max_overlap: int = 2 * CHUNK_OVERLAP) -> str:
+    """Join two adjacent chunks, keeping the text they share only once"""
+    for size in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return left + " " + right
+
+
+class ContextPacker:
+    """
+    Builds the LLM context from search hits
+
+    Hits of the same document are merged into one passage (adjacent
+    chunks lose their overlap, gaps are marked with "…"), passages are
+    ordered by their best score and added until token_budget is reached;
+    the first passage that does not fit is truncated if enough room is
+    left. Passages keep the "[n] text\\n(Kaynak: title)" layout.
+    """
+
+    def __init__(self, token_budget: int = 1500, model: str = "gpt-4"):
+        self.token_budget = token_budget
+        self.counter = TokenCounter(model)
+
+    @staticmethod
+    def _document_key(meta: Dict[str, Any]) -> Tuple:
+        # Indexes built before doc_id existed group by the document's metadata
+        if meta.get("doc_id"):
+            return (meta["doc_id"],)
+        return tuple(meta.get(field) for field in ("source", "section", "type", "title"))
+
+    def passages(self, documents: List[str], scores: List[float], metadata: List[Dict]) -> List[Dict[str, Any]]:
+        """Hits grouped per document and merged, best scoring passage first"""
+        groups: Dict[Tuple, List[Tuple[int, str, float, Dict]]] = {}
+        for doc, score, meta in zip(documents, scores, metadata):
+            groups.setdefault(self._document_key(meta), []).append((meta.get("chunk_id", 0), doc, score, meta))
+
+        passages = []
+        for hits in groups.values():
+            hits.sort(key=lambda hit: hit[0])
+            text = hits[0][1]
+            previous_id = hits[0][0]
+            for chunk_id, doc, _, _ in hits[1:]:
+                if chunk_id == previous_id:
+                    continue
+                text = merge_overlap(text, doc) if chunk_id == previous_id + 1 else text + GAP_MARKER + doc
+                previous_id = chunk_id
+            passages.append({
+                "text": text,
+                "score": max(hit[2] for hit in hits),
+                "metadata": hits[0][3],
+                "chunks": len(hits),
+            })
+
+        passages.sort(key=lambda passage: passage["score"], reverse=True)
+        return passages
+
+    def pack(
+        self,
+        documents: List[str],
+        scores: List[float],
+        metadata: List[Dict],
+        token_budget: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Context for the hits within the token budget
+
+        Returns:
+            context, its token count, chunks used of those given, and
+            tokens_saved vs. sending every chunk verbatim
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+        parts = []
+        used_tokens = 0
+        chunks_used = 0
+
+        for passage in self.passages(documents, scores, metadata):
+            meta = passage["metadata"]
+            source = meta.get("title", meta.get("source", ""))
+            part = f"[{len(parts) + 1}] {passage['text']}\n(Kaynak: {source})"
+            tokens = self.counter.count(part) + (1 if parts else 0)
+
+            if used_tokens + tokens > budget:
+                room = budget - used_tokens - self.counter.count(f"[{len(parts) + 1}] \n(Kaynak: {source})") - 1
+                if room >= MIN_PARTIAL_TOKENS:
+                    text = self.counter.truncate(passage["text"], room)
+                    part = f"[{len(parts) + 1}] {text}\n(Kaynak: {source})"
+                    parts.append(part)
+                    used_tokens += self.counter.count(part) + 1
+                    chunks_used += passage["chunks"]
+                break
+
+            parts.append(part)
+            used_tokens += tokens
+            chunks_used += passage["chunks"]
+
+        verbatim_tokens = sum(self.counter.count(doc) for doc in documents)
+        return {
+            "context": PASSAGE_SEPARATOR.join(parts),
+            "tokens": used_tokens,
+            "chunks_used": chunks_used,
+            "chunks_total": len(documents),
+            "tokens_saved": max(0, verbatim_tokens - used_tokens),
+        }
+
+    def pack_web(self, web_results: List[Dict[str, Any]], token_budget: int) -> Dict[str, Any]:
+        """Web results (deduplicated by URL and snippet) formatted within token_budget"""
+        parts = []
+        used_tokens = 0
+        seen = set()
+
+        for result in web_results:
+            key = (result["url"], re.sub(r"\W+", " ", result["snippet"]).strip().casefold())
+            if result["url"] in seen or key[1] in seen:
+                continue
+            seen.update(key)
+
+            trusted = "✓ Güvenilir kaynak" if result["is_trusted"] else ""
+            header = f"[{len(parts) + 1}] {result['title']} {trusted}\n"
+            footer = f"\nKaynak: {result['url']}\n"
+            part = header + result["snippet"] + footer
+            tokens = self.counter.count(part) + (1 if parts else 0)
+
+            if used_tokens + tokens > token_budget:
+                room = token_budget - used_tokens - self.counter.count(header + footer) - 1
+                if room >= MIN_PARTIAL_TOKENS:
+                    part = header + self.counter.truncate(result["snippet"], room) + footer
+                    parts.append(part)
+                    used_tokens += self.counter.count(part) + 1
+                break
+
+            parts.append(part)
+            used_tokens += tokens
+
+        return {"context": PASSAGE_SEPARATOR.join(parts), "tokens": used_tokens, "results_used": len(parts)}
@@ -16,6 +16,8 @@ sys.path.insert(0, str(Path(__file__).parent))
 from dotenv import load_dotenv
 from data_loader import SiteContentLoader
 from rag_chatbot import FinansRAGChatbot
+from ann_index import index_config_from_env
+from embedding_backends import embedding_settings_from_env
 
 
 def sync_content():
@@ -55,13 +57,20 @@ def sync_content():
         logger.info("Building FAISS index...")
         chatbot = FinansRAGChatbot(
             openai_api_key=openai_key,
-            faiss_index_path=os.getenv("FAISS_INDEX_PATH", "./data/faiss_index")
+            faiss_index_path=os.getenv("FAISS_INDEX_PATH", "./data/faiss_index"),
+            index_config=index_config_from_env(),
+            **embedding_settings_from_env(),
+            build_workers=int(os.getenv("INDEX_BUILD_WORKERS", "0")),
+            encoder_processes=int(os.getenv("INDEX_BUILD_ENCODER_PROCESSES", "1")),
+            dedup_enabled=os.getenv("DEDUP_ENABLED", "true").lower() == "true",
+            dedup_threshold=float(os.getenv("DEDUP_THRESHOLD", "0.85"))
         )
 
-        chatbot.build_index(documents)
+        snapshot = chatbot.build_index(documents)
 
         logger.info("✅ Content sync completed successfully")
         logger.info(f"   Documents: {len(documents)}")
+        logger.info(f"   Build: {snapshot.build_stats}")
         logger.info(f"   Index path: {chatbot.faiss_index_path}")
         logger.info(f"   Timestamp: {datetime.now().isoformat()}")
 
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Finans Akademi - Deduplication
+Exact and near-duplicate removal for extracted documents and their chunks,
+run between loading and indexing
+
+Section extraction walks nested elements, so a container div and each of
+its paragraphs come out as separate documents with overlapping text.
+Documents are deduplicated by normalized content hash, by containment in
+a larger document of the same section and type and by MinHash
+similarity; chunks by hash and MinHash. Typed documents (term cards,
+market cards, lesson days) are always kept over generic section extracts
+of the same text, since the glossary and type filters depend on them.
+
+Usage:
+    python3 api/dedup.py ./data/site_content.json                      # report only
+    python3 api/dedup.py ./data/site_content.json ./data/deduped.json  # also write the kept documents
+"""
+
+import hashlib
+import json
+import sys
+import time
+from typing import Any, Dict, List, Set, Tuple
+
+import numpy as np
+
+# Word n-grams compared between texts
+SHINGLE_SIZE = 3
+
+# MinHash signature length and LSH banding (16 bands x 8 rows: pairs above
+# ~0.7 Jaccard share a bucket with high probability)
+NUM_PERM = 128
+LSH_BANDS = 16
+
+DEFAULT_THRESHOLD = 0.85
+
+# Generic section extracts: a duplicate of a typed document is dropped, not the typed one
+GENERIC_TYPES = frozenset({"section_content", "general"})
+
+
+def normalize(text: str) -> str:
+    """Case- and whitespace-insensitive form of text"""
+    return " ".join(text.casefold().split())
+
+
+def keep_order(metadata: List[Dict[str, Any]]) -> List[int]:
+    """Positions in the order duplicates are resolved: typed documents first, then generic ones"""
+    return sorted(range(len(metadata)), key=lambda position: metadata[position].get("type") in GENERIC_TYPES)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """64-bit hashes of the word size-grams of text"""
+    words = normalize(text).split()
+    grams = [" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))]
+    return {
+        int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+        for gram in grams
+    }
+
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH over the texts kept so far
+
+    add() keeps a text unless a kept one has an estimated Jaccard
+    similarity of at least threshold; only texts sharing an LSH bucket
+    are compared, so each check is close to constant time.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM, bands: int = LSH_BANDS, seed: int = 1):
+        self.threshold = threshold
+        self.rows = num_perm // bands
+        self.bands = bands
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing (mod 2^64, high 32 bits) as the permutations
+        self._a = rng.integers(1, 2**63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: List[np.ndarray] = []
+
+    def signature(self, shingle_set: Set[int]) -> np.ndarray:
+        hashes = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+        return ((hashes[:, None] * self._a + self._b) >> np.uint64(32)).min(axis=0)
+
+    def add(self, shingle_set: Set[int]) -> bool:
+        """Keep the text with these shingles; False if it near-duplicates a kept one"""
+        signature = self.signature(shingle_set)
+        keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates.update(self._buckets[band].get(key, ()))
+        for candidate in candidates:
+            if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                return False
+
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(position)
+        return True
+
+
+def dedupe_documents(
+    documents: List[Dict[str, Any]],
+    threshold: float = DEFAULT_THRESHOLD
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Drop duplicate documents, keeping the first of each (typed documents
+    before generic section extracts; result in original order)
+
+    A document is dropped when its normalized text was seen before
+    (exact), when at least threshold of its shingles occur in a larger
+    document of the same source, section and type (contained: a paragraph
+    emitted again inside its container div), or when it is a MinHash near
+    duplicate of a kept document (near).
+
+    Returns:
+        (kept documents, report)
+    """
+    start = time.perf_counter()
+    removed = {"exact": 0, "contained": 0, "near": 0}
+    dropped: Set[int] = set()
+
+    order = keep_order([doc["metadata"] for doc in documents])
+
+    seen_hashes = set()
+    for position in order:
+        digest = content_hash(documents[position]["content"])
+        if digest in seen_hashes:
+            dropped.add(position)
+            removed["exact"] += 1
+        seen_hashes.add(digest)
+
+    shingle_sets = {
+        position: shingles(documents[position]["content"])
+        for position in order if position not in dropped
+    }
+
+    # Containment only within a section: that is where nesting happens,
+    # and it keeps the pairwise check small. A term card is not "contained"
+    # in its section's container div: only documents of one type compete
+    groups: Dict[Tuple[Any, Any, Any], List[int]] = {}
+    for position in shingle_sets:
+        meta = documents[position]["metadata"]
+        if meta.get("section"):
+            groups.setdefault((meta.get("source"), meta["section"], meta.get("type")), []).append(position)
+    for members in groups.values():
+        kept: List[int] = []
+        for position in sorted(members, key=lambda p: len(shingle_sets[p]), reverse=True):
+            own = shingle_sets[position]
+            if any(len(own & shingle_sets[other]) >= threshold * len(own) for other in kept):
+                dropped.add(position)
+                removed["contained"] += 1
+            else:
+                kept.append(position)
+
+    near = NearDuplicateIndex(threshold)
+    for position, shingle_set in shingle_sets.items():
+        if position not in dropped and not near.add(shingle_set):
+            dropped.add(position)
+            removed["near"] += 1
+
+    kept_documents = [doc for position, doc in enumerate(documents) if position not in dropped]
+    return kept_documents, {
+        "input": len(documents),
+        "kept": len(kept_documents),
+        "removed": removed,
+        "removed_text_bytes": sum(len(documents[p]["content"].encode("utf-8")) for p in dropped),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def dedupe_chunks(
+    chunks: List[str],
+    metadata: List[Dict[str, Any]],
+    threshold: float = DEFAULT_THRESHOLD
+) -> Tuple[List[str], List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Drop chunks whose text repeats (exact) or nearly repeats (near) an earlier chunk
+
+    Chunks of typed documents count as earlier than chunks of generic
+    section extracts; the kept chunks stay in their original order.
+
+    Returns:
+        (kept chunks, their metadata, report)
+    """
+    start = time.perf_counter()
+    removed = {"exact": 0, "near": 0}
+    kept: Set[int] = set()
+    removed_bytes = 0
+
+    seen_hashes = set()
+    near = NearDuplicateIndex(threshold)
+    for position in keep_order(metadata):
+        chunk = chunks[position]
+        digest = content_hash(chunk)
+        if digest in seen_hashes:
+            removed["exact"] += 1
+        elif not near.add(shingles(chunk)):
+            removed["near"] += 1
+        else:
+            seen_hashes.add(digest)
+            kept.add(position)
+            continue
+        removed_bytes += len(chunk.encode("utf-8"))
+
+    kept_chunks = [chunk for position, chunk in enumerate(chunks) if position in kept]
+    kept_metadata = [meta for position, meta in enumerate(metadata) if position in kept]
+
+    return kept_chunks, kept_metadata, {
+        "input": len(chunks),
+        "kept": len(kept_chunks),
+        "removed": removed,
+        "removed_text_bytes": removed_bytes,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            loaded = json.load(f)
+        deduped, report = dedupe_documents(loaded)
+        print(json.dumps(report, indent=2))
+        if len(sys.argv) > 2:
+            with open(sys.argv[2], "w", encoding="utf-8") as f:
+                json.dump(deduped, f, ensure_ascii=False, indent=2)
+    else:
+        print(__doc__)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Finans Akademi - Document Store
+Compact memory-mapped file holding chunk texts and metadata, read lazily
+by position
+
+Layout (little-endian):
+    magic        8 bytes   b"FADOCS1\\0"
+    count        uint64
+    text_offsets uint64[count + 1]   relative to the start of the text blob
+    meta_offsets uint64[count + 1]   relative to the start of the metadata blob
+    text blob    UTF-8 chunk texts, concatenated
+    meta blob    compact UTF-8 JSON metadata objects, concatenated
+
+Usage:
+    python3 api/document_store.py migrate ./data/faiss_index   # documents.json + metadata.json -> documents.bin
+"""
+
+import json
+import mmap
+import os
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Union
+
+import numpy as np
+from loguru import logger
+
+MAGIC = b"FADOCS1\0"
+HEADER_SIZE = len(MAGIC) + 8
+
+
+class LazySequence(Sequence):
+    """Read-only list view that fetches items by position on access"""
+
+    def __init__(self, length: int, fetch: Callable[[int], Any]):
+        self._length = length
+        self._fetch = fetch
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, position: Union[int, slice]):
+        if isinstance(position, slice):
+            return [self._fetch(i) for i in range(*position.indices(self._length))]
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError("document position out of range")
+        return self._fetch(position)
+
+
+class DocumentStore:
+    """
+    Memory-mapped documents.bin
+
+    Opening only maps the file and reads the header; texts and metadata
+    are decoded when a position is accessed, so startup time and resident
+    memory do not grow with the number of chunks.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a document store")
+
+        count = int(np.frombuffer(self._mmap, dtype="<u8", count=1, offset=len(MAGIC))[0])
+        self._text_offsets = np.frombuffer(self._mmap, dtype="<u8", count=count + 1, offset=HEADER_SIZE)
+        self._meta_offsets = np.frombuffer(
+            self._mmap, dtype="<u8", count=count + 1, offset=HEADER_SIZE + (count + 1) * 8
+        )
+        self._text_start = HEADER_SIZE + 2 * (count + 1) * 8
+        self._meta_start = self._text_start + int(self._text_offsets[-1])
+        self.count = count
+
+        self.texts = LazySequence(count, self.text)
+        self.metadata = LazySequence(count, self.meta)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def text(self, position: int) -> str:
+        start = self._text_start + int(self._text_offsets[position])
+        end = self._text_start + int(self._text_offsets[position + 1])
+        return self._mmap[start:end].decode("utf-8")
+
+    def meta(self, position: int) -> Dict[str, Any]:
+        start = self._meta_start + int(self._meta_offsets[position])
+        end = self._meta_start + int(self._meta_offsets[position + 1])
+        return json.loads(self._mmap[start:end])
+
+
+def write_document_store(path: Path, texts: Iterable[str], metadata: Iterable[Dict[str, Any]]):
+    """Write texts and metadata (aligned by position) to path as a document store"""
+    encoded_texts = [text.encode("utf-8") for text in texts]
+    encoded_meta = [
+        json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        for meta in metadata
+    ]
+    if len(encoded_texts) != len(encoded_meta):
+        raise ValueError("texts and metadata must have the same length")
+
+    text_offsets = np.zeros(len(encoded_texts) + 1, dtype="<u8")
+    text_offsets[1:] = np.cumsum([len(b) for b in encoded_texts])
+    meta_offsets = np.zeros(len(encoded_meta) + 1, dtype="<u8")
+    meta_offsets[1:] = np.cumsum([len(b) for b in encoded_meta])
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.array([len(encoded_texts)], dtype="<u8").tobytes())
+        f.write(text_offsets.tobytes())
+        f.write(meta_offsets.tobytes())
+        for blob in encoded_texts:
+            f.write(blob)
+        for blob in encoded_meta:
+            f.write(blob)
+
+
+def migrate_json(index_path: Path) -> bool:
+    """
+    Convert documents.json + metadata.json in index_path to documents.bin
+
+    Returns:
+        True if a migration was performed
+    """
+    index_path = Path(index_path)
+    docs_file = index_path / "documents.json"
+    metadata_file = index_path / "metadata.json"
+    store_file = index_path / "documents.bin"
+
+    if store_file.exists() or not docs_file.exists():
+        return False
+
+    with open(docs_file, "r", encoding="utf-8") as f:
+        documents: List[str] = json.load(f)
+    with open(metadata_file, "r", encoding="utf-8") as f:
+        metadata: List[Dict[str, Any]] = json.load(f)
+
+    # Per-process temp name: several workers may migrate at the same time
+    tmp_file = f"{store_file}.{os.getpid()}.tmp"
+    write_document_store(tmp_file, documents, metadata)
+    os.replace(tmp_file, store_file)
+
+    old_size = docs_file.stat().st_size + metadata_file.stat().st_size
+    logger.info(
+        f"Migrated {len(documents)} documents to {store_file} "
+        f"({old_size / 1024:.0f} KB JSON -> {store_file.stat().st_size / 1024:.0f} KB)"
+    )
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "migrate":
+        if not migrate_json(Path(sys.argv[2])):
+            print("Nothing to migrate (documents.bin exists or documents.json missing)")
+    else:
+        print(__doc__)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Finans Akademi - Embedding Backends
+Sentence Transformers (PyTorch) and ONNX Runtime (dynamic int8) encoders
+behind one interface, plus ONNX export and verification
+
+Usage:
+    python3 api/embedding_backends.py export ./data/onnx/minilm     # export + int8 quantize
+    python3 api/embedding_backends.py verify ./data/onnx/minilm     # compare with the PyTorch model
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from loguru import logger
+
+DEFAULT_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+EMBEDDING_BACKENDS = ("sentence_transformers", "onnx")
+
+# Sample queries used to verify exported models against the reference
+VERIFY_SENTENCES = [
+    "Hisse senedi nedir?",
+    "Borsa İstanbul'da işlem saatleri nelerdir?",
+    "Enflasyon faiz oranlarını nasıl etkiler?",
+    "Temettü verimi nasıl hesaplanır?",
+    "Döviz kuru riskinden nasıl korunabilirim?",
+    "Yatırım fonu ile borsa yatırım fonu arasındaki fark nedir?",
+    "Teknik analizde destek ve direnç seviyeleri",
+    "Kredi kartı borcu yapılandırma",
+    "Altın fiyatları neden yükselir?",
+    "What is a price to earnings ratio?",
+]
+
+
+class EmbeddingBackend:
+    """Encodes texts into L2-normalized float32 embeddings"""
+
+    name = ""
+
+    @property
+    def dimension(self) -> int:
+        raise NotImplementedError
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        raise NotImplementedError
+
+    @contextmanager
+    def multi_process(self, processes: int) -> Iterator[Callable[[List[str]], np.ndarray]]:
+        """
+        Encode function spreading large batches over processes while the block runs
+
+        Backends that already use all cores in-process (ONNX Runtime's
+        thread pool) just return encode.
+        """
+        yield self.encode
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Reference PyTorch encoder"""
+
+    name = "sentence_transformers"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        embeddings = self.model.encode(
+            texts,
+            show_progress_bar=show_progress_bar,
+            normalize_embeddings=True
+        )
+        return embeddings.astype("float32")
+
+    @contextmanager
+    def multi_process(self, processes: int) -> Iterator[Callable[[List[str]], np.ndarray]]:
+        if processes <= 1:
+            yield self.encode
+            return
+
+        logger.info(f"Starting {processes} encoder processes")
+        pool = self.model.start_multi_process_pool(target_devices=["cpu"] * processes)
+        try:
+            def encode(texts: List[str]) -> np.ndarray:
+                embeddings = self.model.encode_multi_process(texts, pool).astype("float32")
+                return embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+            yield encode
+        finally:
+            self.model.stop_multi_process_pool(pool)
+
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    ONNX Runtime encoder for a model exported with export_onnx()
+
+    Runs the transformer in ONNX Runtime and applies the same mean pooling
+    and normalization as the Sentence Transformers model.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str, num_threads: int = 0, batch_size: int = 32):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_dir = Path(model_dir)
+        config_file = self.model_dir / "backend.json"
+        if not config_file.exists():
+            raise FileNotFoundError(
+                f"{config_file} not found; run: python3 api/embedding_backends.py export {model_dir}"
+            )
+        with open(config_file, "r", encoding="utf-8") as f:
+            self.config: Dict[str, Any] = json.load(f)
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            str(self.model_dir / self.config["model_file"]),
+            options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = [i.name for i in self.session.get_inputs()]
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+        self.max_seq_length = self.config["max_seq_length"]
+        self.batch_size = batch_size
+
+    @property
+    def dimension(self) -> int:
+        return self.config["dimension"]
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimension), dtype="float32")
+
+        # Encode similar lengths together to keep padding small
+        order = np.argsort([len(text) for text in texts])
+        embeddings = np.zeros((len(texts), self.dimension), dtype="float32")
+
+        for start in range(0, len(texts), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            embeddings[batch] = self._encode_batch([texts[i] for i in batch])
+
+        return embeddings
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np"
+        )
+        feeds = {name: tokens[name].astype("int64") for name in self._input_names}
+        hidden = self.session.run(["last_hidden_state"], feeds)[0]
+
+        # Mean pooling over real (non-padding) tokens
+        mask = tokens["attention_mask"][..., None].astype("float32")
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+
+def create_embedding_backend(
+    backend: str = "sentence_transformers",
+    model_name: str = DEFAULT_MODEL,
+    onnx_model_path: Optional[str] = None,
+    num_threads: int = 0
+) -> EmbeddingBackend:
+    """Build the named embedding backend ("sentence_transformers" or "onnx")"""
+    if backend == "sentence_transformers":
+        return SentenceTransformerBackend(model_name)
+    if backend == "onnx":
+        if not onnx_model_path:
+            raise ValueError("onnx backend needs onnx_model_path")
+        return OnnxEmbeddingBackend(onnx_model_path, num_threads=num_threads)
+    raise ValueError(f"Unknown embedding backend: {backend} (expected one of {EMBEDDING_BACKENDS})")
+
+
+def embedding_settings_from_env() -> Dict[str, Any]:
+    """
+    Chatbot embedding kwargs from EMBEDDING_BACKEND / EMBEDDING_ONNX_* settings
+
+    Shared by the API and the sync script: an index built with another
+    encoder gets a different embedding_model_id and is rebuilt in full.
+    """
+    return {
+        "embedding_backend": os.getenv("EMBEDDING_BACKEND", "sentence_transformers").lower(),
+        "onnx_model_path": os.getenv("EMBEDDING_ONNX_PATH") or None,
+        "onnx_threads": int(os.getenv("EMBEDDING_ONNX_THREADS", "0")),
+    }
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = True, opset: int = 14) -> Path:
+    """
+    Export a Sentence Transformers model's transformer to ONNX
+
+    Writes model.onnx (float32), model_int8.onnx (dynamic int8 weights,
+    when quantize is set), the tokenizer files and backend.json.
+
+    Returns:
+        The output directory
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    pooling = model[1]
+    if not getattr(pooling, "pooling_mode_mean_tokens", False):
+        raise ValueError(f"{model_name} does not use mean pooling; the ONNX backend only supports mean pooling")
+
+    auto_model = transformer.auto_model.eval()
+    sample = transformer.tokenizer(["Hisse senedi nedir?"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask"]
+
+    fp32_path = output / "model.onnx"
+    logger.info(f"Exporting {model_name} to {fp32_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            auto_model,
+            (sample["input_ids"], sample["attention_mask"]),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset
+        )
+
+    model_file = fp32_path.name
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = output / "model_int8.onnx"
+        logger.info(f"Quantizing weights to int8: {int8_path}")
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+        model_file = int8_path.name
+
+    transformer.tokenizer.save_pretrained(str(output))
+    with open(output / "backend.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "source_model": model_name,
+            "model_file": model_file,
+            "quantized": quantize,
+            "dimension": model.get_sentence_embedding_dimension(),
+            "max_seq_length": transformer.max_seq_length,
+            "pooling": "mean",
+            "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f, indent=2)
+
+    logger.info(f"✅ ONNX model written to {output} ({model_file})")
+    return output
+
+
+def verify_backend(
+    reference: EmbeddingBackend,
+    candidate: EmbeddingBackend,
+    texts: Optional[List[str]] = None,
+    tolerance: float = 0.02
+) -> Dict[str, Any]:
+    """
+    Compare candidate embeddings with the reference backend
+
+    Passes when every text's embeddings have a cosine similarity of at
+    least 1 - tolerance (embeddings are normalized, so this is a dot product).
+    """
+    texts = texts or VERIFY_SENTENCES
+    expected = reference.encode(texts)
+    actual = candidate.encode(texts)
+
+    cosines = np.sum(expected * actual, axis=1)
+    report = {
+        "texts": len(texts),
+        "min_cosine": round(float(cosines.min()), 5),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "max_abs_diff": round(float(np.abs(expected - actual).max()), 5),
+        "tolerance": tolerance,
+        "passed": bool(cosines.min() >= 1 - tolerance),
+    }
+
+    if report["passed"]:
+        logger.info(f"✅ {candidate.name} matches {reference.name}: {report}")
+    else:
+        logger.warning(f"❌ {candidate.name} deviates from {reference.name}: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "export":
+        model = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_MODEL
+        export_onnx(model, sys.argv[2])
+        sys.argv[1] = "verify"
+
+    if len(sys.argv) > 2 and sys.argv[1] == "verify":
+        onnx_backend = OnnxEmbeddingBackend(sys.argv[2])
+        reference_backend = SentenceTransformerBackend(onnx_backend.config["source_model"])
+        result = verify_backend(reference_backend, onnx_backend)
+        print(json.dumps(result, indent=2))
+        sys.exit(0 if result["passed"] else 1)
+
+    print(__doc__)
@@ -0,0 +1,116 @@
+"""
+Finans Akademi - Embedding Micro-Batcher
+Coalesces concurrent single-query embeddings into one encoder call
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from metrics import EMBEDDING_BATCH_SIZE
+
+
+class EmbeddingBatcher:
+    """
+    Collects query texts from concurrent callers and encodes them together
+
+    A dispatcher thread takes the first waiting text, keeps collecting
+    for up to max_wait_ms (or until max_batch texts are waiting), calls
+    encode_fn once on the whole batch and hands each caller its row. A
+    lone request only pays max_wait_ms extra; under load the encoder runs
+    full batches instead of many single-row matmuls.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch: int = 32,
+        max_wait_ms: float = 2.0
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+        self._batches = 0
+        self._texts = 0
+        self._largest_batch = 0
+
+    def _ensure_started(self):
+        # Started lazily (and again after fork(), which does not copy threads)
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, text: str) -> "Future[np.ndarray]":
+        """Queue text for encoding; the future resolves to its (dim,) embedding"""
+        self._ensure_started()
+        future: "Future[np.ndarray]" = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        """Encode text as part of the next batch and wait for the result"""
+        return self.submit(text).result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self._encode(batch)
+
+    def _encode(self, batch: List[tuple]):
+        texts = [text for text, _ in batch]
+        try:
+            embeddings = self.encode_fn(texts)
+        except Exception as e:
+            logger.error(f"Batched embedding of {len(texts)} queries failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), embedding in zip(batch, embeddings):
+            future.set_result(embedding)
+
+        EMBEDDING_BATCH_SIZE.observe(len(batch))
+        with self._lock:
+            self._batches += 1
+            self._texts += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self._batches,
+                "queries": self._texts,
+                "avg_batch_size": round(self._texts / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "waiting": self._queue.qsize(),
+            }
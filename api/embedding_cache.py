@@ -0,0 +1,159 @@
+"""
+Finans Akademi - Query Embedding Cache
+LRU cache of query text -> embedding in front of the encoder, optionally
+persisted to disk so hot queries survive restarts
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+from loguru import logger
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: case-folded with whitespace collapsed"""
+    return " ".join(text.split()).casefold()
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings for one embedding model
+
+    With persist_path set, the cache is loaded from an .npz file (query
+    keys + float32 matrix + model name) on creation and written back at
+    most every persist_interval seconds after new entries, on a short-lived
+    background thread, and by save(). A file written by a different model
+    is ignored.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = 10000,
+        persist_path: Optional[str] = None,
+        persist_interval: float = 300.0
+    ):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.persist_interval = persist_interval
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._dirty = False
+        self._saving = False
+        self._last_save = time.monotonic()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._loaded = 0
+
+        if self.persist_path is not None:
+            self._load()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Cached (dim,) embedding for text, or None"""
+        key = normalize_query(text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return embedding
+
+    def put(self, text: str, embedding: np.ndarray):
+        """Cache the (dim,) embedding of text"""
+        key = normalize_query(text)
+        with self._lock:
+            self._entries[key] = np.asarray(embedding, dtype="float32").reshape(-1)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            self._dirty = True
+
+        self._maybe_persist()
+
+    def _maybe_persist(self):
+        """Save in the background if there are new entries and the interval passed"""
+        if self.persist_path is None:
+            return
+
+        with self._lock:
+            due = self._dirty and not self._saving and time.monotonic() - self._last_save >= self.persist_interval
+            if not due:
+                return
+            self._saving = True
+
+        threading.Thread(target=self.save, name="query-cache-save", daemon=True).start()
+
+    def save(self):
+        """Write the cache to persist_path (atomic rename)"""
+        if self.persist_path is None:
+            return
+
+        with self._lock:
+            keys = list(self._entries.keys())
+            vectors = list(self._entries.values())
+            self._dirty = False
+            self._saving = True
+
+        try:
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype="float32")
+            tmp_path = self.persist_path.with_name(self.persist_path.name + ".tmp")
+            # np.savez appends .npz to names without it, so write via a file object
+            with open(tmp_path, "wb") as f:
+                np.savez(f, model=np.array(self.model_name), keys=np.array(keys, dtype=str), vectors=matrix)
+            os.replace(tmp_path, self.persist_path)
+            logger.info(f"Saved {len(keys)} query embeddings to {self.persist_path}")
+        except Exception as e:
+            logger.error(f"Query embedding cache save failed: {e}")
+        finally:
+            with self._lock:
+                self._saving = False
+                self._last_save = time.monotonic()
+
+    def _load(self):
+        if not self.persist_path.exists():
+            return
+
+        try:
+            with np.load(self.persist_path, allow_pickle=False) as data:
+                if str(data["model"]) != self.model_name:
+                    logger.warning(f"Ignoring query embedding cache built with {data['model']}")
+                    return
+                keys = data["keys"].tolist()
+                vectors = data["vectors"]
+        except Exception as e:
+            logger.error(f"Query embedding cache load failed: {e}")
+            return
+
+        # The file is in LRU order, so the newest entries are kept
+        for key, vector in list(zip(keys, vectors))[-self.max_entries:]:
+            self._entries[key] = vector
+        self._loaded = len(self._entries)
+        logger.info(f"Loaded {self._loaded} query embeddings from {self.persist_path}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "model": self.model_name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "loaded_from_disk": self._loaded,
+                "persist_path": str(self.persist_path) if self.persist_path else None,
+            }
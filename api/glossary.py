@@ -0,0 +1,230 @@
+"""
+Finans Akademi - Glossary Fast Path
+Answers "X nedir?" style questions straight from financial term cards,
+without embedding, FAISS search or an LLM call
+"""
+
+import json
+import re
+import threading
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from metrics import CACHE_LOOKUPS
+
+# Turkish letters folded to ASCII, so "kazanç oranı" and "kazanc orani" match
+ASCII_FOLD = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+
+# Question shapes that ask for a definition; group "term" is the asked term
+DEFINITION_PATTERNS = [
+    re.compile(
+        r"^(?P<term>.+?)\s+(?:anlami\s+nedir|anlami\s+ne|nedir|ne\s+demek(?:tir)?|"
+        r"ne\s+anlama\s+gel(?:ir|iyor)|neye\s+denir|ne\s+ise\s+yarar)$"
+    ),
+    re.compile(r"^(?:what\s+is|what's|define)\s+(?:an?\s+|the\s+)?(?P<term>.+)$"),
+]
+
+# Inflectional suffixes (ASCII-folded), longest first; stripping them maps
+# "temettünün", "temettüler" and "temettü" to the same stem
+SUFFIXES = sorted([
+    "lar", "ler", "lari", "leri", "larin", "lerin",
+    "nin", "nun", "in", "un", "si", "su", "i", "u", "a", "e",
+    "da", "de", "ta", "te", "dan", "den", "tan", "ten",
+    "ya", "ye", "yla", "yle", "la", "le",
+], key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+# Head nouns users usually leave out ("F/K nedir?" for "F/K Oranı")
+OPTIONAL_TAIL_WORDS = ("orani", "oranlari", "endeksi")
+
+
+def turkish_lower(text: str) -> str:
+    """Lowercase with Turkish dotted/dotless i rules (str.lower maps "I" to "i")"""
+    return text.replace("I", "ı").replace("İ", "i").lower()
+
+
+def fold(text: str) -> str:
+    """
+    Turkish-aware case and accent folding
+
+    Drops apostrophe suffixes ("F/K'nın" -> "f/k"), joins abbreviations
+    ("F/K", "A.Ş." -> "fk", "as") and reduces everything else that is not
+    a letter or digit to single spaces.
+    """
+    text = turkish_lower(text)
+    text = re.sub(r"['’`]\w+", "", text)
+    text = text.translate(ASCII_FOLD)
+    text = re.sub(r"(?<=\w)[/.\-](?=\w)", "", text)
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+def stem(word: str) -> str:
+    """Light Turkish stemmer: strip inflectional suffixes while the stem stays long enough"""
+    changed = True
+    while changed:
+        changed = False
+        for suffix in SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+                word = word[:-len(suffix)]
+                changed = True
+                break
+    return word
+
+
+def stem_key(folded: str) -> str:
+    return " ".join(stem(word) for word in folded.split())
+
+
+def asked_term(question: str) -> Optional[str]:
+    """The folded term of a definition question ("F/K oranı nedir?" -> "fk orani"), else None"""
+    folded = fold(question)
+    for pattern in DEFINITION_PATTERNS:
+        match = pattern.match(folded)
+        if match:
+            return match.group("term")
+    return None
+
+
+class TermGlossary:
+    """
+    Exact, stemmed and fuzzy lookup over financial term cards
+
+    Built from financial_term documents alongside the FAISS index and
+    immutable afterwards, so it can live on an index snapshot. Terms with
+    a parenthesized part ("Halka Arz (IPO)") are also found by each part,
+    and "... Oranı" terms without the trailing head noun.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], fuzzy_threshold: float = 0.85):
+        self.entries = entries
+        self.fuzzy_threshold = fuzzy_threshold
+
+        self._exact: Dict[str, int] = {}
+        self._stemmed: Dict[str, int] = {}
+        self._trigrams: Dict[str, List[str]] = {}
+
+        for position, entry in enumerate(entries):
+            for alias in self._aliases(entry["term"]):
+                self._exact.setdefault(alias, position)
+                key = stem_key(alias)
+                if key not in self._stemmed:
+                    self._stemmed[key] = position
+                    for gram in self._grams(key):
+                        self._trigrams.setdefault(gram, []).append(key)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def _aliases(term: str) -> List[str]:
+        aliases = [fold(term)]
+        outside = re.sub(r"\([^)]*\)", " ", term)
+        inside = re.findall(r"\(([^)]*)\)", term)
+        aliases.extend(fold(part) for part in [outside, *inside])
+        for alias in list(aliases):
+            head, _, tail = alias.rpartition(" ")
+            if head and tail in OPTIONAL_TAIL_WORDS:
+                aliases.append(head)
+        return [alias for alias in dict.fromkeys(aliases) if alias]
+
+    @staticmethod
+    def _grams(key: str) -> set:
+        padded = f" {key} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @classmethod
+    def build(cls, items: Iterable[Tuple[str, Dict[str, Any]]], fuzzy_threshold: float = 0.85) -> "TermGlossary":
+        """Glossary of the financial_term items among (content, metadata) pairs (first one per term wins)"""
+        entries = []
+        seen = set()
+        for content, metadata in items:
+            term = metadata.get("term")
+            if metadata.get("type") != "financial_term" or not term or term in seen:
+                continue
+            seen.add(term)
+            entries.append({
+                "term": term,
+                "content": content,
+                "metadata": {k: v for k, v in metadata.items() if k not in ("chunk_id", "total_chunks")},
+            })
+        return cls(entries, fuzzy_threshold)
+
+    def lookup(self, question: str) -> Optional[Tuple[Dict[str, Any], str, float]]:
+        """
+        Term card answering a definition question
+
+        Returns:
+            (entry, match type "exact" / "stem" / "fuzzy", score), or None
+            when the question is not a definition question or no term matches
+        """
+        term = asked_term(question)
+        if not term or not self.entries:
+            return None
+
+        position = self._exact.get(term)
+        if position is not None:
+            return self.entries[position], "exact", 1.0
+
+        key = stem_key(term)
+        position = self._stemmed.get(key)
+        if position is not None:
+            return self.entries[position], "stem", 1.0
+
+        # Fuzzy: score only keys sharing a trigram with the question's term
+        candidates = set()
+        for gram in self._grams(key):
+            candidates.update(self._trigrams.get(gram, ()))
+        best_key, best_score = None, 0.0
+        for candidate in candidates:
+            score = SequenceMatcher(None, key, candidate).ratio()
+            if score > best_score:
+                best_key, best_score = candidate, score
+
+        if best_key is not None and best_score >= self.fuzzy_threshold:
+            return self.entries[self._stemmed[best_key]], "fuzzy", round(best_score, 4)
+        return None
+
+    def save(self, path: Path):
+        """Write the term entries as JSON"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: Path, fuzzy_threshold: float = 0.85) -> "TermGlossary":
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        logger.info(f"Loaded glossary with {len(entries)} terms")
+        return cls(entries, fuzzy_threshold)
+
+
+class GlossaryStats:
+    """Hit rate of the glossary fast path (each hit is one LLM call saved)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._hits = {"exact": 0, "stem": 0, "fuzzy": 0}
+        self._lookup_seconds = 0.0
+
+    def record(self, match: Optional[str], seconds: float):
+        CACHE_LOOKUPS.inc(cache="glossary", result="hit" if match else "miss")
+        with self._lock:
+            self._lookups += 1
+            self._lookup_seconds += seconds
+            if match:
+                self._hits[match] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(self._hits.values())
+            return {
+                "lookups": self._lookups,
+                "hits": hits,
+                "hits_by_match": dict(self._hits),
+                "hit_rate": round(hits / self._lookups, 4) if self._lookups else 0.0,
+                "llm_calls_saved": hits,
+                "avg_lookup_us": round(self._lookup_seconds / self._lookups * 1e6, 1) if self._lookups else 0.0,
+            }
@@ -0,0 +1,174 @@
+"""
+Finans Akademi - Incremental Index Builds
+Content hashes for chunks, a hash-keyed chunk embedding store and the
+diff between a live index and a new set of chunks
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+
+
+def text_hash(text: str) -> str:
+    """Hash of a chunk's text (what the embedding depends on)"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+# Metadata that changes on every load without the chunk changing
+VOLATILE_METADATA = frozenset({"extracted_at"})
+
+
+def chunk_key(text: str, metadata: Dict[str, Any]) -> str:
+    """Identity of an indexed chunk: its text plus its metadata (volatile fields excluded)"""
+    identity = {field: value for field, value in metadata.items() if field not in VOLATILE_METADATA}
+    payload = text + "\x00" + json.dumps(identity, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ChunkEmbeddingStore:
+    """
+    Chunk embeddings keyed by text_hash
+
+    Used only while building: vectors of chunks seen in an earlier build
+    are reused instead of re-encoded. Persisted as path (an .npz with the
+    model name, the keys and the name of the vector file) plus a .npy
+    vector matrix that is memory-mapped on load, so the store does not
+    have to fit in memory. A file written by a different embedding model
+    is ignored.
+    """
+
+    def __init__(self, path: Path, model_name: str):
+        self.path = Path(path)
+        self.model_name = model_name
+        self._new: Dict[str, np.ndarray] = {}
+        # (key -> row, matrix) pairs, searched in order
+        self._sources: List[Tuple[Dict[str, int], np.ndarray]] = []
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        vector = self._new.get(key)
+        if vector is not None:
+            return vector
+        for rows, matrix in self._sources:
+            row = rows.get(key)
+            if row is not None:
+                return np.asarray(matrix[row])
+        return None
+
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        for key, vector in zip(keys, vectors):
+            self._new[key] = vector
+
+    def attach(self, keys: List[str], matrix: np.ndarray):
+        """Make the rows of matrix (e.g. a memory-mapped build file) available by key without copying them"""
+        self._sources.insert(0, ({key: row for row, key in enumerate(keys)}, matrix))
+
+    def _keys(self) -> List[str]:
+        keys = dict.fromkeys(self._new)
+        for rows, _ in self._sources:
+            keys.update(dict.fromkeys(rows))
+        return list(keys)
+
+    def save(self, keep: Optional[Set[str]] = None, block_size: int = 65536):
+        """
+        Write the store, keeping only the keys in keep
+
+        Vectors are copied block by block into a new .npy file; the .npz
+        pointing at it is renamed into place last, so readers never see
+        keys and vectors that do not belong together.
+        """
+        keys = [key for key in self._keys() if keep is None or key in keep]
+        first = self.get(keys[0]) if keys else None
+        dim = len(first) if first is not None else 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        vectors_file = self.path.with_name(f"{self.path.stem}.{uuid.uuid4().hex[:12]}.npy")
+        matrix = np.lib.format.open_memmap(vectors_file, mode="w+", dtype="float32", shape=(len(keys), dim))
+        for start in range(0, len(keys), block_size):
+            block = keys[start:start + block_size]
+            matrix[start:start + len(block)] = np.vstack([self.get(key) for key in block])
+        matrix.flush()
+        del matrix
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                model=np.array(self.model_name),
+                keys=np.array(keys, dtype=str),
+                vectors_file=np.array(vectors_file.name)
+            )
+        previous = self._vectors_file()
+        os.replace(tmp_path, self.path)
+        if previous is not None:
+            previous.unlink(missing_ok=True)
+
+        self._new = {}
+        self._sources = [({key: row for row, key in enumerate(keys)}, np.load(vectors_file, mmap_mode="r"))]
+        logger.info(f"Saved {len(keys)} chunk embeddings to {self.path}")
+
+    def _vectors_file(self) -> Optional[Path]:
+        """Vector file the store on disk currently points at"""
+        if not self.path.exists():
+            return None
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if "vectors_file" in data.files:
+                    return self.path.with_name(str(data["vectors_file"]))
+        except Exception:
+            pass
+        return None
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["model"]) != self.model_name:
+                    logger.warning(f"Ignoring chunk embeddings built with {data['model']}")
+                    return
+                keys = data["keys"].tolist()
+                if "vectors" in data.files:
+                    # Stores written before the separate vector file
+                    matrix = data["vectors"]
+                else:
+                    matrix = np.load(self.path.with_name(str(data["vectors_file"])), mmap_mode="r")
+        except Exception as e:
+            logger.error(f"Chunk embedding store load failed: {e}")
+            return
+
+        self._sources = [({key: row for row, key in enumerate(keys)}, matrix)]
+        logger.info(f"Loaded {len(keys)} chunk embeddings from {self.path}")
+
+
+def plan_update(live_keys: List[str], tombstones: Set[int], new_keys: Iterable[str]) -> Dict[str, Any]:
+    """
+    Diff the live index against a new set of chunk keys
+
+    Returns:
+        added: positions (in new_keys) of chunks the live index lacks
+        removed: live index positions whose chunks are gone
+        unchanged: number of live chunks that are kept as they are
+    """
+    live = {key: position for position, key in enumerate(live_keys) if position not in tombstones}
+
+    added = []
+    seen = set()
+    for position, key in enumerate(new_keys):
+        if key not in live and key not in seen:
+            added.append(position)
+        seen.add(key)
+
+    removed = {position for key, position in live.items() if key not in seen}
+
+    return {"added": added, "removed": removed, "unchanged": len(live) - len(removed)}
@@ -0,0 +1,132 @@
+"""
+Finans Akademi - Background Index Jobs
+Runs FAISS index rebuilds off the request path and tracks their progress
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+class IndexJobConflictError(Exception):
+    """Raised when a rebuild is requested while another one is running"""
+
+    def __init__(self, job: "IndexJob"):
+        super().__init__(f"Index job {job.job_id} is already running")
+        self.job = job
+
+
+class IndexJob:
+    """State of one index rebuild"""
+
+    def __init__(self, params: Dict[str, Any]):
+        self.job_id = str(uuid.uuid4())
+        self.params = params
+        self.status = "queued"  # queued -> running -> succeeded | failed
+        self.stage = None
+        self.progress = 0.0
+        self.result: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def update_progress(self, stage: str, fraction: float):
+        """Progress callback handed to the index builder"""
+        self.stage = stage
+        self.progress = round(fraction, 4)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "params": self.params,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IndexJobManager:
+    """
+    Runs one index rebuild at a time on a background thread
+
+    The job function receives the job's progress callback and returns a
+    result dict; finished jobs are kept (newest max_history) for status
+    queries.
+    """
+
+    def __init__(self, max_history: int = 20):
+        self.max_history = max_history
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, IndexJob]" = OrderedDict()
+
+    def submit(
+        self,
+        fn: Callable[[Callable[[str, float], None]], Dict[str, Any]],
+        params: Optional[Dict[str, Any]] = None
+    ) -> IndexJob:
+        """
+        Start a rebuild job
+
+        Raises:
+            IndexJobConflictError: if a rebuild is already queued or running
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.is_active:
+                    raise IndexJobConflictError(job)
+
+            job = IndexJob(params or {})
+            self._jobs[job.job_id] = job
+
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+
+        thread = threading.Thread(
+            target=self._run,
+            args=(job, fn),
+            name=f"index-job-{job.job_id[:8]}",
+            daemon=True
+        )
+        thread.start()
+
+        logger.info(f"Index job {job.job_id} submitted")
+        return job
+
+    def _run(self, job: IndexJob, fn: Callable[[Callable[[str, float], None]], Dict[str, Any]]):
+        job.status = "running"
+        job.started_at = datetime.now().isoformat()
+
+        try:
+            job.result = fn(job.update_progress) or {}
+            job.status = "succeeded"
+            job.progress = 1.0
+            logger.info(f"Index job {job.job_id} succeeded: {job.result}")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Index job {job.job_id} failed: {e}")
+        finally:
+            job.finished_at = datetime.now().isoformat()
+
+    def get(self, job_id: str) -> Optional[IndexJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[IndexJob]:
+        """Jobs, newest first"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
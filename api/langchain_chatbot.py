@@ -4,13 +4,22 @@ RAG + DuckDuckGo fallback for comprehensive answers
 """
 
 import os
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator, Callable
 from datetime import datetime
 
 from loguru import logger
-from duckduckgo_search import DDGS
 
 from rag_chatbot import FinansRAGChatbot
+from metadata_filters import FilterValue
+from ann_index import IndexConfig
+from metrics import CONTEXT_TOKENS, ERRORS, WEB_SEARCHES, time_stage
+from web_search_cache import WebSearchCache
+
+# Web searches in flight at once (they run next to retrieval on the chat workers)
+WEB_SEARCH_WORKERS = 8
+# Background refreshes of stale cached results, kept off the request-path pool
+WEB_SEARCH_REFRESH_WORKERS = 2
 
 
 class EnhancedFinansChatbot(FinansRAGChatbot):
@@ -18,9 +27,9 @@ class EnhancedFinansChatbot(FinansRAGChatbot):
     Enhanced chatbot with web search fallback
 
     Strategy:
-    1. Try site content first (RAG with FAISS)
-    2. If confidence < threshold, supplement with web search
-    3. Combine both sources for comprehensive answer
+    1. Search site content (RAG with FAISS), with web search running alongside
+    2. If confidence < threshold, supplement with the web results
+    3. Answer from both sources with a single LLM call
     """
 
     def __init__(
@@ -33,7 +42,41 @@ class EnhancedFinansChatbot(FinansRAGChatbot):
         similarity_threshold: float = 0.7,
         web_search_enabled: bool = True,
         web_search_threshold: float = 0.6,
-        trusted_sources: List[str] = None
+        trusted_sources: List[str] = None,
+        web_search_speculative: bool = True,
+        web_search_cache_enabled: bool = True,
+        web_search_cache_ttl: float = 600,
+        web_search_cache_fresh_ttl: float = 60,
+        web_search_cache_stale: float = 300,
+        web_search_cache_size: int = 500,
+        web_search_cache_refresh_backoff: float = 30,
+        answer_cache_enabled: bool = True,
+        answer_cache_similarity: float = 0.92,
+        answer_cache_size: int = 1000,
+        answer_cache_ttl: int = 3600,
+        index_mmap: bool = False,
+        index_config: Optional[IndexConfig] = None,
+        query_cache_size: int = 10000,
+        query_cache_path: Optional[str] = None,
+        embedding_batch_size: int = 32,
+        embedding_batch_wait_ms: float = 2.0,
+        embedding_backend: str = "sentence_transformers",
+        onnx_model_path: Optional[str] = None,
+        onnx_threads: int = 0,
+        glossary_enabled: bool = True,
+        glossary_fuzzy_threshold: float = 0.85,
+        filter_exact_max: int = 2048,
+        auto_filters: bool = False,
+        build_workers: int = 0,
+        encoder_processes: int = 1,
+        dedup_enabled: bool = True,
+        dedup_threshold: float = 0.85,
+        context_token_budget: int = 1500,
+        llm_base_url: Optional[str] = None,
+        llm_timeout: float = 30.0,
+        llm_max_connections: int = 20,
+        llm_hedge: bool = False,
+        llm_hedge_percentile: float = 95.0
     ):
         super().__init__(
             openai_api_key=openai_api_key,
@@ -41,7 +84,34 @@ class EnhancedFinansChatbot(FinansRAGChatbot):
             embedding_model=embedding_model,
             llm_model=llm_model,
             top_k=top_k,
-            similarity_threshold=similarity_threshold
+            similarity_threshold=similarity_threshold,
+            answer_cache_enabled=answer_cache_enabled,
+            answer_cache_similarity=answer_cache_similarity,
+            answer_cache_size=answer_cache_size,
+            answer_cache_ttl=answer_cache_ttl,
+            index_mmap=index_mmap,
+            index_config=index_config,
+            query_cache_size=query_cache_size,
+            query_cache_path=query_cache_path,
+            embedding_batch_size=embedding_batch_size,
+            embedding_batch_wait_ms=embedding_batch_wait_ms,
+            embedding_backend=embedding_backend,
+            onnx_model_path=onnx_model_path,
+            onnx_threads=onnx_threads,
+            glossary_enabled=glossary_enabled,
+            glossary_fuzzy_threshold=glossary_fuzzy_threshold,
+            filter_exact_max=filter_exact_max,
+            auto_filters=auto_filters,
+            build_workers=build_workers,
+            encoder_processes=encoder_processes,
+            dedup_enabled=dedup_enabled,
+            dedup_threshold=dedup_threshold,
+            context_token_budget=context_token_budget,
+            llm_base_url=llm_base_url,
+            llm_timeout=llm_timeout,
+            llm_max_connections=llm_max_connections,
+            llm_hedge=llm_hedge,
+            llm_hedge_percentile=llm_hedge_percentile
         )
 
         self.web_search_enabled = web_search_enabled
@@ -63,12 +133,64 @@ class EnhancedFinansChatbot(FinansRAGChatbot):
         else:
             self.trusted_sources = trusted_sources
 
-        # DuckDuckGo search
-        self.ddgs = DDGS()
+        # DuckDuckGo search client (created on first use)
+        self._ddgs = None
+        # Web searches overlap embedding and retrieval; speculative ones start
+        # before the scores are known
+        self.web_search_speculative = web_search_speculative
+        self._web_search_pool = ThreadPoolExecutor(max_workers=WEB_SEARCH_WORKERS, thread_name_prefix="web-search")
+        self._web_search_refresh_pool = ThreadPoolExecutor(
+            max_workers=WEB_SEARCH_REFRESH_WORKERS,
+            thread_name_prefix="web-search-refresh"
+        )
+
+        # Results per normalized query; stale ones are refreshed on their own pool
+        self.web_search_cache = None
+        if web_search_cache_enabled:
+            self.web_search_cache = WebSearchCache(
+                ttl_seconds=web_search_cache_ttl,
+                fresh_ttl_seconds=web_search_cache_fresh_ttl,
+                stale_seconds=web_search_cache_stale,
+                max_entries=web_search_cache_size,
+                refresh_backoff_seconds=web_search_cache_refresh_backoff,
+                refresh_executor=self._web_search_refresh_pool
+            )
 
         logger.info(f"Enhanced chatbot initialized (web_search={'enabled' if web_search_enabled else 'disabled'})")
 
+    @property
+    def ddgs(self):
+        """DuckDuckGo search client"""
+        if self._ddgs is None:
+            with self._startup_timer("web_search_client"):
+                from duckduckgo_search import DDGS
+
+                self._ddgs = DDGS()
+        return self._ddgs
+
+    def _warm_up_tasks(self, run_test_query: bool = True) -> Dict[str, Callable[[], Any]]:
+        tasks = super()._warm_up_tasks(run_test_query)
+        if self.web_search_enabled:
+            tasks["web_search_client"] = lambda: self.ddgs
+        return tasks
+
+    def close(self):
+        """Release the LLM connection pool and the web search threads"""
+        super().close()
+        self._web_search_pool.shutdown(wait=False, cancel_futures=True)
+        self._web_search_refresh_pool.shutdown(wait=False, cancel_futures=True)
+
     def web_search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        """
+        Web search results for query, from the web search cache when enabled
+
+        Failed searches return no results and are not cached.
+        """
+        if self.web_search_cache is None:
+            return self._search_ddgs(query, max_results)
+        return self.web_search_cache.get(query, max_results, lambda: self._search_ddgs(query, max_results))
+
+    def _search_ddgs(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """
         Perform web search using DuckDuckGo
 
@@ -86,7 +208,8 @@ class EnhancedFinansChatbot(FinansRAGChatbot):
             search_query = f"{query} finans Türkiye"
 
             results = []
-            search_results = self.ddgs.text(search_query, max_results=max_results * 2)
+            with time_stage("web_search"):
+                search_results = list(self.ddgs.text(search_query, max_results=max_results * 2))
 
             # Filter and prioritize trusted sources
             trusted_results = []
@@ -123,6 +246,7 @@ class EnhancedFinansChatbot(FinansRAGChatbot):
             return results
 
         except Exception as e:
+            ERRORS.inc(component="web_search")
             logger.error(f"Web search failed: {e}")
             return []
 
@@ -130,50 +254,233 @@ class EnhancedFinansChatbot(FinansRAGChatbot):
         self,
         question: str,
         chat_history: List[Dict] = None,
-        force_web_search: bool = False
+        force_web_search: bool = False,
+        filters: Optional[Dict[str, FilterValue]] = None
     ) -> Dict[str, Any]:
         """
         Get answer using hybrid approach (site content + web search)
 
+        Whether to use the web is decided from the retrieval scores before
+        anything is generated, so each question costs at most one LLM call.
+
         Args:
             question: User's question
             chat_history: Previous conversation
             force_web_search: Force web search even if site content is good
+            filters: Optional metadata filters for site content retrieval
 
         Returns:
             Answer with metadata
         """
         start_time = datetime.now()
 
-        # Step 1: Get answer from site content (RAG)
-        site_result = self.get_answer(question, chat_history)
-        site_confidence = site_result["confidence"]
+        plan = self._plan_answer(question, force_web_search, filters, start_time)
+        if "result" in plan:
+            result = plan["result"]
+            result["response_time_ms"] = int((datetime.now() - start_time).total_seconds() * 1000)
+            return {**result, "web_search_performed": False, "web_sources": []}
+
+        answer = self.generate(plan["prompt"]) if plan["prompt"] else self.NO_CONTEXT_ANSWER
+        result = self._plan_result(plan, answer)
+
+        # Only pure site-content answers are cached; web results go stale
+        if plan["source_type"] == "site_content" and not filters:
+            self._cache_answer(question, plan["query_embedding"], result, plan["cache_generation"])
+
+        # Calculate total response time
+        response_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+
+        return {
+            **result,
+            "web_search_performed": plan["need_web_search"],
+            "web_sources": plan["web_results"],
+            "response_time_ms": response_time_ms,
+            "cache_hit": False
+        }
 
+    def stream_enhanced_answer(
+        self,
+        question: str,
+        chat_history: List[Dict] = None,
+        force_web_search: bool = False,
+        filters: Optional[Dict[str, FilterValue]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a hybrid answer as events
+
+        Retrieval and (if needed) web search run first so the "metadata"
+        event can report sources and whether web search ran; then the LLM
+        output is streamed as "token" events, followed by "done".
+        """
+        start_time = datetime.now()
+
+        plan = self._plan_answer(question, force_web_search, filters, start_time)
+        if "result" in plan:
+            yield from self._stream_cached(plan["result"], start_time)
+            return
+
+        retrieval = plan["retrieval"]
+        yield {
+            "event": "metadata",
+            "data": {
+                "source_type": plan["source_type"],
+                "confidence": plan["site_confidence"],
+                "documents_retrieved": len(retrieval["documents"]),
+                "similarity_scores": retrieval["scores"],
+                "sources": self.format_sources(retrieval["metadata"]),
+                "web_search_performed": plan["need_web_search"],
+                "web_sources": plan["web_results"],
+                "cache_hit": False
+            }
+        }
+
+        if plan["prompt"]:
+            answer_parts = []
+            for token in self.stream_llm(plan["prompt"]):
+                answer_parts.append(token)
+                yield {"event": "token", "data": {"text": token}}
+
+            # Only pure site-content answers are cached; web results go stale
+            if plan["source_type"] == "site_content" and not filters:
+                self._cache_answer(
+                    question,
+                    plan["query_embedding"],
+                    self._plan_result(plan, "".join(answer_parts)),
+                    plan["cache_generation"]
+                )
+        else:
+            yield {"event": "token", "data": {"text": self.NO_CONTEXT_ANSWER}}
+
+        yield {
+            "event": "done",
+            "data": {
+                "source_type": plan["source_type"],
+                "response_time_ms": int((datetime.now() - start_time).total_seconds() * 1000)
+            }
+        }
+
+    def _plan_answer(
+        self,
+        question: str,
+        force_web_search: bool,
+        filters: Optional[Dict[str, FilterValue]],
+        start_time: datetime
+    ) -> Dict[str, Any]:
+        """
+        Everything a hybrid answer needs before its single LLM call
+
+        Web search runs on the web search pool while the question is
+        embedded and searched: always when forced, otherwise speculatively
+        whenever web search may be used (web_search_speculative), its
+        results ignored if a cached answer or the site content scores high
+        enough. A speculative search that already started still runs to
+        completion, but fills the web search cache for the next asker.
+
+        Returns:
+            {"result": answer} for glossary and reusable cached answers;
+            otherwise the retrieval, web results, prompt (None when there
+            is no context at all) and source type
+        """
+        if not force_web_search and not filters:
+            glossary_answer = self._glossary_answer(question, start_time)
+            if glossary_answer:
+                return {"result": glossary_answer}
+
+        web_search = None
+        if self.web_search_enabled and (force_web_search or self.web_search_speculative):
+            web_search = self._web_search_pool.submit(self.web_search, question)
+
+        query_embedding = self.embed_query(question)
+
+        # A cached site answer is only reusable if web search would not run
+        cached = None if filters else self._cached_answer(query_embedding)
+        if cached and not (
+            self.web_search_enabled and
+            (force_web_search or cached["confidence"] < self.web_search_threshold)
+        ):
+            if web_search is not None:
+                WEB_SEARCHES.inc(trigger="speculative_unused")
+                web_search.cancel()
+            return {"result": cached}
+        cache_generation = self.answer_cache.generation if self.answer_cache else None
+
+        retrieval = self.retrieve(question, query_embedding, filters)
+        site_context = retrieval["context"]
+        site_confidence = retrieval["best_score"] if site_context else 0.0
         logger.info(f"Site content confidence: {site_confidence:.4f}")
 
-        # Step 2: Decide if web search is needed
         need_web_search = (
             self.web_search_enabled and
             (force_web_search or site_confidence < self.web_search_threshold)
         )
 
         web_results = []
-        final_answer = site_result["answer"]
-        source_type = site_result["source_type"]
-
         if need_web_search:
-            logger.info("Performing web search for additional context")
-            web_results = self.web_search(question)
+            WEB_SEARCHES.inc(trigger="forced" if force_web_search else "low_confidence")
+            if web_search is not None:
+                with time_stage("web_search_wait"):
+                    web_results = web_search.result()
+            else:
+                web_results = self.web_search(question)
+        elif web_search is not None:
+            WEB_SEARCHES.inc(trigger="speculative_unused")
+            web_search.cancel()
+
+        if web_results:
+            prompt = self._build_hybrid_prompt(question, site_context, web_results)
+            source_type = "hybrid" if site_confidence > 0.3 else "web_search"
+        elif site_context:
+            prompt = self.prompt_template.format(context=site_context, question=question)
+            source_type = "site_content"
+        else:
+            prompt = None
+            source_type = "insufficient_context"
+
+        return {
+            "query_embedding": query_embedding,
+            "cache_generation": cache_generation,
+            "retrieval": retrieval,
+            "site_confidence": site_confidence,
+            "need_web_search": need_web_search,
+            "web_results": web_results,
+            "prompt": prompt,
+            "source_type": source_type,
+        }
 
-            if web_results:
-                # Step 3: Combine site content + web search results
-                web_context = self._format_web_results(web_results)
+    @staticmethod
+    def _plan_result(plan: Dict[str, Any], answer: str) -> Dict[str, Any]:
+        """Site-side answer fields of a planned answer (what the answer cache stores)"""
+        retrieval = plan["retrieval"]
+        return {
+            "answer": answer,
+            "source_type": plan["source_type"],
+            "confidence": plan["site_confidence"],
+            "documents_retrieved": len(retrieval["documents"]),
+            "similarity_scores": retrieval["scores"],
+            "metadata": retrieval["metadata"],
+            "context_used": retrieval["context"][:500]
+        }
+
+    def _build_hybrid_prompt(self, question: str, site_context: str, web_results: List[Dict[str, Any]]) -> str:
+        """
+        Build the prompt combining site content and web search results
+
+        Both share the context token budget: site context is cut to half of
+        it and the web results are packed into what remains.
+        """
+        counter = self.context_packer.counter
+        budget = self.context_packer.token_budget
+        site_context = counter.truncate(site_context, budget // 2) if site_context else ""
+        site_tokens = counter.count(site_context) if site_context else 0
+
+        web = self.context_packer.pack_web(web_results, budget - site_tokens)
+        CONTEXT_TOKENS.observe(web["tokens"], part="web")
+        web_context = web["context"]
 
-                # Create enhanced prompt
-                enhanced_prompt = f"""Sana iki kaynak veriyorum:
+        return f"""Sana iki kaynak veriyorum:
 
 **Site İçeriğimizden:**
-{site_result.get('context_used', 'Bilgi bulunamadı')}
+{site_context or 'Bilgi bulunamadı'}
 
 **Web Araması Sonuçları:**
 {web_context}
@@ -183,46 +490,12 @@ Soru: {question}
 Lütfen her iki kaynağı da kullanarak Türkçe, detaylı ve anlaşılır bir cevap ver.
 Eğer web'den bilgi kullanıyorsan, kaynağı belirt."""
 
-                final_answer = self.llm.predict(enhanced_prompt)
-                source_type = "hybrid" if site_confidence > 0.3 else "web_search"
-
-        # Calculate total response time
-        response_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
-
-        return {
-            "answer": final_answer,
-            "source_type": source_type,
-            "confidence": site_confidence,
-            "documents_retrieved": site_result["documents_retrieved"],
-            "similarity_scores": site_result["similarity_scores"],
-            "metadata": site_result["metadata"],
-            "web_search_performed": need_web_search,
-            "web_sources": web_results if need_web_search else [],
-            "response_time_ms": response_time_ms
-        }
-
-    def _format_web_results(self, web_results: List[Dict[str, Any]]) -> str:
-        """Format web search results for LLM context"""
-        formatted = []
-
-        for i, result in enumerate(web_results, 1):
-            title = result["title"]
-            snippet = result["snippet"]
-            url = result["url"]
-            trusted = "✓ Güvenilir kaynak" if result["is_trusted"] else ""
-
-            formatted.append(f"""[{i}] {title} {trusted}
-{snippet}
-Kaynak: {url}
-""")
-
-        return "\n\n".join(formatted)
-
     def chat(
         self,
         message: str,
         session_history: List[Dict] = None,
-        force_web_search: bool = False
+        force_web_search: bool = False,
+        filters: Optional[Dict[str, FilterValue]] = None
     ) -> Dict[str, Any]:
         """
         Main chat interface with enhanced features
@@ -231,6 +504,7 @@ Kaynak: {url}
             message: User's message
             session_history: Previous conversation
             force_web_search: Force web search
+            filters: Optional metadata filters, e.g. {"type": "market_data"}
 
         Returns:
             Response with metadata
@@ -238,8 +512,7 @@ Kaynak: {url}
         logger.info(f"User question: {message}")
 
         # Detect if user explicitly asks for web search
-        web_search_keywords = ["ara", "bul", "güncel", "son", "haber", "web"]
-        if any(keyword in message.lower() for keyword in web_search_keywords):
+        if self._wants_web_search(message):
             force_web_search = True
             logger.info("Web search forced (user keyword detected)")
 
@@ -247,7 +520,8 @@ Kaynak: {url}
         result = self.get_enhanced_answer(
             message,
             session_history,
-            force_web_search
+            force_web_search,
+            filters
         )
 
         logger.info(
@@ -258,6 +532,27 @@ Kaynak: {url}
 
         return result
 
+    def stream_chat(
+        self,
+        message: str,
+        session_history: List[Dict] = None,
+        force_web_search: bool = False,
+        filters: Optional[Dict[str, FilterValue]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Streaming chat interface (see stream_enhanced_answer)"""
+        logger.info(f"User question (stream): {message}")
+
+        if self._wants_web_search(message):
+            force_web_search = True
+            logger.info("Web search forced (user keyword detected)")
+
+        return self.stream_enhanced_answer(message, session_history, force_web_search, filters)
+
+    def _wants_web_search(self, message: str) -> bool:
+        """Detect if user explicitly asks for web search"""
+        web_search_keywords = ["ara", "bul", "güncel", "son", "haber", "web"]
+        return any(keyword in message.lower() for keyword in web_search_keywords)
+
 
 # CLI usage
 if __name__ == "__main__":
@@ -0,0 +1,437 @@
+"""
+Finans Akademi - Async LLM Client
+OpenAI-compatible chat completions over one pooled HTTP client, with
+per-call deadlines and optional hedged requests
+
+All calls run on a private event loop thread that owns the connection
+pool; blocking callers (the chat worker threads) use generate()/stream(),
+async callers agenerate()/astream(). A hedged call sends a second request
+once the first has been slower than the recent hedge_percentile latency
+and returns whichever answers first (for streams: whichever produces the
+first token first), cancelling the other.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from metrics import ERRORS, LLM_CALLS, LLM_HEDGES
+
+# Latencies observed before the hedge delay is trusted
+MIN_HEDGE_SAMPLES = 20
+
+_END = object()
+
+
+def _delta(chunk) -> Optional[str]:
+    """Text of one streamed completion chunk"""
+    return chunk.choices[0].delta.content if chunk.choices else None
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when an LLM call misses its deadline"""
+
+
+class LatencyTracker:
+    """
+    Rolling window of recent call latencies
+
+    Attempts that were cancelled before answering (hedge losers, timeouts)
+    are recorded as censored samples: their latency is only known to be
+    longer than the time they ran. Dropping them would leave just the fast
+    attempts in the window and pull the hedge delay down with every hedge.
+    """
+
+    def __init__(self, window: int = 200):
+        # (seconds, censored)
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, censored: bool = False):
+        with self._lock:
+            self._samples.append((seconds, censored))
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        p-th percentile of the window (Kaplan-Meier estimate over censored
+        samples), None until MIN_HEDGE_SAMPLES were recorded
+
+        When censoring hides the percentile, the longest sample is returned.
+        """
+        with self._lock:
+            if len(self._samples) < MIN_HEDGE_SAMPLES:
+                return None
+            # At equal times, answers count before cancellations
+            ordered = sorted(self._samples, key=lambda sample: (sample[0], sample[1]))
+
+        target = 1 - p / 100
+        survival = 1.0
+        at_risk = len(ordered)
+        for seconds, censored in ordered:
+            if not censored:
+                survival *= 1 - 1 / at_risk
+                if survival <= target + 1e-12:
+                    return seconds
+            at_risk -= 1
+        return ordered[-1][0]
+
+
+class AsyncLLMClient:
+    """
+    Chat completion client shared by all chat workers
+
+    Args:
+        timeout: Default deadline per call in seconds (whole answer for
+            generate, first token and each following token for streams)
+        max_connections: Size of the HTTP connection pool
+        hedge: Send a backup request for calls slower than the
+            hedge_percentile of recent latencies (never sooner than
+            hedge_min_delay); doubles provider cost for those calls only
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: Optional[str] = None,
+        temperature: float = 0.7,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        hedge: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_min_delay: float = 0.5
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.temperature = temperature
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+
+        self.latency = LatencyTracker()
+        self.first_token_latency = LatencyTracker()
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self._pid = None
+
+    # Event loop and connection pool
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the client's loop thread (again after a fork, whose child has no threads)"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._client = None
+                self._pid = os.getpid()
+                threading.Thread(target=self._loop.run_forever, name="llm-client-loop", daemon=True).start()
+            return self._loop
+
+    def _get_client(self):
+        """AsyncOpenAI client on the loop thread, created on first use"""
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout)
+            )
+            # Retries are replaced by deadlines and hedging
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=0
+            )
+            logger.info(f"LLM client ready: {self.model} (pool {self.max_connections}, hedging {self.hedge})")
+        return self._client
+
+    def _submit(self, coro: Awaitable[Any]):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def close(self):
+        """Close the connection pool and stop the loop thread"""
+        with self._lock:
+            loop, client, self._loop, self._client = self._loop, self._client, None, None
+        if loop is None or self._pid != os.getpid():
+            return
+
+        async def shutdown():
+            calls = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in calls:
+                task.cancel()
+            await asyncio.gather(*calls, return_exceptions=True)
+            if client is not None:
+                await client.close()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+
+    def warm_up(self):
+        """Import the HTTP and OpenAI client modules (the loop starts on the first call)"""
+        import httpx
+        import openai
+
+    # Public API
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Blocking completion of prompt (from worker threads)"""
+        return self._submit(self._generate(prompt, timeout)).result()
+
+    async def agenerate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Completion of prompt, awaitable from any event loop"""
+        return await asyncio.wrap_future(self._submit(self._generate(prompt, timeout)))
+
+    def generate_many(self, prompts: List[str], max_concurrency: int = 8, timeout: Optional[float] = None) -> List[str]:
+        """Completions of prompts, at most max_concurrency in flight, in order"""
+
+        async def run_all():
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def run_one(prompt):
+                async with semaphore:
+                    return await self._generate(prompt, timeout)
+
+            return await asyncio.gather(*(run_one(prompt) for prompt in prompts))
+
+        return self._submit(run_all()).result()
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        """Blocking iterator over the tokens of prompt's completion"""
+        tokens: "queue.Queue[Any]" = queue.Queue()
+
+        async def pump():
+            try:
+                async for token in self._stream(prompt, timeout):
+                    tokens.put(token)
+                tokens.put(_END)
+            except Exception as e:
+                tokens.put(e)
+                raise
+
+        future = self._submit(pump())
+        try:
+            while True:
+                item = tokens.get()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Consumer went away (client disconnected): stop the request
+            future.cancel()
+
+    async def astream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Tokens of prompt's completion, from any event loop"""
+        loop = asyncio.get_running_loop()
+        tokens: asyncio.Queue = asyncio.Queue()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(tokens.put_nowait, item)
+            except RuntimeError:
+                pass  # the caller's loop is gone
+
+        async def pump():
+            try:
+                async for token in self._stream(prompt, timeout):
+                    put(token)
+                put(_END)
+            except Exception as e:
+                put(e)
+                raise
+
+        future = self._submit(pump())
+        try:
+            while True:
+                item = await tokens.get()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "hedging": self.hedge,
+            "hedge_delay_seconds": self._hedge_delay(self.latency),
+            "first_token_hedge_delay_seconds": self._hedge_delay(self.first_token_latency),
+        }
+
+    # Calls (run on the client's loop)
+
+    def _messages(self, prompt: str) -> List[dict]:
+        return [{"role": "user", "content": prompt}]
+
+    async def _generate(self, prompt: str, timeout: Optional[float]) -> str:
+        client = self._get_client()
+
+        async def attempt() -> str:
+            response = await client.chat.completions.create(
+                model=self.model,
+                messages=self._messages(prompt),
+                temperature=self.temperature
+            )
+            return response.choices[0].message.content or ""
+
+        try:
+            answer = await asyncio.wait_for(
+                self._hedged(attempt, self.latency),
+                timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            LLM_CALLS.inc(call="generate", outcome="timeout")
+            raise LLMTimeoutError(f"LLM call exceeded {timeout or self.timeout}s")
+        except Exception:
+            LLM_CALLS.inc(call="generate", outcome="error")
+            ERRORS.inc(component="llm")
+            raise
+        LLM_CALLS.inc(call="generate", outcome="ok")
+        return answer
+
+    async def _stream(self, prompt: str, timeout: Optional[float]) -> AsyncIterator[str]:
+        client = self._get_client()
+        timeout = timeout or self.timeout
+
+        async def attempt() -> Tuple[str, Any]:
+            # Open a stream and read up to its first token
+            stream = await client.chat.completions.create(
+                model=self.model,
+                messages=self._messages(prompt),
+                temperature=self.temperature,
+                stream=True
+            )
+            try:
+                while True:
+                    try:
+                        chunk = await stream.__anext__()
+                    except StopAsyncIteration:
+                        return "", stream
+                    token = _delta(chunk)
+                    if token:
+                        return token, stream
+            except BaseException:
+                await stream.close()
+                raise
+
+        async def discard(opened: Tuple[str, Any]):
+            await opened[1].close()
+
+        try:
+            token, stream = await asyncio.wait_for(
+                self._hedged(attempt, self.first_token_latency, discard),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            LLM_CALLS.inc(call="stream", outcome="timeout")
+            raise LLMTimeoutError(f"No LLM token within {timeout}s")
+        except Exception:
+            LLM_CALLS.inc(call="stream", outcome="error")
+            ERRORS.inc(component="llm")
+            raise
+
+        try:
+            if token:
+                yield token
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    LLM_CALLS.inc(call="stream", outcome="timeout")
+                    raise LLMTimeoutError(f"LLM stream stalled for {timeout}s")
+                token = _delta(chunk)
+                if token:
+                    yield token
+            LLM_CALLS.inc(call="stream", outcome="ok")
+        finally:
+            await stream.close()
+
+    def _hedge_delay(self, tracker: LatencyTracker) -> Optional[float]:
+        if not self.hedge:
+            return None
+        observed = tracker.percentile(self.hedge_percentile)
+        return None if observed is None else max(self.hedge_min_delay, observed)
+
+    async def _hedged(
+        self,
+        attempt: Callable[[], Awaitable[Any]],
+        tracker: LatencyTracker,
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None
+    ) -> Any:
+        """
+        Result of attempt(), backed up by a second attempt after the
+        tracker's hedge delay
+
+        The first successful attempt wins and the other is cancelled (or,
+        if it also finished, handed to discard). Only when both fail is
+        the first error raised. Every attempt's latency goes to tracker,
+        censored if it was cancelled before answering.
+        """
+        async def timed() -> Any:
+            start = time.perf_counter()
+            try:
+                result = await attempt()
+            except asyncio.CancelledError:
+                tracker.record(time.perf_counter() - start, censored=True)
+                raise
+            tracker.record(time.perf_counter() - start)
+            return result
+
+        delay = self._hedge_delay(tracker)
+        first = asyncio.ensure_future(timed())
+        if delay is None:
+            return await first
+
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        LLM_HEDGES.inc(result="fired")
+        second = asyncio.ensure_future(timed())
+        pending = {first, second}
+        winner = None
+        errors = []
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (first, second):
+                    if task in done and winner is None:
+                        if task.exception() is None:
+                            winner = task
+                        else:
+                            errors.append(task.exception())
+            if winner is None:
+                raise errors[0]
+            if winner is second:
+                LLM_HEDGES.inc(result="won")
+            return winner.result()
+        finally:
+            for task in (first, second):
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif discard is not None and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Finans Akademi - Stub LLM Server
+Local OpenAI-compatible /v1/chat/completions endpoint with a configurable
+latency tail, for exercising the LLM client's deadlines and hedging
+without calling the provider
+
+Usage:
+    python3 api/llm_stub_server.py serve --port 8099 --tail-rate 0.03   # then OPENAI_BASE_URL=http://127.0.0.1:8099/v1
+    python3 api/llm_stub_server.py bench --requests 300                 # latency with and without hedging
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+import numpy as np
+
+STUB_ANSWER = "Hisse senedi, bir şirketin sermayesini temsil eden ve ortaklık hakkı veren menkul kıymettir."
+
+
+class StubSettings:
+    """Latency model: base_ms per request, tail_ms extra for tail_rate of requests, token_ms per token"""
+
+    def __init__(self, base_ms: float = 150, tail_ms: float = 2000, tail_rate: float = 0.03, token_ms: float = 5):
+        self.base_ms = base_ms
+        self.tail_ms = tail_ms
+        self.tail_rate = tail_rate
+        self.token_ms = token_ms
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def first_byte_delay(self) -> float:
+        with self._lock:
+            self.requests += 1
+        tail = self.tail_ms if random.random() < self.tail_rate else 0.0
+        return (self.base_ms + tail) / 1000
+
+
+def make_handler(settings: StubSettings):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            try:
+                self._complete()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client cancelled the request (e.g. the losing half of a hedge)
+                self.close_connection = True
+
+        def _complete(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(settings.first_byte_delay())
+
+            tokens = [word + " " for word in STUB_ANSWER.split()]
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            base = {"id": completion_id, "created": int(time.time()), "model": body.get("model", "stub")}
+
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for token in tokens:
+                    self._chunk({**base, "object": "chat.completion.chunk", "choices": [
+                        {"index": 0, "delta": {"content": token}, "finish_reason": None}
+                    ]})
+                    time.sleep(settings.token_ms / 1000)
+                self._chunk({**base, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": {}, "finish_reason": "stop"}
+                ]})
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+                return
+
+            time.sleep(settings.token_ms * len(tokens) / 1000)
+            payload = json.dumps({**base, "object": "chat.completion", "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                "finish_reason": "stop",
+            }], "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _chunk(self, data: Dict[str, Any]):
+            self._write_chunk(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode())
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return StubHandler
+
+
+def start_stub_server(settings: StubSettings, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve the stub on a background thread; base URL is http://host:server.server_port/v1"""
+    server = ThreadingHTTPServer((host, port), make_handler(settings))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-stub-server", daemon=True).start()
+    return server
+
+
+def run_bench(base_url: str, requests: int, concurrency: int, hedge: bool, stream: bool) -> Dict[str, Any]:
+    """Latency percentiles of requests calls through AsyncLLMClient"""
+    from llm_client import AsyncLLMClient
+
+    client = AsyncLLMClient(api_key="stub", model="stub", base_url=base_url, hedge=hedge, max_connections=concurrency * 2)
+    latencies: List[float] = []
+
+    async def one():
+        start = time.perf_counter()
+        if stream:
+            async for _ in client.astream("soru"):
+                break
+        else:
+            await client.agenerate("soru")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited():
+            async with semaphore:
+                await one()
+
+        await asyncio.gather(*(limited() for _ in range(requests)))
+
+    try:
+        asyncio.run(run_all())
+    finally:
+        client.close()
+    return {
+        "hedge": hedge,
+        "measure": "first_token" if stream else "completion",
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible LLM server")
+    parser.add_argument("command", choices=["serve", "bench"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--base-ms", type=float, default=150)
+    parser.add_argument("--tail-ms", type=float, default=2000)
+    parser.add_argument("--tail-rate", type=float, default=0.03)
+    parser.add_argument("--token-ms", type=float, default=5)
+    parser.add_argument("--requests", type=int, default=300, help="bench: calls per configuration")
+    parser.add_argument("--concurrency", type=int, default=8, help="bench: calls in flight")
+    parser.add_argument("--stream", action="store_true", help="bench: measure time to first streamed token")
+    args = parser.parse_args()
+
+    settings = StubSettings(args.base_ms, args.tail_ms, args.tail_rate, args.token_ms)
+    if args.command == "serve":
+        server = start_stub_server(settings, args.host, args.port)
+        print(f"Stub LLM listening on http://{args.host}:{server.server_port}/v1")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    server = start_stub_server(settings, args.host, 0)
+    base_url = f"http://{args.host}:{server.server_port}/v1"
+    for hedge in (False, True):
+        print(json.dumps(run_bench(base_url, args.requests, args.concurrency, hedge, args.stream)))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
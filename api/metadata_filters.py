@@ -0,0 +1,122 @@
+"""
+Finans Akademi - Metadata Filters
+Per-field partitions of the indexed chunks (type, section, week, day,
+source) used to restrict searches to a subset of the vectors
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+import numpy as np
+
+FILTER_FIELDS = ("type", "section", "week", "day", "source")
+
+# Week/day titles ("Hafta 3 - Temel Analiz", "3. Gün") are matched by their number
+NUMBERED_FIELDS = ("week", "day")
+
+FilterValue = Union[str, int, List[Union[str, int]]]
+
+# Only explicit lesson references ("Hafta 3", "3. hafta", "Gün 2", "2. gün"):
+# durations such as "30 gün vadeli" or "son 5 günde" name no lesson
+WEEK_PATTERN = re.compile(r"\bhafta\s*(\d+)\b|\b(\d+)\.\s*hafta", re.IGNORECASE)
+DAY_PATTERN = re.compile(r"\bg[üu]n\s*(\d+)\b|\b(\d+)\.\s*g[üu]n", re.IGNORECASE)
+
+
+def partition_value(field: str, value: Any) -> str:
+    """Normalized partition key of a metadata value"""
+    text = str(value).strip()
+    if field in NUMBERED_FIELDS:
+        number = re.search(r"\d+", text)
+        if number:
+            return str(int(number.group()))
+    return text.casefold()
+
+
+def normalize_filters(filters: Optional[Dict[str, FilterValue]]) -> Dict[str, Set[str]]:
+    """
+    Validate filters and normalize their values
+
+    Each field maps to one value or a list of values; a chunk matches
+    when, for every field, its value is one of the listed ones.
+
+    Raises:
+        ValueError: for unknown fields or empty value lists
+    """
+    normalized: Dict[str, Set[str]] = {}
+    for field, values in (filters or {}).items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field: {field} (expected one of {FILTER_FIELDS})")
+        if not isinstance(values, list):
+            values = [values]
+        if not values:
+            raise ValueError(f"Filter {field} has no values")
+        normalized[field] = {partition_value(field, value) for value in values}
+    return normalized
+
+
+def infer_filters(question: str) -> Dict[str, str]:
+    """Scope named in the question itself ("Hafta 3'te ...", "2. gün") as filters"""
+    inferred = {}
+    for field, pattern in (("week", WEEK_PATTERN), ("day", DAY_PATTERN)):
+        match = pattern.search(question)
+        if match:
+            inferred[field] = match.group(1) or match.group(2)
+    return inferred
+
+
+def partition_counts(metadata: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Chunk count per value of each field (PartitionIndex.summary without the postings)"""
+    counts: Dict[str, Dict[str, int]] = {field: {} for field in FILTER_FIELDS}
+    for meta in metadata:
+        for field in FILTER_FIELDS:
+            if meta.get(field) not in (None, ""):
+                value = partition_value(field, meta[field])
+                counts[field][value] = counts[field].get(value, 0) + 1
+    return counts
+
+
+class PartitionIndex:
+    """
+    Sorted chunk positions per (field, value)
+
+    Built once per index snapshot from the chunk metadata. positions()
+    intersects the postings of the requested fields, so a filtered search
+    knows exactly which vectors it may score.
+    """
+
+    def __init__(self, metadata: Iterable[Dict[str, Any]]):
+        postings: Dict[str, Dict[str, List[int]]] = {field: {} for field in FILTER_FIELDS}
+        count = 0
+        for position, meta in enumerate(metadata):
+            count += 1
+            for field in FILTER_FIELDS:
+                if meta.get(field) not in (None, ""):
+                    postings[field].setdefault(partition_value(field, meta[field]), []).append(position)
+
+        self.count = count
+        self._postings = {
+            field: {value: np.array(positions, dtype="int64") for value, positions in values.items()}
+            for field, values in postings.items()
+        }
+
+    def positions(self, filters: Dict[str, Set[str]], exclude: Optional[Set[int]] = None) -> np.ndarray:
+        """Sorted positions matching normalized filters, minus exclude"""
+        matched: Optional[np.ndarray] = None
+        for field, values in filters.items():
+            field_postings = self._postings[field]
+            parts = [field_postings[value] for value in values if value in field_postings]
+            field_positions = np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype="int64")
+            matched = field_positions if matched is None else np.intersect1d(matched, field_positions, assume_unique=True)
+
+        if matched is None:
+            matched = np.arange(self.count, dtype="int64")
+        if exclude:
+            matched = matched[~np.isin(matched, np.fromiter(exclude, dtype="int64", count=len(exclude)))]
+        return matched
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Chunk count per value of each field"""
+        return {
+            field: {value: len(positions) for value, positions in values.items()}
+            for field, values in self._postings.items()
+        }
@@ -0,0 +1,285 @@
+"""
+Finans Akademi - Metrics
+Minimal Prometheus-style counters, gauges and histograms for the chat pipeline
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds (embedding is ~ms, LLM calls are seconds)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [
+                f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())
+            ]
+
+
+class Gauge(_Metric):
+    """Point-in-time value, either set explicitly or read from a callback"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, fn: Callable[[], float], **labels):
+        """Read the value from fn() at scrape time"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = fn
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+
+        for key, fn in functions.items():
+            try:
+                values[key] = fn()
+            except Exception:
+                continue
+
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values (seconds)"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> (bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall-clock duration of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets or DEFAULT_BUCKETS))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Chat pipeline metrics
+STAGE_LATENCY = REGISTRY.histogram(
+    "finans_chat_stage_seconds",
+    "Latency of chat pipeline stages",
+    ["stage"]  # queue_wait, query_embedding, faiss_search, context_assembly, llm, web_search
+)
+REQUEST_LATENCY = REGISTRY.histogram(
+    "finans_chat_request_seconds",
+    "Total latency of chat requests",
+    ["endpoint"]
+)
+RESPONSES = REGISTRY.counter(
+    "finans_chat_responses_total",
+    "Chat responses by source type",
+    ["source_type"]
+)
+WEB_SEARCHES = REGISTRY.counter(
+    "finans_web_searches_total",
+    "Web searches by trigger",
+    ["trigger"]  # forced, low_confidence, speculative_unused
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "finans_cache_lookups_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"]  # result: hit, miss (web_search also: stale, coalesced)
+)
+CHAT_QUEUE = REGISTRY.gauge(
+    "finans_chat_queue_jobs",
+    "Chat worker pool jobs by state",
+    ["state"]  # running, streaming, queued
+)
+EMBEDDING_BATCH_SIZE = REGISTRY.histogram(
+    "finans_embedding_batch_size",
+    "Queries encoded per micro-batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+FILTERED_SEARCHES = REGISTRY.counter(
+    "finans_filtered_searches_total",
+    "Metadata-filtered searches by execution path",
+    ["path"]  # exact (scored subset), selector (ANN restricted to subset), empty
+)
+FILTERED_SEARCH_FRACTION = REGISTRY.histogram(
+    "finans_filtered_search_fraction",
+    "Share of the indexed vectors a filtered search may score",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+CONTEXT_TOKENS = REGISTRY.histogram(
+    "finans_prompt_context_tokens",
+    "Tokens of packed prompt context by part",
+    ["part"],  # site, web
+    buckets=(64, 128, 256, 512, 1024, 1536, 2048, 4096)
+)
+CONTEXT_TOKENS_SAVED = REGISTRY.counter(
+    "finans_prompt_context_tokens_saved_total",
+    "Site context tokens saved by packing vs. sending every retrieved chunk verbatim"
+)
+LLM_CALLS = REGISTRY.counter(
+    "finans_llm_calls_total",
+    "LLM calls by call type and outcome",
+    ["call", "outcome"]  # call: generate, stream; outcome: ok, timeout, error
+)
+LLM_HEDGES = REGISTRY.counter(
+    "finans_llm_hedges_total",
+    "Hedged (backup) LLM requests",
+    ["result"]  # fired, won (the backup answered first)
+)
+AUDIT_LOG = REGISTRY.gauge(
+    "finans_audit_log_rows",
+    "Audit log write-behind queue rows by state",
+    ["state"]  # backlog, written, dropped, failed, rejected
+)
+ERRORS = REGISTRY.counter(
+    "finans_errors_total",
+    "Errors by component",
+    ["component"]
+)
+
+
+def time_stage(stage: str):
+    """Context manager timing one pipeline stage"""
+    return STAGE_LATENCY.time(stage=stage)
@@ -5,26 +5,144 @@ LangChain + FAISS + GPT-4 for Turkish finance Q&A
 
 import os
 import json
+import dataclasses
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Iterator, Callable, Set, Sequence
 from datetime import datetime
 
-import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from loguru import logger
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.docstore.document import Document
-from langchain_openai import ChatOpenAI
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
+# faiss, sentence_transformers (torch) and langchain are imported lazily
+# where they are used, so that importing this module stays cheap and the
+# API process can answer liveness probes while models warm up
+
+from semantic_cache import SemanticAnswerCache
+from embedding_cache import QueryEmbeddingCache
+from embedding_batcher import EmbeddingBatcher
+from embedding_backends import EmbeddingBackend, create_embedding_backend
+from ann_index import (
+    IndexConfig, new_index, training_sample_size, search_parameters, supports_selector, recall_report, memory_report
+)
+from incremental_index import ChunkEmbeddingStore, chunk_key, text_hash, plan_update
+from build_pipeline import PeakRSSMonitor, chunk_documents, children_peak_rss, disk_buffer, run_pipelined
+from dedup import dedupe_documents, dedupe_chunks
+from context_packer import ContextPacker
+from llm_client import AsyncLLMClient
+from document_store import DocumentStore, write_document_store, migrate_json
+from glossary import TermGlossary, GlossaryStats
+from metadata_filters import PartitionIndex, FilterValue, normalize_filters, infer_filters, partition_counts
+from metrics import (
+    CACHE_LOOKUPS, STAGE_LATENCY, FILTERED_SEARCHES, FILTERED_SEARCH_FRACTION, CONTEXT_TOKENS, CONTEXT_TOKENS_SAVED,
+    time_stage
+)
+
+
+# progress(stage, fraction) callback used while building an index
+ProgressCallback = Callable[[str, float], None]
+
+
+_DIRECT_MAP_LOCK = threading.Lock()
+
+
+@dataclass
+class IndexSnapshot:
+    """
+    A built FAISS index together with its chunks and metadata
+
+    Snapshots are never mutated after being published; a rebuild creates
+    a new one and swaps it in, so searches always see a consistent view.
+    FAISS positions double as chunk ids: documents/metadata are aligned
+    with them, and positions of removed chunks are tombstoned (excluded
+    from searches) until the next compaction renumbers them. Loaded
+    snapshots read documents/metadata lazily from the document store.
+    """
+    index: Any
+    documents: Sequence[str]
+    metadata: Sequence[Dict[str, Any]]
+    config: IndexConfig = field(default_factory=IndexConfig)
+    recall: Dict[str, Any] = field(default_factory=dict)
+    tombstones: Set[int] = field(default_factory=set)
+    build_stats: Dict[str, Any] = field(default_factory=dict)
+    glossary: Optional[TermGlossary] = None
+    # Chunks per metadata value, counted at build time and saved with the index
+    partition_counts: Optional[Dict[str, Dict[str, int]]] = None
+    generation: int = 0
+    built_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    readers: int = 0
+    _keys: Optional[List[str]] = field(default=None, repr=False)
+    _selector: Any = field(default=None, repr=False)
+    _partitions: Optional[PartitionIndex] = field(default=None, repr=False)
+
+    @property
+    def live_count(self) -> int:
+        """Number of searchable (non-tombstoned) chunks"""
+        return len(self.documents) - len(self.tombstones)
+
+    def keys(self) -> List[str]:
+        """chunk_key of every position, computed on first use"""
+        if self._keys is None:
+            self._keys = [chunk_key(text, meta) for text, meta in zip(self.documents, self.metadata)]
+        return self._keys
+
+    def id_selector(self):
+        """FAISS selector excluding tombstoned positions (None when there are none)"""
+        if not self.tombstones:
+            return None
+        if self._selector is None:
+            import faiss
+
+            ids = np.array(sorted(self.tombstones), dtype="int64")
+            excluded = faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+            selector = faiss.IDSelectorNot(excluded)
+            # IDSelectorNot does not own its argument; keep both alive
+            selector.referenced_objects = [excluded]
+            self._selector = selector
+        return self._selector
+
+    def partitions(self) -> PartitionIndex:
+        """Chunk positions per metadata value, built on first use"""
+        if self._partitions is None:
+            self._partitions = PartitionIndex(self.metadata)
+        return self._partitions
+
+    def partition_summary(self) -> Dict[str, Dict[str, int]]:
+        """
+        Chunk count per value of each field
+
+        Built snapshots count their in-memory metadata once; loaded ones
+        use the counts saved with the index, so stats never decode the
+        lazily mapped metadata (indexes saved without counts do, once).
+        """
+        if self.partition_counts is None:
+            if self._partitions is not None:
+                self.partition_counts = self._partitions.summary()
+            else:
+                self.partition_counts = partition_counts(self.metadata)
+        return self.partition_counts
+
+    def reconstruct(self, positions: np.ndarray) -> np.ndarray:
+        """Stored (possibly quantized) vectors at positions"""
+        import faiss
+
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+            # IVF indexes need a position -> list map to reconstruct by id
+            with _DIRECT_MAP_LOCK:
+                if ivf.direct_map.type == faiss.DirectMap.NoMap:
+                    ivf.make_direct_map()
+        return self.index.reconstruct_batch(positions)
 
 
 class FinansRAGChatbot:
     """RAG-based chatbot for Finans Akademi using FAISS and LangChain"""
 
+    NO_CONTEXT_ANSWER = "Bu konuda sitemizdeki içeriklerde yeterli bilgi bulamadım. Daha spesifik bir soru sorabilir veya web araması yapabilirim."
+
     def __init__(
         self,
         openai_api_key: str,
@@ -32,30 +150,122 @@ class FinansRAGChatbot:
         embedding_model: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
         llm_model: str = "gpt-4-turbo-preview",
         top_k: int = 5,
-        similarity_threshold: float = 0.7
+        similarity_threshold: float = 0.7,
+        answer_cache_enabled: bool = True,
+        answer_cache_similarity: float = 0.92,
+        answer_cache_size: int = 1000,
+        answer_cache_ttl: int = 3600,
+        index_mmap: bool = False,
+        index_config: Optional[IndexConfig] = None,
+        query_cache_size: int = 10000,
+        query_cache_path: Optional[str] = None,
+        embedding_batch_size: int = 32,
+        embedding_batch_wait_ms: float = 2.0,
+        embedding_backend: str = "sentence_transformers",
+        onnx_model_path: Optional[str] = None,
+        onnx_threads: int = 0,
+        glossary_enabled: bool = True,
+        glossary_fuzzy_threshold: float = 0.85,
+        filter_exact_max: int = 2048,
+        auto_filters: bool = False,
+        build_workers: int = 0,
+        encoder_processes: int = 1,
+        dedup_enabled: bool = True,
+        dedup_threshold: float = 0.85,
+        context_token_budget: int = 1500,
+        llm_base_url: Optional[str] = None,
+        llm_timeout: float = 30.0,
+        llm_max_connections: int = 20,
+        llm_hedge: bool = False,
+        llm_hedge_percentile: float = 95.0
     ):
         self.openai_api_key = openai_api_key
         self.faiss_index_path = Path(faiss_index_path)
+        self.index_mmap = index_mmap
+        # Index type for new builds; nprobe/ef_search apply to every search
+        self.index_config = index_config or IndexConfig()
         self.top_k = top_k
         self.similarity_threshold = similarity_threshold
 
-        # Initialize embedding model (Türkçe destekli)
-        logger.info(f"Loading embedding model: {embedding_model}")
-        self.embedding_model = SentenceTransformer(embedding_model)
-        self.embedding_dim = self.embedding_model.get_sentence_embedding_dimension()
-
-        # Initialize FAISS index
-        self.index = None
-        self.documents = []
-        self.document_metadata = []
-
-        # Initialize LLM
-        logger.info(f"Initializing LLM: {llm_model}")
-        self.llm = ChatOpenAI(
-            model=llm_model,
-            temperature=0.7,
-            openai_api_key=openai_api_key
-        )
+        self.embedding_model_name = embedding_model
+        # Encoder implementation: PyTorch Sentence Transformers or an exported ONNX model
+        self.embedding_backend = embedding_backend
+        self.onnx_model_path = onnx_model_path
+        self.onnx_threads = onnx_threads
+        self.llm_model = llm_model
+        # Pooled async client: per-call deadline and optional hedging of slow calls
+        self.llm_base_url = llm_base_url
+        self.llm_timeout = llm_timeout
+        self.llm_max_connections = llm_max_connections
+        self.llm_hedge = llm_hedge
+        self.llm_hedge_percentile = llm_hedge_percentile
+
+        # Heavy components are created on first use or by warm_up()
+        self._embedding_model = None
+        self._llm = None
+        self._prompt_template = None
+        # One lock per component so warm_up() can initialize them in parallel
+        self._model_lock = threading.Lock()
+        self._llm_lock = threading.Lock()
+        self._index_load_lock = threading.Lock()
+        self._answer_cache_lock = threading.Lock()
+        self._query_cache_lock = threading.Lock()
+        self._index_load_attempted = False
+        self.startup_timings: Dict[str, float] = {}
+        self.ready = False
+
+        # FAISS index snapshot (swapped atomically on rebuild)
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._snapshot_lock = threading.Lock()
+        self._retired_snapshots: List[IndexSnapshot] = []
+        self._generation = 0
+
+        # Semantic answer cache (reuses answers for near-identical questions)
+        self.answer_cache_enabled = answer_cache_enabled
+        self._answer_cache_settings = {
+            "similarity_threshold": answer_cache_similarity,
+            "max_entries": answer_cache_size,
+            "ttl_seconds": answer_cache_ttl
+        }
+        self._answer_cache = None
+
+        # Query embedding cache (skips the encoder for repeated questions)
+        self._query_cache_settings = {
+            "max_entries": query_cache_size,
+            "persist_path": query_cache_path
+        }
+        self._query_cache = None
+
+        # Concurrent query embeddings are encoded together (disabled when batch size <= 1)
+        self.embedding_batcher = None
+        if embedding_batch_size > 1:
+            self.embedding_batcher = EmbeddingBatcher(
+                self.create_embeddings,
+                max_batch=embedding_batch_size,
+                max_wait_ms=embedding_batch_wait_ms
+            )
+
+        # Index builds: chunking processes (0 = one per CPU) and encoder processes (1 = in-process)
+        self.build_workers = build_workers or os.cpu_count() or 1
+        self.encoder_processes = encoder_processes
+
+        # Duplicate documents/chunks (exact, contained or >= dedup_threshold similar) are not indexed
+        self.dedup_enabled = dedup_enabled
+        self.dedup_threshold = dedup_threshold
+
+        # Retrieved chunks are merged per document and packed into this many prompt tokens
+        self.context_packer = ContextPacker(context_token_budget, llm_model)
+
+        # Filtered searches over at most filter_exact_max vectors score them
+        # exactly; larger subsets use the ANN index with an ID selector.
+        # auto_filters scopes "Hafta 3'te ..." style questions to that week.
+        self.filter_exact_max = filter_exact_max
+        self.auto_filters = auto_filters
+
+        # Definition questions answered straight from term cards (no LLM call)
+        self.glossary_enabled = glossary_enabled
+        self.glossary_fuzzy_threshold = glossary_fuzzy_threshold
+        self.glossary_stats = GlossaryStats()
 
         # Turkish system prompt
         self.system_prompt = """Sen Finans Akademi'nin yapay zeka asistanısın. Adın Finans Asistan.
@@ -81,91 +291,806 @@ Soru: {question}
 
 Cevap:"""
 
-        self.prompt_template = PromptTemplate(
-            template=self.system_prompt,
-            input_variables=["context", "question"]
+    @property
+    def embedding_model(self) -> EmbeddingBackend:
+        """Embedding backend (Türkçe destekli model), loaded on first use"""
+        if self._embedding_model is None:
+            with self._model_lock:
+                if self._embedding_model is None:
+                    with self._startup_timer("embedding_model"):
+                        logger.info(f"Loading embedding model: {self.embedding_model_id}")
+                        self._embedding_model = create_embedding_backend(
+                            self.embedding_backend,
+                            model_name=self.embedding_model_name,
+                            onnx_model_path=self.onnx_model_path,
+                            num_threads=self.onnx_threads
+                        )
+        return self._embedding_model
+
+    @property
+    def embedding_model_id(self) -> str:
+        """
+        Identity of the vectors this chatbot produces
+
+        Stored with cached and persisted embeddings, so switching backend
+        invalidates them instead of mixing vectors from different encoders.
+        """
+        if self.embedding_backend == "sentence_transformers":
+            return self.embedding_model_name
+        return f"{self.embedding_model_name}#{self.embedding_backend}:{Path(self.onnx_model_path or '').name}"
+
+    @property
+    def embedding_dim(self) -> int:
+        return self.embedding_model.dimension
+
+    @property
+    def llm(self) -> AsyncLLMClient:
+        """Shared LLM client, created on first use"""
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    with self._startup_timer("llm_client"):
+                        logger.info(f"Initializing LLM: {self.llm_model}")
+                        self._llm = AsyncLLMClient(
+                            api_key=self.openai_api_key,
+                            model=self.llm_model,
+                            base_url=self.llm_base_url,
+                            temperature=0.7,
+                            timeout=self.llm_timeout,
+                            max_connections=self.llm_max_connections,
+                            hedge=self.llm_hedge,
+                            hedge_percentile=self.llm_hedge_percentile
+                        )
+                        self._llm.warm_up()
+        return self._llm
+
+    @property
+    def prompt_template(self):
+        if self._prompt_template is None:
+            from langchain.prompts import PromptTemplate
+
+            self._prompt_template = PromptTemplate(
+                template=self.system_prompt,
+                input_variables=["context", "question"]
+            )
+        return self._prompt_template
+
+    @property
+    def answer_cache(self) -> Optional[SemanticAnswerCache]:
+        """Semantic answer cache (None when disabled), created on first use"""
+        if not self.answer_cache_enabled:
+            return None
+        if self._answer_cache is None:
+            with self._answer_cache_lock:
+                if self._answer_cache is None:
+                    self._answer_cache = SemanticAnswerCache(
+                        embedding_dim=self.embedding_dim,
+                        **self._answer_cache_settings
+                    )
+        return self._answer_cache
+
+    @property
+    def query_cache(self) -> Optional[QueryEmbeddingCache]:
+        """Query embedding cache (None when query_cache_size is 0), created on first use"""
+        if self._query_cache_settings["max_entries"] <= 0:
+            return None
+        if self._query_cache is None:
+            with self._query_cache_lock:
+                if self._query_cache is None:
+                    with self._startup_timer("query_cache"):
+                        self._query_cache = QueryEmbeddingCache(
+                            model_name=self.embedding_model_id,
+                            **self._query_cache_settings
+                        )
+        return self._query_cache
+
+    def close(self):
+        """Release the LLM connection pool"""
+        if self._llm is not None:
+            self._llm.close()
+
+    def save_query_cache(self):
+        """Persist the query embedding cache (if it was created and has a path)"""
+        if self._query_cache is not None:
+            self._query_cache.save()
+
+    @contextmanager
+    def _startup_timer(self, component: str) -> Iterator[None]:
+        """Record how long initializing a component took"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_timings[component] = round(time.perf_counter() - start, 3)
+
+    def ensure_index_loaded(self):
+        """Load the FAISS index from disk once, if it exists"""
+        if self._index_load_attempted:
+            return
+
+        with self._index_load_lock:
+            if self._index_load_attempted:
+                return
+
+            if (self.faiss_index_path / "index.faiss").exists():
+                with self._startup_timer("faiss_index"):
+                    self.load_index()
+            else:
+                logger.info("FAISS index not found. Will create on first indexing.")
+            self._index_load_attempted = True
+
+    def _warm_up_tasks(self, run_test_query: bool = True) -> Dict[str, Callable[[], Any]]:
+        """Components initialized in parallel by warm_up()"""
+        if run_test_query:
+            warm_model = lambda: self.embed_query("hisse senedi")
+        else:
+            warm_model = lambda: self.embedding_model
+
+        return {
+            "embedding_model": warm_model,
+            "faiss_index": self.ensure_index_loaded,
+            "llm_client": lambda: self.llm,
+            "query_cache": lambda: self.query_cache,
+        }
+
+    def warm_up(self, run_test_query: bool = True) -> Dict[str, float]:
+        """
+        Load the model, index and clients in parallel
+
+        Sets ready once everything is initialized and returns the startup
+        timing breakdown (seconds per component, plus total).
+
+        Args:
+            run_test_query: Encode one query to warm up the model's kernels.
+                Disable when preloading before fork(), since torch thread
+                pools do not survive forking.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        start = time.perf_counter()
+        tasks = self._warm_up_tasks(run_test_query)
+
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="warm-up") as pool:
+            futures = {name: pool.submit(task) for name, task in tasks.items()}
+            for name, future in futures.items():
+                future.result()
+
+        self.startup_timings["total"] = round(time.perf_counter() - start, 3)
+        self.ready = True
+
+        logger.info(f"✅ Chatbot warm-up finished: {self.startup_timings}")
+        return dict(self.startup_timings)
+
+    def create_embeddings(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """Create normalized embeddings for texts with the configured backend"""
+        logger.debug(f"Creating embeddings for {len(texts)} texts")
+        return self.embedding_model.encode(texts, show_progress_bar=show_progress_bar)
+
+    @property
+    def index(self):
+        """Current FAISS index (None until built or loaded)"""
+        snapshot = self._snapshot
+        return snapshot.index if snapshot else None
+
+    @property
+    def documents(self) -> Sequence[str]:
+        """Chunks of the current index"""
+        snapshot = self._snapshot
+        return snapshot.documents if snapshot else []
+
+    @property
+    def document_metadata(self) -> Sequence[Dict[str, Any]]:
+        """Chunk metadata of the current index"""
+        snapshot = self._snapshot
+        return snapshot.metadata if snapshot else []
+
+    @property
+    def document_count(self) -> int:
+        """Searchable chunks in the current index (tombstones excluded)"""
+        snapshot = self._snapshot
+        return snapshot.live_count if snapshot else 0
+
+    @property
+    def index_generation(self) -> int:
+        """Generation number of the current index (0 = none loaded)"""
+        snapshot = self._snapshot
+        return snapshot.generation if snapshot else 0
+
+    @contextmanager
+    def _use_snapshot(self) -> Iterator[Optional[IndexSnapshot]]:
+        """Pin the current snapshot for the duration of a search"""
+        self.ensure_index_loaded()
+
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is not None:
+                snapshot.readers += 1
+
+        try:
+            yield snapshot
+        finally:
+            if snapshot is not None:
+                with self._snapshot_lock:
+                    snapshot.readers -= 1
+                    self._drop_drained_snapshots()
+
+    def _swap_snapshot(self, snapshot: IndexSnapshot):
+        """Publish a new snapshot; the old one lives until its searches drain"""
+        with self._snapshot_lock:
+            self._generation += 1
+            snapshot.generation = self._generation
+
+            if self._snapshot is not None:
+                self._retired_snapshots.append(self._snapshot)
+            self._snapshot = snapshot
+            self._index_load_attempted = True
+            self._drop_drained_snapshots()
+
+        # Cached answers were generated from the old index
+        if self._answer_cache is not None:
+            self._answer_cache.clear()
+
+        logger.info(f"Index generation {snapshot.generation} active ({len(snapshot.documents)} chunks)")
+
+    def _drop_drained_snapshots(self):
+        """Release retired snapshots with no in-flight searches (lock must be held)"""
+        self._retired_snapshots = [s for s in self._retired_snapshots if s.readers > 0]
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        """Generation and in-flight reader counts"""
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            return {
+                "generation": snapshot.generation if snapshot else 0,
+                "built_at": snapshot.built_at if snapshot else None,
+                "index_type": snapshot.config.index_type if snapshot else None,
+                "build_params": snapshot.config.built_with if snapshot else {},
+                "search_params": self.search_params(),
+                "recall": snapshot.recall if snapshot else {},
+                "live_chunks": snapshot.live_count if snapshot else 0,
+                "tombstones": len(snapshot.tombstones) if snapshot else 0,
+                "partitions": snapshot.partition_summary() if snapshot else {},
+                "glossary_terms": len(snapshot.glossary) if snapshot and snapshot.glossary else 0,
+                "last_build": snapshot.build_stats if snapshot else {},
+                "active_readers": snapshot.readers if snapshot else 0,
+                "retired_snapshots": len(self._retired_snapshots),
+                "retired_readers": sum(s.readers for s in self._retired_snapshots),
+            }
+
+    def search_params(self) -> Dict[str, int]:
+        """Query-time parameters applied to IVF (nprobe) and HNSW (ef_search) indexes"""
+        return {"nprobe": self.index_config.nprobe, "ef_search": self.index_config.ef_search}
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Tune recall vs latency of the live index without rebuilding"""
+        if nprobe is not None:
+            self.index_config.nprobe = nprobe
+        if ef_search is not None:
+            self.index_config.ef_search = ef_search
+        logger.info(f"Search params set to {self.search_params()}")
+
+    def _search_index(
+        self,
+        snapshot: IndexSnapshot,
+        queries: np.ndarray,
+        top_k: int,
+        filters: Optional[Dict[str, Set[str]]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Search the snapshot's FAISS index, excluding tombstoned positions"""
+        if filters:
+            positions = snapshot.partitions().positions(filters, exclude=snapshot.tombstones)
+            return self._search_subset(snapshot, queries, top_k, positions)
+
+        sel = snapshot.id_selector()
+        fetch_k = top_k
+        if sel is not None and not supports_selector(snapshot.index):
+            # Over-fetch instead; _collect_hits drops the tombstones
+            sel, fetch_k = None, top_k + len(snapshot.tombstones)
+
+        params = search_parameters(
+            snapshot.index,
+            nprobe=self.index_config.nprobe,
+            ef_search=self.index_config.ef_search,
+            sel=sel
         )
+        return snapshot.index.search(queries, fetch_k, params=params)
 
-        # Load or create FAISS index
-        if self.faiss_index_path.exists():
-            self.load_index()
-        else:
-            logger.info("FAISS index not found. Will create on first indexing.")
-
-    def create_embeddings(self, texts: List[str]) -> np.ndarray:
-        """Create embeddings for texts using Sentence Transformers"""
-        logger.info(f"Creating embeddings for {len(texts)} texts")
-        embeddings = self.embedding_model.encode(
-            texts,
-            show_progress_bar=True,
-            normalize_embeddings=True
+    def _search_subset(
+        self,
+        snapshot: IndexSnapshot,
+        queries: np.ndarray,
+        top_k: int,
+        positions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search only the vectors at positions (sorted)
+
+        Small subsets are scored exactly against their stored vectors, so
+        the cost is proportional to the subset. Larger ones go through the
+        ANN index with an ID selector; IVF nprobe / HNSW efSearch are raised
+        by the inverse of the subset's share so enough matches are visited.
+        """
+        import faiss
+
+        distances = np.full((len(queries), top_k), -np.inf, dtype="float32")
+        indices = np.full((len(queries), top_k), -1, dtype="int64")
+        FILTERED_SEARCH_FRACTION.observe(len(positions) / max(1, snapshot.index.ntotal))
+
+        if len(positions) == 0:
+            FILTERED_SEARCHES.inc(path="empty")
+            return distances, indices
+
+        if len(positions) <= self.filter_exact_max or not supports_selector(snapshot.index):
+            FILTERED_SEARCHES.inc(path="exact")
+            scores = queries @ snapshot.reconstruct(positions).T
+            k = min(top_k, len(positions))
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            distances[:, :k] = np.take_along_axis(top_scores, order, axis=1)
+            indices[:, :k] = positions[np.take_along_axis(top, order, axis=1)]
+            return distances, indices
+
+        FILTERED_SEARCHES.inc(path="selector")
+        scale = min(8.0, snapshot.index.ntotal / len(positions))
+        sel = faiss.IDSelectorBatch(len(positions), faiss.swig_ptr(positions))
+        params = search_parameters(
+            snapshot.index,
+            nprobe=int(np.ceil(self.index_config.nprobe * scale)),
+            ef_search=max(top_k, int(np.ceil(self.index_config.ef_search * scale))),
+            sel=sel
         )
-        return embeddings.astype('float32')
+        return snapshot.index.search(queries, top_k, params=params)
 
-    def build_index(self, documents: List[Dict[str, Any]]):
-        """Build FAISS index from documents"""
-        logger.info(f"Building FAISS index from {len(documents)} documents")
+    def build_index(
+        self,
+        documents: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None,
+        incremental: bool = True
+    ):
+        """Build FAISS index from documents, save it and swap it in"""
+        embedding_store = ChunkEmbeddingStore(
+            self.faiss_index_path / "chunk_embeddings.npz",
+            self.embedding_model_id
+        )
+        snapshot = self.build_snapshot(documents, progress, incremental=incremental, embedding_store=embedding_store)
+
+        if snapshot is self._snapshot:
+            if progress:
+                progress("done", 1.0)
+            logger.info("✅ FAISS index is up to date, nothing to rebuild")
+            return snapshot
+
+        if progress:
+            progress("saving", 0.0)
+        self.save_index(snapshot)
+        embedding_store.save(keep={
+            text_hash(text) for position, text in enumerate(snapshot.documents)
+            if position not in snapshot.tombstones
+        })
+
+        # Serve chunks from the saved document store rather than the build's
+        # lists, and with index_mmap the vectors from the saved index file
+        store = DocumentStore(self.faiss_index_path / "documents.bin")
+        changes = {"documents": store.texts, "metadata": store.metadata}
+        if self.index_mmap:
+            changes["index"] = self._read_index(snapshot.config)
+        snapshot = dataclasses.replace(snapshot, **changes)
+        self._swap_snapshot(snapshot)
+
+        if progress:
+            progress("done", 1.0)
+
+        pipeline = snapshot.build_stats.get("pipeline", {})
+        logger.info(
+            f"✅ FAISS index built with {snapshot.live_count} vectors in {pipeline.get('seconds')}s "
+            f"({pipeline.get('chunks_per_second')} chunks/s, peak RSS {pipeline.get('peak_rss_mb')} MB): "
+            f"{snapshot.build_stats}"
+        )
+        return snapshot
+
+    def build_snapshot(
+        self,
+        documents: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None,
+        embedding_batch_size: int = 256,
+        incremental: bool = True,
+        embedding_store: Optional[ChunkEmbeddingStore] = None
+    ) -> IndexSnapshot:
+        """
+        Build a new index snapshot without touching the live one
+
+        With incremental=True the new chunks are diffed against the live
+        snapshot by content hash: unchanged chunks keep their vectors and
+        positions, removed ones are tombstoned and only new ones are added.
+        Once tombstones exceed config.compact_ratio (or the index type
+        changed) the index is rebuilt from scratch. Either way, chunks
+        found in embedding_store are not re-encoded. Returns the live
+        snapshot itself when nothing changed.
+
+        Duplicate documents and chunks are dropped first (dedup_enabled);
+        build_stats["dedup"] reports what that removed. The build is a
+        pipeline: documents are chunked by build_workers
+        processes, chunks are encoded in length-sorted batches (across
+        encoder_processes when > 1) and each batch is added to the index
+        while the next one is encoded. Embeddings are buffered on disk,
+        so memory does not grow with the corpus; throughput and peak RSS
+        are reported in build_stats["pipeline"].
+        """
+        build_start = time.perf_counter()
+        stages: Dict[str, float] = {}
+        batch_size = embedding_batch_size * max(1, self.encoder_processes)
+
+        with PeakRSSMonitor() as rss:
+            dedup_reports = {}
+            if self.dedup_enabled:
+                stage_start = time.perf_counter()
+                documents, dedup_reports["documents"] = dedupe_documents(documents, self.dedup_threshold)
+                stages["dedup"] = time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            all_chunks, all_metadata = self._chunk_documents(documents, progress)
+            stages["chunking"] = time.perf_counter() - stage_start
+
+            if self.dedup_enabled:
+                stage_start = time.perf_counter()
+                all_chunks, all_metadata, dedup_reports["chunks"] = dedupe_chunks(
+                    all_chunks, all_metadata, self.dedup_threshold
+                )
+                stages["dedup"] += time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            keys = [chunk_key(chunk, meta) for chunk, meta in zip(all_chunks, all_metadata)]
+            glossary = TermGlossary.build(
+                ((doc["content"], doc["metadata"]) for doc in documents),
+                self.glossary_fuzzy_threshold
+            )
+            stages["glossary"] = time.perf_counter() - stage_start
+
+            live = None
+            if incremental:
+                self.ensure_index_loaded()
+                live = self._snapshot
+                if live is not None and not (
+                    live.config.same_build(self.index_config)
+                    and live.build_stats.get("embedding_model", self.embedding_model_id) == self.embedding_model_id
+                ):
+                    logger.info("Index settings changed, rebuilding from scratch")
+                    live = None
+
+            snapshot = None
+            if live is not None:
+                plan = plan_update(live.keys(), live.tombstones, keys)
+                if not plan["added"] and not plan["removed"]:
+                    return live
+
+                tombstones = live.tombstones | plan["removed"]
+                total = len(live.documents) + len(plan["added"])
+                if len(tombstones) <= total * self.index_config.compact_ratio:
+                    snapshot = self._extend_snapshot(live, plan, all_chunks, all_metadata, keys, tombstones,
+                                                     embedding_store, batch_size, progress, glossary, stages)
+                else:
+                    logger.info(f"{len(tombstones)} of {total} vectors tombstoned, compacting")
+
+            if snapshot is None:
+                # Full build over the unique chunks
+                unique = list({key: position for position, key in reversed(list(enumerate(keys)))}.values())
+                unique.sort()
+                snapshot = self._build_full(
+                    [all_chunks[i] for i in unique],
+                    [all_metadata[i] for i in unique],
+                    [keys[i] for i in unique],
+                    embedding_store, batch_size, progress, glossary, stages
+                )
+
+        if dedup_reports:
+            snapshot.build_stats["dedup"] = self._dedup_report(dedup_reports, all_chunks, snapshot)
+
+        seconds = time.perf_counter() - build_start
+        encode_seconds = stages.get("embedding_indexing", 0.0) + stages.get("training", 0.0)
+        snapshot.build_stats["pipeline"] = {
+            "seconds": round(seconds, 3),
+            "chunks": len(all_chunks),
+            "chunks_per_second": round(len(all_chunks) / seconds, 1) if seconds else 0.0,
+            "embedded_per_second": (
+                round(snapshot.build_stats["embedded"] / encode_seconds, 1) if encode_seconds else 0.0
+            ),
+            "peak_rss_mb": round(rss.peak_bytes / 2**20, 1),
+            "worker_peak_rss_mb": round(children_peak_rss() / 2**20, 1),
+            "chunk_workers": self.build_workers,
+            "encoder_processes": self.encoder_processes,
+            "stage_seconds": {stage: round(value, 3) for stage, value in stages.items()},
+        }
+        return snapshot
 
-        # Text splitter for chunking large documents
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=50,
-            separators=["\n\n", "\n", ". ", " ", ""]
+    @staticmethod
+    def _dedup_report(
+        reports: Dict[str, Dict[str, Any]],
+        chunks: List[str],
+        snapshot: IndexSnapshot
+    ) -> Dict[str, Any]:
+        """Dedup reports plus the vectors and index bytes they saved"""
+        # Removed documents were never chunked; estimate their chunks from the kept ones
+        kept_bytes = sum(len(chunk.encode("utf-8")) for chunk in chunks)
+        bytes_per_chunk = kept_bytes / len(chunks) if chunks else 1.0
+        vectors_removed = (
+            sum(reports["chunks"]["removed"].values())
+            + round(reports["documents"]["removed_text_bytes"] / bytes_per_chunk)
         )
+        bytes_per_vector = snapshot.build_stats.get("memory", {}).get("bytes_per_vector", 0.0)
 
-        # Prepare documents and metadata
-        all_chunks = []
-        all_metadata = []
+        report = {
+            **reports,
+            "vectors_removed": vectors_removed,
+            "index_bytes_saved": round(vectors_removed * bytes_per_vector),
+            "text_bytes_saved": reports["documents"]["removed_text_bytes"] + reports["chunks"]["removed_text_bytes"],
+        }
+        logger.info(
+            f"Dedup removed {reports['documents']['input'] - reports['documents']['kept']} documents and "
+            f"{reports['chunks']['input'] - reports['chunks']['kept']} chunks "
+            f"(~{vectors_removed} vectors, {report['index_bytes_saved'] / 2**20:.1f} MB of index)"
+        )
+        return report
 
-        for doc in documents:
-            content = doc["content"]
-            metadata = doc["metadata"]
+    def _build_full(
+        self,
+        chunks: List[str],
+        metadata: List[Dict[str, Any]],
+        keys: List[str],
+        embedding_store: Optional[ChunkEmbeddingStore],
+        batch_size: int,
+        progress: Optional[ProgressCallback],
+        glossary: Optional[TermGlossary],
+        stages: Dict[str, float]
+    ) -> IndexSnapshot:
+        """Index chunks from scratch, training on a bounded sample and streaming the adds"""
+        # Similar lengths are encoded together (less padding); the snapshot
+        # keeps the chunks in that order since positions are only ids
+        order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]))
+        chunks = [chunks[i] for i in order]
+        metadata = [metadata[i] for i in order]
+        keys = [keys[i] for i in order]
+
+        # Inner Product on normalized vectors = cosine similarity
+        config = dataclasses.replace(self.index_config)
+        index = new_index(config, self.embedding_dim, len(chunks))
+        vectors = disk_buffer(self.faiss_index_path, len(chunks), self.embedding_dim)
+        embedded = 0
+
+        with self._build_encoder() as encode:
+            stage_start = time.perf_counter()
+            sample_size = training_sample_size(index, len(chunks))
+            trained = None
+            if sample_size:
+                if progress:
+                    progress("training", 0.0)
+                sample = np.sort(np.random.default_rng(0).choice(len(chunks), size=sample_size, replace=False))
+                embedded += self._embed_into(vectors, sample, chunks, embedding_store, encode, batch_size)
+                index.train(np.asarray(vectors[sample]))
+                trained = np.zeros(len(chunks), dtype=bool)
+                trained[sample] = True
+            stages["training"] = time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            embedded += self._stream_into_index(index, vectors, chunks, embedding_store, encode,
+                                                batch_size, progress, skip=trained)
+            stages["embedding_indexing"] = time.perf_counter() - stage_start
+
+        recall = {}
+        if config.recall_report:
+            if progress:
+                progress("recall_report", 0.0)
+            stage_start = time.perf_counter()
+            recall = recall_report(index, vectors, config, k=self.top_k)
+            stages["recall_report"] = time.perf_counter() - stage_start
+
+        if embedding_store is not None:
+            embedding_store.attach([text_hash(chunk) for chunk in chunks], vectors)
+
+        return IndexSnapshot(
+            index=index,
+            documents=chunks,
+            metadata=metadata,
+            config=config,
+            recall=recall,
+            build_stats={
+                "mode": "full",
+                "chunks": len(chunks),
+                "embedded": embedded,
+                "reused": len(chunks) - embedded,
+                "embedding_model": self.embedding_model_id,
+                "memory": memory_report(index, len(chunks), self.embedding_dim),
+            },
+            glossary=glossary,
+            _keys=keys
+        )
 
-            # Split long documents into chunks
-            chunks = text_splitter.split_text(content)
+    def _extend_snapshot(
+        self,
+        live: IndexSnapshot,
+        plan: Dict[str, Any],
+        all_chunks: List[str],
+        all_metadata: List[Dict[str, Any]],
+        keys: List[str],
+        tombstones: Set[int],
+        embedding_store: Optional[ChunkEmbeddingStore],
+        batch_size: int,
+        progress: Optional[ProgressCallback],
+        glossary: Optional[TermGlossary],
+        stages: Dict[str, float]
+    ) -> IndexSnapshot:
+        """Copy the live index, append the added chunks and tombstone the removed ones"""
+        import faiss
+
+        added = sorted(plan["added"], key=lambda i: len(all_chunks[i]))
+        chunks = [all_chunks[i] for i in added]
+        metadata = [all_metadata[i] for i in added]
+
+        # The live index is being searched; extend a copy of it. A mapped
+        # index cannot grow, so its copy is read from the saved file
+        if self.index_mmap:
+            index = faiss.read_index(str(self.faiss_index_path / "index.faiss"))
+        else:
+            index = faiss.clone_index(live.index)
+        vectors = disk_buffer(self.faiss_index_path, len(chunks), index.d)
 
-            for i, chunk in enumerate(chunks):
-                all_chunks.append(chunk)
-                chunk_metadata = metadata.copy()
-                chunk_metadata["chunk_id"] = i
-                chunk_metadata["total_chunks"] = len(chunks)
-                all_metadata.append(chunk_metadata)
+        stage_start = time.perf_counter()
+        with self._build_encoder() as encode:
+            embedded = self._stream_into_index(index, vectors, chunks, embedding_store, encode, batch_size, progress)
+        stages["embedding_indexing"] = time.perf_counter() - stage_start
 
-        logger.info(f"Created {len(all_chunks)} chunks from {len(documents)} documents")
+        if embedding_store is not None:
+            embedding_store.attach([text_hash(chunk) for chunk in chunks], vectors)
 
-        # Create embeddings
-        embeddings = self.create_embeddings(all_chunks)
+        logger.info(
+            f"Incremental update: {len(chunks)} added ({embedded} embedded), "
+            f"{len(plan['removed'])} removed, {plan['unchanged']} unchanged"
+        )
 
-        # Create FAISS index (using Inner Product for normalized vectors)
-        self.index = faiss.IndexFlatIP(self.embedding_dim)
-        self.index.add(embeddings)
+        return IndexSnapshot(
+            index=index,
+            documents=list(live.documents) + chunks,
+            metadata=list(live.metadata) + metadata,
+            config=live.config,
+            recall=live.recall,
+            tombstones=tombstones,
+            build_stats={
+                "mode": "incremental",
+                "added": len(chunks),
+                "removed": len(plan["removed"]),
+                "unchanged": plan["unchanged"],
+                "embedded": embedded,
+                "reused": len(chunks) - embedded,
+                "embedding_model": self.embedding_model_id,
+                "memory": memory_report(index, index.ntotal, index.d),
+            },
+            glossary=glossary,
+            _keys=live.keys() + [keys[i] for i in added]
+        )
 
-        # Store documents and metadata
-        self.documents = all_chunks
-        self.document_metadata = all_metadata
+    @contextmanager
+    def _build_encoder(self) -> Iterator[Callable[[List[str]], np.ndarray]]:
+        """Encode function for index builds (spread over encoder_processes when > 1)"""
+        if self.encoder_processes > 1:
+            with self.embedding_model.multi_process(self.encoder_processes) as encode:
+                yield encode
+        else:
+            yield self.create_embeddings
 
-        # Save index
-        self.save_index()
+    def _embed_into(
+        self,
+        vectors: np.ndarray,
+        positions: Sequence[int],
+        chunks: List[str],
+        embedding_store: Optional[ChunkEmbeddingStore],
+        encode: Callable[[List[str]], np.ndarray],
+        batch_size: int
+    ) -> int:
+        """Fill vectors[positions] from embedding_store, encoding the missing chunks; returns how many were encoded"""
+        missing = []
+        for position in positions:
+            vector = embedding_store.get(text_hash(chunks[position])) if embedding_store is not None else None
+            if vector is None:
+                missing.append(position)
+            else:
+                vectors[position] = vector
+
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            vectors[batch] = encode([chunks[i] for i in batch])
+        return len(missing)
+
+    def _stream_into_index(
+        self,
+        index,
+        vectors: np.ndarray,
+        chunks: List[str],
+        embedding_store: Optional[ChunkEmbeddingStore],
+        encode: Callable[[List[str]], np.ndarray],
+        batch_size: int,
+        progress: Optional[ProgressCallback],
+        skip: Optional[np.ndarray] = None
+    ) -> int:
+        """
+        Embed chunks batch by batch into vectors and add each batch to index
+
+        Adding a batch overlaps with encoding the next one (FAISS and the
+        encoder release the GIL). Rows marked in skip are already filled.
+        Returns the number of chunks that had to be encoded.
+        """
+        embedded = 0
+
+        def produce():
+            nonlocal embedded
+            for start in range(0, len(chunks), batch_size):
+                end = min(start + batch_size, len(chunks))
+                todo = [i for i in range(start, end) if skip is None or not skip[i]]
+                embedded += self._embed_into(vectors, todo, chunks, embedding_store, encode, batch_size)
+                if progress:
+                    progress("embedding", end / len(chunks))
+                yield start, end
+
+        def consume(span: Tuple[int, int]):
+            start, end = span
+            index.add(np.ascontiguousarray(vectors[start:end]))
+
+        run_pipelined(produce(), consume)
+        return embedded
+
+    def _chunk_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Split documents into chunks with per-chunk metadata (in build_workers processes)"""
+        logger.info(f"Building FAISS index from {len(documents)} documents")
+
+        all_chunks, all_metadata = chunk_documents(documents, self.build_workers, progress)
 
-        logger.info(f"✅ FAISS index built with {len(all_chunks)} vectors")
+        logger.info(f"Created {len(all_chunks)} chunks from {len(documents)} documents")
+        return all_chunks, all_metadata
 
-    def save_index(self):
+    def save_index(self, snapshot: Optional[IndexSnapshot] = None):
         """Save FAISS index and metadata to disk"""
+        import faiss
+
+        snapshot = snapshot or self._snapshot
         self.faiss_index_path.mkdir(parents=True, exist_ok=True)
 
-        # Save FAISS index
+        # Write to temporary files and rename, so a crash mid-save (or a
+        # worker loading concurrently) never sees a half-written index
         index_file = self.faiss_index_path / "index.faiss"
-        faiss.write_index(self.index, str(index_file))
-
-        # Save documents
-        docs_file = self.faiss_index_path / "documents.json"
-        with open(docs_file, "w", encoding="utf-8") as f:
-            json.dump(self.documents, f, ensure_ascii=False, indent=2)
-
-        # Save metadata
-        metadata_file = self.faiss_index_path / "metadata.json"
-        with open(metadata_file, "w", encoding="utf-8") as f:
-            json.dump(self.document_metadata, f, ensure_ascii=False, indent=2)
+        faiss.write_index(snapshot.index, str(index_file) + ".tmp")
+
+        # Save documents and metadata
+        store_file = self.faiss_index_path / "documents.bin"
+        write_document_store(str(store_file) + ".tmp", snapshot.documents, snapshot.metadata)
+
+        # Save index type, build parameters and recall report
+        params_file = self.faiss_index_path / "index_params.json"
+        with open(str(params_file) + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "config": snapshot.config.to_dict(),
+                "recall": snapshot.recall,
+                "build_stats": snapshot.build_stats,
+                "tombstones": sorted(snapshot.tombstones),
+                "partitions": snapshot.partition_summary(),
+            }, f, indent=2)
+
+        saved = [index_file, store_file, params_file]
+
+        # Term cards for the glossary fast path
+        if snapshot.glossary is not None:
+            glossary_file = self.faiss_index_path / "glossary.json"
+            snapshot.glossary.save(str(glossary_file) + ".tmp")
+            saved.append(glossary_file)
+
+        for path in saved:
+            os.replace(str(path) + ".tmp", path)
+
+        # JSON files from before the document store would be stale now
+        for name in ("documents.json", "metadata.json"):
+            (self.faiss_index_path / name).unlink(missing_ok=True)
 
         logger.info(f"Saved FAISS index to {self.faiss_index_path}")
 
@@ -173,106 +1098,581 @@ Cevap:"""
         """Load FAISS index and metadata from disk"""
         logger.info(f"Loading FAISS index from {self.faiss_index_path}")
 
-        # Load FAISS index
+        # Indexes saved before index types existed are flat
+        params = {"config": {}}
+        params_file = self.faiss_index_path / "index_params.json"
+        if params_file.exists():
+            with open(params_file, "r", encoding="utf-8") as f:
+                params = json.load(f)
+        config = IndexConfig.from_dict(params["config"])
+
+        index = self._read_index(config)
+
+        # Map documents and metadata (converting an index saved as JSON once)
+        migrate_json(self.faiss_index_path)
+        store = DocumentStore(self.faiss_index_path / "documents.bin")
+
+        tombstones = set(params.get("tombstones", []))
+
+        # Indexes saved before the glossary existed: collect term cards from the chunks
+        glossary_file = self.faiss_index_path / "glossary.json"
+        if glossary_file.exists():
+            glossary = TermGlossary.load(glossary_file, self.glossary_fuzzy_threshold)
+        else:
+            glossary = TermGlossary.build(
+                (
+                    (store.text(position), meta) for position, meta in enumerate(store.metadata)
+                    if position not in tombstones
+                ),
+                self.glossary_fuzzy_threshold
+            )
+
+        snapshot = IndexSnapshot(
+            index=index,
+            documents=store.texts,
+            metadata=store.metadata,
+            config=config,
+            recall=params.get("recall", {}),
+            tombstones=tombstones,
+            build_stats=params.get("build_stats", {}),
+            glossary=glossary,
+            partition_counts=params.get("partitions")
+        )
+        self._swap_snapshot(snapshot)
+
+        logger.info(f"✅ Loaded FAISS index with {snapshot.live_count} documents")
+
+    def _read_index(self, config: IndexConfig):
+        """
+        Read the saved FAISS index; with index_mmap the vectors (IVF:
+        inverted lists, flat/HNSW: stored codes) are mapped read-only, so
+        worker processes share the page cache instead of private copies
+        """
+        import faiss
+
         index_file = self.faiss_index_path / "index.faiss"
-        self.index = faiss.read_index(str(index_file))
+        io_flags = 0
+        if self.index_mmap:
+            mapped = faiss.IO_FLAG_MMAP if config.index_type == "ivf" else faiss.IO_FLAG_MMAP_IFC
+            io_flags = mapped | faiss.IO_FLAG_READ_ONLY
+        index = faiss.read_index(str(index_file), io_flags)
+        if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+            raise ValueError(f"{index_file} does not use the inner-product metric (built as HNSW+PQ?); rebuild the index")
+        return index
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a single query as a (1, dim) matrix (served from the query cache when possible)"""
+        cache = self.query_cache
+        if cache is not None:
+            cached = cache.get(query)
+            CACHE_LOOKUPS.inc(cache="query_embedding", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached.reshape(1, -1)
+
+        with time_stage("query_embedding"):
+            if self.embedding_batcher is not None:
+                embedding = self.embedding_batcher.embed(query).reshape(1, -1)
+            else:
+                embedding = self.create_embeddings([query])[0:1]
+
+        if cache is not None:
+            cache.put(query, embedding[0])
+        return embedding
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed many queries as an (n, dim) matrix, encoding only cache misses"""
+        cache = self.query_cache
+        if cache is None:
+            return self.create_embeddings(queries)
+
+        cached = [cache.get(query) for query in queries]
+        missing = [i for i, embedding in enumerate(cached) if embedding is None]
+        CACHE_LOOKUPS.inc(len(queries) - len(missing), cache="query_embedding", result="hit")
+        CACHE_LOOKUPS.inc(len(missing), cache="query_embedding", result="miss")
+
+        if missing:
+            fresh = self.create_embeddings([queries[i] for i in missing])
+            for i, embedding in zip(missing, fresh):
+                cached[i] = embedding
+                cache.put(queries[i], embedding)
+
+        return np.vstack(cached)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = None,
+        query_embedding: Optional[np.ndarray] = None,
+        filters: Optional[Dict[str, FilterValue]] = None
+    ) -> Tuple[List[str], List[float], List[Dict]]:
+        """
+        Search for relevant documents using FAISS
+
+        Args:
+            filters: Optional metadata filters, e.g. {"type": "market_data"}
+                or {"week": 3, "type": ["education_content"]}; only chunks
+                matching every field are searched
+
+        Raises:
+            ValueError: for unknown filter fields
+        """
+        if top_k is None:
+            top_k = self.top_k
+        filters = normalize_filters(filters)
 
-        # Load documents
-        docs_file = self.faiss_index_path / "documents.json"
-        with open(docs_file, "r", encoding="utf-8") as f:
-            self.documents = json.load(f)
+        with self._use_snapshot() as snapshot:
+            if snapshot is None:
+                logger.error("FAISS index not initialized")
+                return [], [], []
 
-        # Load metadata
-        metadata_file = self.faiss_index_path / "metadata.json"
-        with open(metadata_file, "r", encoding="utf-8") as f:
-            self.document_metadata = json.load(f)
+            # Create query embedding
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
 
-        logger.info(f"✅ Loaded FAISS index with {len(self.documents)} documents")
+            # Search FAISS index
+            with time_stage("faiss_search"):
+                distances, indices = self._search_index(snapshot, query_embedding, top_k, filters)
 
-    def search(self, query: str, top_k: int = None) -> Tuple[List[str], List[float], List[Dict]]:
-        """Search for relevant documents using FAISS"""
-        if self.index is None:
-            logger.error("FAISS index not initialized")
-            return [], [], []
+            return self._collect_hits(snapshot, distances[0], indices[0], top_k)
 
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = None,
+        filters: Optional[Dict[str, FilterValue]] = None
+    ) -> List[Tuple[List[str], List[float], List[Dict]]]:
+        """
+        Search for many queries at once
+
+        All queries are encoded in a single encoder call and searched with
+        a single FAISS call over the whole query matrix.
+
+        Args:
+            filters: Optional metadata filters applied to every query (see search)
+
+        Returns:
+            One (documents, scores, metadata) tuple per query, in order
+        """
         if top_k is None:
             top_k = self.top_k
+        filters = normalize_filters(filters)
+
+        with self._use_snapshot() as snapshot:
+            if snapshot is None:
+                logger.error("FAISS index not initialized")
+                return [([], [], []) for _ in queries]
 
-        # Create query embedding
-        query_embedding = self.create_embeddings([query])[0:1]
+            if not queries:
+                return []
 
-        # Search FAISS index
-        distances, indices = self.index.search(query_embedding, top_k)
+            with time_stage("query_embedding_batch"):
+                query_embeddings = self.embed_queries(queries)
+            with time_stage("faiss_search_batch"):
+                distances, indices = self._search_index(snapshot, query_embeddings, top_k, filters)
 
-        # Get documents, scores, and metadata
+            return [
+                self._collect_hits(snapshot, row_distances, row_indices, top_k)
+                for row_distances, row_indices in zip(distances, indices)
+            ]
+
+    def _collect_hits(
+        self,
+        snapshot: IndexSnapshot,
+        distances: np.ndarray,
+        indices: np.ndarray,
+        limit: Optional[int] = None
+    ) -> Tuple[List[str], List[float], List[Dict]]:
+        """Map one row of FAISS results to (at most limit) documents, scores, and metadata"""
         results = []
         scores = []
         metadata = []
 
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx < len(self.documents):
-                results.append(self.documents[idx])
+        for dist, idx in zip(distances, indices):
+            if limit is not None and len(results) >= limit:
+                break
+            # FAISS pads missing results with -1
+            if 0 <= idx < len(snapshot.documents) and idx not in snapshot.tombstones:
+                results.append(snapshot.documents[idx])
                 scores.append(float(dist))
-                metadata.append(self.document_metadata[idx])
+                metadata.append(snapshot.metadata[idx])
 
         return results, scores, metadata
 
-    def get_answer(
+    def retrieve(
         self,
         question: str,
-        chat_history: List[Tuple[str, str]] = None
+        query_embedding: Optional[np.ndarray] = None,
+        filters: Optional[Dict[str, FilterValue]] = None
     ) -> Dict[str, Any]:
-        """Get answer to question using RAG"""
-        start_time = datetime.now()
+        """Search for relevant documents and assemble the LLM context"""
+        # Without explicit filters, scope to a week/day named in the question,
+        # unless nothing in that scope passes the similarity threshold
+        inferred = not filters and self.auto_filters and infer_filters(question)
+        if inferred:
+            relevant_docs, scores, metadata = self.search(question, query_embedding=query_embedding, filters=inferred)
+            retrieval = self._assemble_retrieval(relevant_docs, scores, metadata)
+            if retrieval["context"]:
+                logger.debug(f"Search scoped to {inferred}")
+                return retrieval
 
         # Search for relevant documents
-        relevant_docs, scores, metadata = self.search(question)
+        relevant_docs, scores, metadata = self.search(question, query_embedding=query_embedding, filters=filters)
+        return self._assemble_retrieval(relevant_docs, scores, metadata)
+
+    def _assemble_retrieval(self, relevant_docs: List[str], scores: List[float], metadata: List[Dict]) -> Dict[str, Any]:
+        """Build the context from search hits above the similarity threshold"""
+        with time_stage("context_assembly"):
+            return self._build_context(relevant_docs, scores, metadata)
 
+    def _build_context(self, relevant_docs: List[str], scores: List[float], metadata: List[Dict]) -> Dict[str, Any]:
+        """Untimed body of _assemble_retrieval"""
         # Check if we have good matches
         best_score = scores[0] if scores else 0.0
         logger.info(f"Best similarity score: {best_score:.4f}")
 
-        # Prepare context from retrieved documents
-        context_parts = []
-        for i, (doc, score, meta) in enumerate(zip(relevant_docs, scores, metadata)):
-            if score >= self.similarity_threshold:
-                source = meta.get("title", meta.get("source", ""))
-                context_parts.append(f"[{i+1}] {doc}\n(Kaynak: {source})")
+        # Pack the documents above the threshold into the context token budget
+        above = [i for i, score in enumerate(scores) if score >= self.similarity_threshold]
+        packed = self.context_packer.pack(
+            [relevant_docs[i] for i in above],
+            [scores[i] for i in above],
+            [metadata[i] for i in above]
+        )
+        if packed["context"]:
+            CONTEXT_TOKENS.observe(packed["tokens"], part="site")
+            CONTEXT_TOKENS_SAVED.inc(packed["tokens_saved"])
+
+        return {
+            "documents": relevant_docs,
+            "scores": scores,
+            "metadata": metadata,
+            "best_score": best_score,
+            "context": packed["context"],
+            "context_tokens": packed["tokens"]
+        }
+
+    def get_answer(
+        self,
+        question: str,
+        chat_history: List[Tuple[str, str]] = None,
+        filters: Optional[Dict[str, FilterValue]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get answer to question using RAG
+
+        Filtered questions bypass the glossary and the answer cache, whose
+        answers were not restricted to the filtered chunks.
+        """
+        start_time = datetime.now()
+
+        # Definition of a known term: answer from its term card
+        glossary_answer = None if filters else self._glossary_answer(question, start_time)
+        if glossary_answer:
+            return glossary_answer
 
-        context = "\n\n".join(context_parts)
+        query_embedding = self.embed_query(question)
+
+        # Reuse the answer of a near-identical earlier question
+        cached = None if filters else self._cached_answer(query_embedding)
+        if cached:
+            cached["response_time_ms"] = int((datetime.now() - start_time).total_seconds() * 1000)
+            return cached
+        cache_generation = self.answer_cache.generation if self.answer_cache else None
+
+        retrieval = self.retrieve(question, query_embedding, filters)
+        context = retrieval["context"]
 
         # Generate answer using LLM
         if context:
             # Use context from site
             prompt = self.prompt_template.format(context=context, question=question)
-            response = self.llm.predict(prompt)
+            response = self.generate(prompt)
             source_type = "site_content"
-            confidence = best_score
+            confidence = retrieval["best_score"]
         else:
             # No good context found
-            response = "Bu konuda sitemizdeki içeriklerde yeterli bilgi bulamadım. Daha spesifik bir soru sorabilir veya web araması yapabilirim."
+            response = self.NO_CONTEXT_ANSWER
             source_type = "insufficient_context"
             confidence = 0.0
 
         # Calculate response time
         response_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
 
-        return {
+        result = {
             "answer": response,
             "source_type": source_type,
             "confidence": confidence,
-            "documents_retrieved": len(relevant_docs),
-            "similarity_scores": scores,
-            "metadata": metadata,
+            "documents_retrieved": len(retrieval["documents"]),
+            "similarity_scores": retrieval["scores"],
+            "metadata": retrieval["metadata"],
             "response_time_ms": response_time_ms,
-            "context_used": context[:500] if context else ""  # First 500 chars for logging
+            "context_used": context[:500] if context else "",  # First 500 chars for logging
+            "cache_hit": False
         }
 
-    def chat(self, message: str, session_history: List[Dict] = None) -> Dict[str, Any]:
-        """Main chat interface"""
-        logger.info(f"User question: {message}")
+        if source_type == "site_content" and not filters:
+            self._cache_answer(question, query_embedding, result, cache_generation)
+
+        return result
 
-        # Convert session history to LangChain format
+    def _glossary_answer(self, question: str, start_time: datetime) -> Optional[Dict[str, Any]]:
+        """Answer a definition question from the matching term card, if there is one"""
+        if not self.glossary_enabled:
+            return None
+        self.ensure_index_loaded()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.glossary is None:
+            return None
+
+        lookup_start = time.perf_counter()
+        match = snapshot.glossary.lookup(question)
+        self.glossary_stats.record(match[1] if match else None, time.perf_counter() - lookup_start)
+        if match is None:
+            return None
+
+        entry, match_type, score = match
+        logger.debug(f"Glossary {match_type} match: {entry['term']}")
+        return {
+            "answer": entry["content"],
+            "source_type": "glossary",
+            "confidence": score,
+            "documents_retrieved": 1,
+            "similarity_scores": [score],
+            "metadata": [entry["metadata"]],
+            "response_time_ms": int((datetime.now() - start_time).total_seconds() * 1000),
+            "context_used": entry["content"][:500],
+            "cache_hit": False,
+            "glossary_match": match_type
+        }
+
+    def _cached_answer(self, query_embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Look up a cached answer for the query embedding"""
+        if self.answer_cache is None:
+            return None
+
+        cached = self.answer_cache.lookup(query_embedding)
+        CACHE_LOOKUPS.inc(cache="answer", result="hit" if cached else "miss")
+        if cached:
+            cached["cache_hit"] = True
+        return cached
+
+    def _cache_answer(
+        self,
+        question: str,
+        query_embedding: np.ndarray,
+        result: Dict[str, Any],
+        generation: Optional[int]
+    ):
+        """Store a site-content answer in the semantic cache"""
+        if self.answer_cache is not None:
+            self.answer_cache.store(question, query_embedding, result, generation)
+
+    def get_answers_batch(
+        self,
+        questions: List[str],
+        generate: bool = True,
+        max_concurrency: int = 8,
+        filters: Optional[Dict[str, FilterValue]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer many questions with one vectorized retrieval pass
+
+        Retrieval uses search_batch; the LLM prompts for questions with
+        enough context are sent concurrently over the shared LLM client.
+        Only site content is used (no web search).
+
+        Args:
+            questions: Questions to answer
+            generate: If False, skip the LLM and return retrieval results only
+            max_concurrency: Maximum concurrent LLM calls
+            filters: Optional metadata filters applied to every question (see search)
+
+        Returns:
+            One result per question, in order, shaped like get_answer()
+        """
+        start_time = datetime.now()
+
+        retrievals = [
+            self._assemble_retrieval(docs, scores, metadata)
+            for docs, scores, metadata in self.search_batch(questions, filters=filters)
+        ]
+
+        answers = [None] * len(questions)
+        if generate:
+            pending = [i for i, retrieval in enumerate(retrievals) if retrieval["context"]]
+            prompts = [
+                self.prompt_template.format(context=retrievals[i]["context"], question=questions[i])
+                for i in pending
+            ]
+            if prompts:
+                with time_stage("llm_batch"):
+                    responses = self.llm.generate_many(prompts, max_concurrency=max_concurrency)
+                for i, response in zip(pending, responses):
+                    answers[i] = response
+
+        response_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+
+        results = []
+        for question, retrieval, answer in zip(questions, retrievals, answers):
+            context = retrieval["context"]
+            if not context:
+                answer = self.NO_CONTEXT_ANSWER if generate else None
+
+            results.append({
+                "question": question,
+                "answer": answer,
+                "source_type": "site_content" if context else "insufficient_context",
+                "confidence": retrieval["best_score"] if context else 0.0,
+                "documents_retrieved": len(retrieval["documents"]),
+                "similarity_scores": retrieval["scores"],
+                "metadata": retrieval["metadata"],
+                "response_time_ms": response_time_ms,
+                "context_used": context[:500] if context else ""
+            })
+
+        logger.info(f"Answered batch of {len(questions)} questions in {response_time_ms}ms")
+        return results
+
+    def generate(self, prompt: str) -> str:
+        """
+        Run one blocking LLM call
+
+        Raises:
+            LLMTimeoutError: when no answer arrives within llm_timeout
+        """
+        with time_stage("llm"):
+            return self.llm.generate(prompt)
+
+    async def agenerate(self, prompt: str) -> str:
+        """generate() for async callers, without tying up a worker thread"""
+        with time_stage("llm"):
+            return await self.llm.agenerate(prompt)
+
+    def stream_llm(self, prompt: str) -> Iterator[str]:
+        """Stream LLM output tokens for a prompt as they arrive"""
+        start = time.perf_counter()
+        first_token = True
+        try:
+            for token in self.llm.stream(prompt):
+                if first_token:
+                    STAGE_LATENCY.observe(time.perf_counter() - start, stage="llm_first_token")
+                    first_token = False
+                yield token
+        finally:
+            STAGE_LATENCY.observe(time.perf_counter() - start, stage="llm")
+
+    def stream_answer(
+        self,
+        question: str,
+        chat_history: List[Tuple[str, str]] = None,
+        filters: Optional[Dict[str, FilterValue]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream an answer as events
+
+        Yields a "metadata" event with retrieval results before any
+        generation starts, then one "token" event per LLM chunk and a
+        final "done" event.
+        """
+        start_time = datetime.now()
+
+        glossary_answer = None if filters else self._glossary_answer(question, start_time)
+        if glossary_answer:
+            yield from self._stream_cached(glossary_answer, start_time)
+            return
+
+        query_embedding = self.embed_query(question)
+
+        cached = None if filters else self._cached_answer(query_embedding)
+        if cached:
+            yield from self._stream_cached(cached, start_time)
+            return
+        cache_generation = self.answer_cache.generation if self.answer_cache else None
+
+        retrieval = self.retrieve(question, query_embedding, filters)
+        context = retrieval["context"]
+
+        if context:
+            source_type = "site_content"
+            confidence = retrieval["best_score"]
+        else:
+            source_type = "insufficient_context"
+            confidence = 0.0
+
+        yield {
+            "event": "metadata",
+            "data": {
+                "source_type": source_type,
+                "confidence": confidence,
+                "documents_retrieved": len(retrieval["documents"]),
+                "similarity_scores": retrieval["scores"],
+                "sources": self.format_sources(retrieval["metadata"]),
+                "web_search_performed": False,
+                "web_sources": [],
+                "cache_hit": False
+            }
+        }
+
+        if context:
+            prompt = self.prompt_template.format(context=context, question=question)
+            answer_parts = []
+            for token in self.stream_llm(prompt):
+                answer_parts.append(token)
+                yield {"event": "token", "data": {"text": token}}
+
+            if not filters:
+                self._cache_answer(question, query_embedding, {
+                    "answer": "".join(answer_parts),
+                    "source_type": source_type,
+                    "confidence": confidence,
+                    "documents_retrieved": len(retrieval["documents"]),
+                    "similarity_scores": retrieval["scores"],
+                    "metadata": retrieval["metadata"],
+                    "context_used": context[:500]
+                }, cache_generation)
+        else:
+            yield {"event": "token", "data": {"text": self.NO_CONTEXT_ANSWER}}
+
+        yield {
+            "event": "done",
+            "data": {
+                "source_type": source_type,
+                "response_time_ms": int((datetime.now() - start_time).total_seconds() * 1000)
+            }
+        }
+
+    def _stream_cached(self, cached: Dict[str, Any], start_time: datetime) -> Iterator[Dict[str, Any]]:
+        """Replay a cached (or glossary) answer as stream events"""
+        yield {
+            "event": "metadata",
+            "data": {
+                "source_type": cached["source_type"],
+                "confidence": cached["confidence"],
+                "documents_retrieved": cached["documents_retrieved"],
+                "similarity_scores": cached["similarity_scores"],
+                "sources": self.format_sources(cached["metadata"]),
+                "web_search_performed": False,
+                "web_sources": [],
+                "cache_hit": cached["cache_hit"]
+            }
+        }
+        yield {"event": "token", "data": {"text": cached["answer"]}}
+        yield {
+            "event": "done",
+            "data": {
+                "source_type": cached["source_type"],
+                "response_time_ms": int((datetime.now() - start_time).total_seconds() * 1000)
+            }
+        }
+
+    def format_sources(self, metadata: List[Dict]) -> List[Dict[str, Any]]:
+        """Compact source list (title + page) for retrieved documents"""
+        return [
+            {"title": meta.get("title", ""), "source": meta.get("source", "")}
+            for meta in metadata
+        ]
+
+    def _to_chat_history(self, session_history: List[Dict] = None) -> List[Tuple[str, str]]:
+        """Convert session history to LangChain (user, assistant) pairs"""
         chat_history = []
         if session_history:
             for msg in session_history[-5:]:  # Last 5 messages for context
@@ -280,14 +1680,34 @@ Cevap:"""
                     user_msg = msg["content"]
                 elif msg["role"] == "assistant":
                     chat_history.append((user_msg, msg["content"]))
+        return chat_history
+
+    def chat(
+        self,
+        message: str,
+        session_history: List[Dict] = None,
+        filters: Optional[Dict[str, FilterValue]] = None
+    ) -> Dict[str, Any]:
+        """Main chat interface"""
+        logger.info(f"User question: {message}")
 
         # Get answer
-        result = self.get_answer(message, chat_history)
+        result = self.get_answer(message, self._to_chat_history(session_history), filters)
 
         logger.info(f"Answer generated in {result['response_time_ms']}ms (confidence: {result['confidence']:.4f})")
 
         return result
 
+    def stream_chat(
+        self,
+        message: str,
+        session_history: List[Dict] = None,
+        filters: Optional[Dict[str, FilterValue]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Streaming chat interface (see stream_answer)"""
+        logger.info(f"User question (stream): {message}")
+        return self.stream_answer(message, self._to_chat_history(session_history), filters)
+
 
 # CLI usage
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+"""
+Finans Akademi - Semantic Answer Cache
+Reuses LLM answers for near-identical questions via embedding similarity
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+import numpy as np
+from loguru import logger
+
+
+class SemanticAnswerCache:
+    """
+    LRU + TTL cache of answers keyed on query embeddings
+
+    Cached questions live in a small FAISS inner-product index; a lookup
+    is a hit when the nearest cached question has a cosine similarity of
+    at least similarity_threshold (embeddings are normalized).
+    """
+
+    def __init__(
+        self,
+        embedding_dim: int,
+        similarity_threshold: float = 0.92,
+        max_entries: int = 1000,
+        ttl_seconds: int = 3600
+    ):
+        self.embedding_dim = embedding_dim
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        import faiss
+
+        self._lock = threading.Lock()
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(embedding_dim))
+        # entry id -> (created_at, question, result)
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._next_id = 0
+        self._generation = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Bumped by clear(); pass it to store() to drop answers built before a clear"""
+        return self._generation
+
+    def lookup(self, query_embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Cached result for the closest question above the threshold, if any"""
+        with self._lock:
+            if not self._entries:
+                self._misses += 1
+                return None
+
+            scores, ids = self._index.search(query_embedding.reshape(1, -1), 1)
+            entry_id = int(ids[0][0])
+            score = float(scores[0][0])
+
+            entry = self._entries.get(entry_id)
+            if entry is None or score < self.similarity_threshold:
+                self._misses += 1
+                return None
+
+            created_at, question, result = entry
+            if time.monotonic() - created_at > self.ttl_seconds:
+                self._remove(entry_id)
+                self._evictions += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(entry_id)
+            self._hits += 1
+
+        logger.info(f"Answer cache hit (similarity {score:.4f}): {question}")
+        return {**result, "cached_question": question, "cache_similarity": score}
+
+    def store(
+        self,
+        question: str,
+        query_embedding: np.ndarray,
+        result: Dict[str, Any],
+        generation: Optional[int] = None
+    ):
+        """Cache the result for a question (ignored if the cache was cleared since generation)"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            entry_id = self._next_id
+            self._next_id += 1
+
+            self._index.add_with_ids(
+                query_embedding.reshape(1, -1).astype("float32"),
+                np.array([entry_id], dtype="int64")
+            )
+            self._entries[entry_id] = (time.monotonic(), question, result)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def clear(self):
+        """Drop every cached answer (called when the document index changes)"""
+        with self._lock:
+            self._index.reset()
+            self._entries.clear()
+            self._generation += 1
+            self._invalidations += 1
+
+        logger.info("Answer cache invalidated")
+
+    def _remove(self, entry_id: int):
+        self._entries.pop(entry_id, None)
+        self._index.remove_ids(np.array([entry_id], dtype="int64"))
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "similarity_threshold": self.similarity_threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
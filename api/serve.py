@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Finans Akademi - Pre-fork API Server
+Loads the embedding model and FAISS index once, then forks uvicorn workers
+that share them copy-on-write
+
+Usage:
+    python3 api/serve.py                  # start server (API_WORKERS workers)
+    python3 api/serve.py memory <pid>     # RSS/PSS report for <pid> and its workers
+"""
+
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from loguru import logger
+
+# Add this directory to path (api.py uses flat imports)
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dotenv import load_dotenv
+
+
+def read_memory(pid: int) -> Dict[str, int]:
+    """RSS/PSS breakdown of a process in kB (Linux /proc)"""
+    fields = {}
+    path = f"/proc/{pid}/smaps_rollup"
+    if not os.path.exists(path):
+        path = f"/proc/{pid}/status"
+
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+
+    return {
+        "rss_kb": fields.get("Rss", fields.get("VmRSS", 0)),
+        "pss_kb": fields.get("Pss", 0),
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def child_pids(parent_pid: int) -> List[int]:
+    """PIDs whose parent is parent_pid"""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 is the ppid; the command name (field 2) may contain spaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent_pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def memory_report(master_pid: int) -> str:
+    """
+    Table of RSS vs PSS for a master process and its workers
+
+    RSS counts shared pages in every process; PSS splits them between
+    the processes sharing them, so sum(PSS) is the real node footprint.
+    Works for this server and for plain `uvicorn --workers`, which makes
+    before/after comparisons easy.
+    """
+    rows = [("master", master_pid)] + [("worker", pid) for pid in child_pids(master_pid)]
+    lines = [f"{'role':<8}{'pid':>8}{'rss_mb':>10}{'pss_mb':>10}{'shared_mb':>11}{'private_mb':>12}"]
+    total_rss = total_pss = 0
+
+    for role, pid in rows:
+        try:
+            mem = read_memory(pid)
+        except OSError:
+            continue
+        total_rss += mem["rss_kb"]
+        total_pss += mem["pss_kb"]
+        lines.append(
+            f"{role:<8}{pid:>8}{mem['rss_kb'] / 1024:>10.1f}{mem['pss_kb'] / 1024:>10.1f}"
+            f"{mem['shared_kb'] / 1024:>11.1f}{mem['private_kb'] / 1024:>12.1f}"
+        )
+
+    lines.append(f"{'total':<16}{total_rss / 1024:>10.1f}{total_pss / 1024:>10.1f}")
+    return "\n".join(lines)
+
+
+def preload():
+    """Import the app and load the shared read-only state before forking"""
+    import api
+
+    bot = api.get_chatbot()
+
+    # Load model and index only; running the encoder here would start
+    # torch/OpenMP thread pools, which do not survive fork()
+    bot.warm_up(run_test_query=False)
+    api.warm_up_state["status"] = "ready"
+
+    # Move everything allocated so far out of the GC's reach, so collections
+    # in the workers do not write to (and un-share) these pages
+    gc.collect()
+    gc.freeze()
+
+    return api.app
+
+
+def run_worker(app, sock: socket.socket):
+    """Serve the preloaded app on the inherited socket"""
+    import uvicorn
+
+    config = uvicorn.Config(
+        app,
+        log_level=os.getenv("LOG_LEVEL", "info").lower(),
+        timeout_keep_alive=int(os.getenv("API_KEEP_ALIVE", "5")),
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve():
+    """Preload, bind, fork API_WORKERS workers and supervise them"""
+    load_dotenv()
+
+    host = os.getenv("API_HOST", "0.0.0.0")
+    port = int(os.getenv("API_PORT", "8000"))
+    workers = int(os.getenv("API_WORKERS", "4"))
+
+    start = time.perf_counter()
+    app = preload()
+    logger.info(f"Preloaded app in {time.perf_counter() - start:.1f}s")
+
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children: Dict[int, int] = {}  # pid -> worker number
+    stopping = False
+
+    def spawn(number: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+            try:
+                run_worker(app, sock)
+            finally:
+                os._exit(0)
+        children[pid] = number
+        logger.info(f"Started worker {number} (pid {pid})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report(signum, frame):
+        logger.info("Memory report\n" + memory_report(os.getpid()))
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, report)
+
+    logger.info(f"📡 Serving on http://{host}:{port} with {workers} pre-forked workers")
+    for number in range(workers):
+        spawn(number)
+
+    # Log one report once workers settle; send SIGUSR1 for more
+    signal.signal(signal.SIGALRM, report)
+    signal.alarm(int(os.getenv("MEMORY_REPORT_DELAY", "30")))
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        number = children.pop(pid, None)
+        if number is not None and not stopping:
+            logger.warning(f"Worker {number} (pid {pid}) exited with status {status}, restarting")
+            spawn(number)
+
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "memory":
+        print(memory_report(int(sys.argv[2])))
+    else:
+        serve()
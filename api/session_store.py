@@ -0,0 +1,301 @@
+"""
+Finans Akademi - Chat Session Store
+Server-side conversation history keyed by session_id (LRU + TTL)
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from loguru import logger
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class SessionBackend(ABC):
+    """Storage interface for session histories"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        """Stored history, or None if unknown or expired"""
+
+    @abstractmethod
+    def set(self, session_id: str, history: List[Dict[str, str]]):
+        """Replace the stored history"""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Forget a session"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Size and eviction counters"""
+
+
+class MemorySessionBackend(SessionBackend):
+    """In-process LRU store with per-session TTL"""
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: int = 3600):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        # session_id -> (last_access, size_bytes, history)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lru_evictions = 0
+        self._ttl_evictions = 0
+
+    def get(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+
+            last_access, size, history = entry
+            if time.monotonic() - last_access > self.ttl_seconds:
+                self._remove(session_id)
+                self._ttl_evictions += 1
+                return None
+
+            self._sessions[session_id] = (time.monotonic(), size, history)
+            self._sessions.move_to_end(session_id)
+            return list(history)
+
+    def set(self, session_id: str, history: List[Dict[str, str]]):
+        size = sum(len(msg["content"].encode("utf-8")) + len(msg["role"]) for msg in history)
+
+        with self._lock:
+            self._remove(session_id)
+            self._sessions[session_id] = (time.monotonic(), size, list(history))
+            self._bytes += size
+            self._evict()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._remove(session_id)
+
+    def _remove(self, session_id: str):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _evict(self):
+        """Drop expired sessions from the LRU end, then enforce max_sessions"""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, (last_access, _, _) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl_seconds:
+                break
+            self._remove(session_id)
+            self._ttl_evictions += 1
+
+        while len(self._sessions) > self.max_sessions:
+            session_id = next(iter(self._sessions))
+            self._remove(session_id)
+            self._lru_evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "lru_evictions": self._lru_evictions,
+                "ttl_evictions": self._ttl_evictions,
+                "memory_bytes": self._bytes,
+            }
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    SQLite-file store, a local stand-in for Redis
+
+    Shared by every worker process on the node; LRU order follows the
+    last access time.
+    """
+
+    def __init__(self, db_path: str = "./data/sessions.db", max_sessions: int = 10000, ttl_seconds: int = 3600):
+        self.db_path = Path(db_path)
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS chat_session_history (
+                session_id TEXT PRIMARY KEY,
+                history TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_session_history_access ON chat_session_history(last_access)"
+        )
+        self._lru_evictions = 0
+        self._ttl_evictions = 0
+
+    def get(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT history, last_access FROM chat_session_history WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM chat_session_history WHERE session_id = ?", (session_id,))
+                self._ttl_evictions += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE chat_session_history SET last_access = ? WHERE session_id = ?",
+                (now, session_id)
+            )
+            return json.loads(row[0])
+
+    def set(self, session_id: str, history: List[Dict[str, str]]):
+        payload = json.dumps(history, ensure_ascii=False, separators=(",", ":"))
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_session_history (session_id, history, last_access) VALUES (?, ?, ?)",
+                (session_id, payload, now)
+            )
+            self._evict(now)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM chat_session_history WHERE session_id = ?", (session_id,))
+
+    def _evict(self, now: float):
+        cursor = self._conn.execute(
+            "DELETE FROM chat_session_history WHERE last_access < ?",
+            (now - self.ttl_seconds,)
+        )
+        self._ttl_evictions += max(cursor.rowcount, 0)
+
+        count = self._conn.execute("SELECT COUNT(*) FROM chat_session_history").fetchone()[0]
+        overflow = count - self.max_sessions
+        if overflow > 0:
+            self._conn.execute(
+                """DELETE FROM chat_session_history WHERE session_id IN (
+                    SELECT session_id FROM chat_session_history ORDER BY last_access LIMIT ?
+                )""",
+                (overflow,)
+            )
+            self._lru_evictions += overflow
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(history)), 0) FROM chat_session_history"
+            ).fetchone()
+            return {
+                "backend": "sqlite",
+                "db_path": str(self.db_path),
+                "sessions": count,
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "lru_evictions": self._lru_evictions,
+                "ttl_evictions": self._ttl_evictions,
+                "memory_bytes": size,
+            }
+
+
+class SessionStore:
+    """
+    Keeps a compacted, token-capped history per session
+
+    Each message is truncated to max_message_chars and the history is
+    trimmed from the oldest end until it fits max_turns and max_tokens,
+    so its size never grows with conversation length.
+    """
+
+    def __init__(
+        self,
+        backend: SessionBackend,
+        max_turns: int = 5,
+        max_tokens: int = 1000,
+        max_message_chars: int = 1000
+    ):
+        self.backend = backend
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.max_message_chars = max_message_chars
+
+    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        """Stored history for a session (empty if unknown or expired)"""
+        return self.backend.get(session_id) or []
+
+    def append_turn(self, session_id: str, user_message: str, assistant_message: str) -> List[Dict[str, str]]:
+        """Add a user/assistant exchange and persist the compacted history"""
+        history = self.get_history(session_id)
+        history.append({"role": "user", "content": user_message})
+        history.append({"role": "assistant", "content": assistant_message})
+
+        history = self.compact(history)
+        self.backend.set(session_id, history)
+        return history
+
+    def delete(self, session_id: str):
+        """Forget a session"""
+        self.backend.delete(session_id)
+
+    def compact(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Truncate long messages and keep the newest turns within the token cap"""
+        messages = [
+            {"role": msg["role"], "content": msg["content"][:self.max_message_chars]}
+            for msg in history[-self.max_turns * 2:]
+        ]
+
+        tokens = sum(estimate_tokens(msg["content"]) for msg in messages)
+        while len(messages) > 2 and tokens > self.max_tokens:
+            # Drop the oldest exchange (user + assistant)
+            for msg in messages[:2]:
+                tokens -= estimate_tokens(msg["content"])
+            messages = messages[2:]
+
+        return messages
+
+    def stats(self) -> Dict[str, Any]:
+        """Backend statistics plus compaction limits"""
+        return {
+            **self.backend.stats(),
+            "max_turns": self.max_turns,
+            "max_tokens": self.max_tokens,
+        }
+
+
+def create_session_store(
+    backend: str = "memory",
+    db_path: str = "./data/sessions.db",
+    max_sessions: int = 10000,
+    ttl_seconds: int = 3600,
+    max_turns: int = 5,
+    max_tokens: int = 1000
+) -> SessionStore:
+    """Build a SessionStore with the named backend ("memory" or "sqlite")"""
+    if backend == "sqlite":
+        store_backend = SQLiteSessionBackend(db_path, max_sessions=max_sessions, ttl_seconds=ttl_seconds)
+    elif backend == "memory":
+        store_backend = MemorySessionBackend(max_sessions=max_sessions, ttl_seconds=ttl_seconds)
+    else:
+        raise ValueError(f"Unknown session backend: {backend}")
+
+    logger.info(f"Session store initialized (backend={backend}, max_sessions={max_sessions}, ttl={ttl_seconds}s)")
+    return SessionStore(store_backend, max_turns=max_turns, max_tokens=max_tokens)
@@ -0,0 +1,101 @@
+"""
+Finans Akademi - Test fixtures
+A small site in the real page layout and a chatbot with a deterministic
+embedding backend, so index builds run without model downloads
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# The API modules import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import build_pipeline  # noqa: E402
+from rag_chatbot import FinansRAGChatbot  # noqa: E402
+
+SITE_HTML = """<!DOCTYPE html>
+<html lang="tr">
+<head><title>Finans Akademi</title></head>
+<body>
+<section id="terimler" class="page">
+  <div class="container">
+    <h1>Finans Terimleri Sözlüğü</h1>
+    <div class="term-card">
+      <h3>F/K Oranı</h3>
+      <p>Fiyat/Kazanç oranı, hisse fiyatının hisse başına net kâra bölünmesiyle bulunur ve şirketin kaç yıllık kârına ödeme yapıldığını gösterir.</p>
+    </div>
+    <div class="term-card">
+      <h3>Temettü</h3>
+      <p>Şirketin dağıtılabilir kârının bir kısmını ortaklarına nakit veya bedelsiz hisse olarak ödemesidir; temettü verimi yüzdesiyle karşılaştırılır.</p>
+    </div>
+  </div>
+</section>
+<section id="egitim" class="page">
+  <h2>Eğitim Programı</h2>
+  <div class="week-container">
+    <h3>Hafta 1 - Temeller</h3>
+    <div class="day-section">
+      <h4>Gün 1</h4>
+      <p>Borsa, şirket paylarının alınıp satıldığı düzenli piyasadır. Bu derste emir türlerini, seans saatlerini ve aracı kurum seçimini öğreneceğiz.</p>
+    </div>
+  </div>
+</section>
+<div class="market-card">
+  <h3>Döviz Kurları</h3>
+  <p>Dolar, euro ve sterlin kurları gün içinde piyasa saatlerinde güncellenir; kur farkı ithalat ve ihracat yapan şirketleri doğrudan etkiler.</p>
+</div>
+</body>
+</html>
+"""
+
+
+class HashEmbeddingBackend:
+    """Deterministic unit vectors seeded by the text hash"""
+
+    name = "test-hash"
+    dimension = 32
+
+    def encode(self, texts, show_progress_bar=False, **kwargs):
+        vectors = np.stack([
+            np.random.default_rng(int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)).standard_normal(self.dimension)
+            for text in texts
+        ]).astype("float32")
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class WindowSplitter:
+    """Fixed-size overlapping windows in place of the langchain splitter"""
+
+    def split_text(self, text):
+        return [text[start:start + 200] for start in range(0, len(text), 180)]
+
+
+@pytest.fixture
+def site_root(tmp_path):
+    root = tmp_path / "site"
+    root.mkdir()
+    (root / "index.html").write_text(SITE_HTML, encoding="utf-8")
+    return root
+
+
+@pytest.fixture
+def make_chatbot(tmp_path, monkeypatch):
+    """Factory for chatbots over one index directory"""
+    monkeypatch.setattr(build_pipeline, "_splitter", WindowSplitter())
+
+    bots = []
+
+    def make(chatbot_class=FinansRAGChatbot, **kwargs):
+        kwargs.setdefault("build_workers", 1)
+        bot = chatbot_class(openai_api_key="test", faiss_index_path=str(tmp_path / "index"), **kwargs)
+        bot._embedding_model = HashEmbeddingBackend()
+        bots.append(bot)
+        return bot
+
+    yield make
+    for bot in bots:
+        bot.close()
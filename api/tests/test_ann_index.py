@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from ann_index import IndexConfig, create_index, exact_search, memory_report, recall_report
+
+CONFIGS = [
+    ("flat", "none"),
+    ("flat", "pq"),
+    ("ivf", "none"),
+    ("ivf", "int8"),
+    ("ivf", "pq"),
+    ("hnsw", "none"),
+    ("hnsw", "fp16"),
+    ("hnsw", "int8"),
+]
+
+
+def unit_vectors(count, dim=32, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("index_type,quantization", CONFIGS)
+def test_scores_are_similarities(index_type, quantization):
+    vectors = unit_vectors(2000)
+    config = IndexConfig(index_type=index_type, quantization=quantization, nlist=16, pq_m=8, recall_report=False)
+    index = create_index(config, vectors)
+    if hasattr(index, "nprobe"):
+        index.nprobe = 16
+
+    scores, ids = index.search(vectors[:20], 5)
+
+    # Best match first, and the stored vector itself scores close to 1
+    assert np.all(np.diff(scores, axis=1) <= 1e-5)
+    assert np.all(scores[:, 0] > 0.5)
+    assert np.mean(ids[:, 0] == np.arange(20)) >= 0.9
+    if quantization != "pq":
+        exact = np.einsum("qd,qkd->qk", vectors[:20], vectors[ids])
+        assert np.allclose(scores, exact, atol=0.02)
+
+
+def test_hnsw_pq_is_rejected():
+    with pytest.raises(ValueError, match="hnsw"):
+        IndexConfig(index_type="hnsw", quantization="pq")
+
+
+@pytest.mark.parametrize("index_type,quantization", CONFIGS)
+def test_memory_report_matches_serialized_size(index_type, quantization):
+    import faiss
+
+    vectors = unit_vectors(2000)
+    config = IndexConfig(index_type=index_type, quantization=quantization, nlist=16, pq_m=8, recall_report=False)
+    index = create_index(config, vectors)
+
+    report = memory_report(index, len(vectors), vectors.shape[1])
+    serialized = faiss.serialize_index(index).nbytes
+    assert abs(report["index_bytes"] - serialized) <= 0.01 * serialized
+
+
+def test_exact_search_matches_a_full_sort_across_blocks():
+    vectors = unit_vectors(500)
+    queries = unit_vectors(7, seed=1)
+
+    found = exact_search(vectors, queries, 5, block_size=64)
+
+    np.testing.assert_array_equal(found, np.argsort(-(queries @ vectors.T), axis=1)[:, :5])
+
+
+def test_recall_report_tracks_nprobe():
+    vectors = unit_vectors(4000)
+    index = create_index(IndexConfig(index_type="ivf", nlist=32, recall_report=False), vectors)
+
+    full = recall_report(index, vectors, IndexConfig(index_type="ivf", nlist=32, nprobe=32), sample_size=50)
+    narrow = recall_report(index, vectors, IndexConfig(index_type="ivf", nlist=32, nprobe=1), sample_size=50)
+
+    assert full["recall_at_k"] == 1.0 and full["nprobe"] == 32
+    assert narrow["recall_at_k"] < full["recall_at_k"]
+    assert recall_report(index, vectors, IndexConfig())["queries"] == 0
+
+
+def test_ivf_nlist_is_clamped_to_the_training_set():
+    config = IndexConfig(index_type="ivf", nlist=256, recall_report=False)
+    create_index(config, unit_vectors(500))
+
+    assert config.built_with["nlist"] < 256
+    assert config.built_with["factory"].startswith(f"IVF{config.built_with['nlist']},")
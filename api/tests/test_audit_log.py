@@ -0,0 +1,43 @@
+import sqlite3
+
+from audit_log import AuditLogWriter, SQLiteAuditBackend
+
+RESULT = {"answer": "F/K, fiyatın kâra oranıdır.", "source_type": "glossary", "confidence": 0.9}
+
+
+def write(tmp_path, *calls):
+    """Queue the calls on a fresh writer, flush them in one batch and return (stats, db)"""
+    db_path = tmp_path / "audit.db"
+    writer = AuditLogWriter(SQLiteAuditBackend(str(db_path)), flush_interval=0.05)
+    for call, args, kwargs in calls:
+        getattr(writer, call)(*args, **kwargs)
+    writer.start()
+    writer.stop()
+    return writer.stats(), sqlite3.connect(str(db_path))
+
+
+def test_unknown_feedback_ids_do_not_drop_the_batch(tmp_path):
+    stats, db = write(
+        tmp_path,
+        ("log_turn", ("session-1", "F/K nedir?", RESULT), {}),
+        ("log_feedback", ("unknown-session", 5), {"message_id": 999}),
+        ("log_feedback", ("session-1", 1), {"message_id": 999}),
+    )
+
+    assert db.execute("SELECT COUNT(*) FROM chat_messages").fetchone()[0] == 2
+    assert db.execute("SELECT COUNT(*) FROM chat_feedback").fetchone()[0] == 0
+    assert (stats["written"], stats["rejected"], stats["failed"]) == (2, 2, 0)
+
+
+def test_feedback_without_message_id_rates_the_latest_answer(tmp_path):
+    stats, db = write(
+        tmp_path,
+        ("log_turn", ("session-1", "F/K nedir?", RESULT), {}),
+        ("log_feedback", ("session-1", 4), {}),
+        ("log_feedback", ("session-without-answers", 4), {}),
+    )
+
+    assert db.execute(
+        "SELECT m.message_type, f.rating FROM chat_feedback f JOIN chat_messages m ON m.id = f.message_id"
+    ).fetchall() == [("assistant", 4)]
+    assert (stats["written"], stats["rejected"]) == (3, 1)
@@ -0,0 +1,35 @@
+import numpy as np
+
+from data_loader import SiteContentLoader
+
+QUESTIONS = ["F/K oranı nedir?", "Temettü nasıl ödenir?", "Borsa seans saatleri", "Dolar kuru neden değişir?"]
+
+
+def indexed_chatbot(site_root, make_chatbot):
+    bot = make_chatbot(similarity_threshold=-1.0, embedding_batch_size=1)
+    bot.build_index(SiteContentLoader(str(site_root)).load_html_files(["index.html"]))
+    return bot
+
+
+def test_batch_search_matches_single_searches_with_one_encoder_call(site_root, make_chatbot):
+    bot = indexed_chatbot(site_root, make_chatbot)
+    calls = []
+    encode = bot._embedding_model.encode
+    bot._embedding_model.encode = lambda texts, **kwargs: calls.append(len(texts)) or encode(texts, **kwargs)
+
+    batched = bot.search_batch(QUESTIONS, top_k=3)
+
+    assert calls == [len(QUESTIONS)]
+    for question, (documents, scores, metadata) in zip(QUESTIONS, batched):
+        single = bot.search(question, top_k=3)
+        assert documents == single[0]
+        np.testing.assert_allclose(scores, single[1], rtol=1e-5)
+
+
+def test_batch_answers_keep_request_order_without_llm(site_root, make_chatbot):
+    bot = indexed_chatbot(site_root, make_chatbot)
+
+    results = bot.get_answers_batch(QUESTIONS, generate=False)
+
+    assert [result["question"] for result in results] == QUESTIONS
+    assert all(result["answer"] is None and result["source_type"] == "site_content" for result in results)
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+
+import pytest
+
+from chat_executor import ChatExecutor, QueueFullError
+
+
+def test_saturated_pool_rejects_with_retry_after_and_recovers():
+    executor = ChatExecutor(max_workers=1, max_queue=1)
+    gate = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(gate.wait))
+        queued = asyncio.ensure_future(executor.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(QueueFullError) as rejected:
+            await executor.run(lambda: "rejected")
+        assert rejected.value.retry_after >= 1
+
+        gate.set()
+        assert await queued == "queued"
+        await running
+        return await executor.run(lambda: "after")
+
+    assert asyncio.run(scenario()) == "after"
+    stats = executor.stats()
+    assert (stats["completed"], stats["rejected"], stats["queue_depth"], stats["running"]) == (3, 1, 0, 0)
+    executor.shutdown()
+
+
+def test_failing_job_releases_its_slot():
+    executor = ChatExecutor(max_workers=1, max_queue=0)
+
+    def fail():
+        raise ValueError("boom")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await executor.run(fail)
+        return await executor.run(lambda: "ok")
+
+    assert asyncio.run(scenario()) == "ok"
+    executor.shutdown()
+
+
+def test_stream_yields_items_from_its_own_thread():
+    executor = ChatExecutor(max_workers=1, max_queue=0)
+    threads = []
+
+    def tokens():
+        for token in ("Mer", "ha", "ba"):
+            threads.append(threading.current_thread().name)
+            yield token
+
+    async def consume():
+        return [token async for token in executor.stream(tokens)]
+
+    assert asyncio.run(consume()) == ["Mer", "ha", "ba"]
+    assert set(threads) == {"chat-stream"}
+    assert executor.stats()["streaming"] == 0
+    executor.shutdown()
+
+
+def test_stream_errors_reach_the_consumer():
+    executor = ChatExecutor(max_workers=1, max_queue=0)
+
+    def tokens():
+        yield "a"
+        raise RuntimeError("llm gone")
+
+    async def consume():
+        received = []
+        with pytest.raises(RuntimeError, match="llm gone"):
+            async for token in executor.stream(tokens):
+                received.append(token)
+        return received
+
+    assert asyncio.run(consume()) == ["a"]
+    executor.shutdown()
+
+
+def test_abandoned_stream_closes_the_producer():
+    executor = ChatExecutor(max_workers=1, max_queue=0)
+    closed = threading.Event()
+
+    def tokens():
+        try:
+            while True:
+                yield "token"
+        finally:
+            closed.set()
+
+    async def consume_one():
+        stream = executor.stream(tokens)
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(consume_one())
+    assert closed.wait(timeout=2)
+    executor.shutdown()
+
+
+def test_unreleased_stream_slot_is_freed_when_dropped():
+    executor = ChatExecutor(max_workers=1, max_queue=0)
+    slot = executor.admit()
+    with pytest.raises(QueueFullError):
+        executor.admit()
+
+    del slot
+    executor.admit().release()
+    executor.shutdown()
@@ -0,0 +1,72 @@
+from context_packer import GAP_MARKER, MIN_PARTIAL_TOKENS, ContextPacker, merge_overlap
+
+
+def meta(doc_id, chunk_id, title=None):
+    return {"doc_id": doc_id, "chunk_id": chunk_id, "title": title or doc_id}
+
+
+def web(url, snippet, title="Haber"):
+    return {"title": title, "url": url, "snippet": snippet, "is_trusted": False}
+
+
+def test_merge_overlap_keeps_shared_text_once():
+    assert merge_overlap("temettü verimi yüzde", "yüzde olarak hesaplanır") == "temettü verimi yüzde olarak hesaplanır"
+    assert merge_overlap("hisse", "tahvil") == "hisse tahvil"
+
+
+def test_chunks_of_one_document_become_one_passage():
+    packer = ContextPacker()
+
+    passages = packer.passages(
+        ["c kısmı", "a kısmı b", "b kısmı", "başka belge"],
+        [0.4, 0.6, 0.5, 0.9],
+        [meta("ders", 3), meta("ders", 0), meta("ders", 1), meta("piyasa", 0)],
+    )
+
+    assert [p["metadata"]["doc_id"] for p in passages] == ["piyasa", "ders"]
+    assert passages[1]["text"] == "a kısmı b kısmı" + GAP_MARKER + "c kısmı"
+    assert passages[1]["chunks"] == 3
+    assert passages[1]["score"] == 0.6
+
+
+def test_pack_stays_within_budget_and_truncates_the_last_passage():
+    packer = ContextPacker(token_budget=200)
+    documents = [("Cümle numara %d burada. " % i) * 40 for i in range(3)]
+
+    packed = packer.pack(documents, [0.9, 0.8, 0.7], [meta(f"d{i}", 0) for i in range(3)])
+
+    assert 200 - MIN_PARTIAL_TOKENS < packed["tokens"] <= 200
+    assert packer.counter.count(packed["context"]) <= 200
+    assert packed["context"].startswith("[1] Cümle numara 0")
+    assert "(Kaynak: d0)" in packed["context"]
+    assert packed["chunks_used"] < packed["chunks_total"] == 3
+    assert packed["tokens_saved"] > 0
+
+
+def test_pack_uses_everything_when_it_fits():
+    packed = ContextPacker().pack(["kısa metin"], [0.5], [meta("d", 0, "Başlık")])
+
+    assert packed["context"] == "[1] kısa metin\n(Kaynak: Başlık)"
+    assert packed["chunks_used"] == 1
+
+
+def test_pack_web_drops_duplicate_urls_and_snippets():
+    packed = ContextPacker().pack_web([
+        web("https://a.example/1", "BIST 100 endeksi yükseldi."),
+        web("https://a.example/1", "Aynı sayfa, farklı özet."),
+        web("https://b.example/2", "bist 100 endeksi   yükseldi"),
+        web("https://c.example/3", "Dolar/TL geriledi."),
+    ], token_budget=500)
+
+    assert packed["results_used"] == 2
+    assert "https://c.example/3" in packed["context"]
+    assert "b.example" not in packed["context"]
+
+
+def test_pack_web_respects_its_budget():
+    results = [web(f"https://site{i}.example", f"Piyasa haberi {i}. " * 60) for i in range(4)]
+
+    packed = ContextPacker().pack_web(results, token_budget=150)
+
+    assert packed["tokens"] <= 150
+    assert packed["results_used"] < 4
@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+import data_sync
+from data_loader import SiteContentLoader
+
+
+def test_sync_builds_with_the_api_embedding_backend(site_root, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("EMBEDDING_BACKEND", "ONNX")
+    monkeypatch.setenv("EMBEDDING_ONNX_PATH", "./data/onnx/minilm")
+    monkeypatch.setenv("EMBEDDING_ONNX_THREADS", "4")
+    monkeypatch.setattr(data_sync, "SiteContentLoader", lambda: SiteContentLoader(str(site_root)))
+    built = {}
+
+    class RecordingChatbot:
+        def __init__(self, **kwargs):
+            built.update(kwargs)
+            self.faiss_index_path = kwargs["faiss_index_path"]
+
+        def build_index(self, documents):
+            return SimpleNamespace(build_stats={})
+
+    monkeypatch.setattr(data_sync, "FinansRAGChatbot", RecordingChatbot)
+
+    assert data_sync.sync_content()
+    assert (built["embedding_backend"], built["onnx_model_path"], built["onnx_threads"]) == ("onnx", "./data/onnx/minilm", 4)
@@ -0,0 +1,45 @@
+from data_loader import SiteContentLoader
+from dedup import dedupe_chunks, dedupe_documents
+from glossary import TermGlossary
+
+
+def load_site(site_root):
+    return SiteContentLoader(str(site_root)).load_html_files(["index.html"])
+
+
+def test_typed_documents_survive_their_section_container(site_root):
+    documents = load_site(site_root)
+    kept, report = dedupe_documents(documents)
+
+    kept_types = [doc["metadata"]["type"] for doc in kept]
+    assert kept_types.count("financial_term") == 2
+    assert "education_content" in kept_types
+    assert "market_data" in kept_types
+    assert report["removed"]["contained"] > 0
+
+    glossary = TermGlossary.build((doc["content"], doc["metadata"]) for doc in kept)
+    assert len(glossary) == 2
+    entry, _, _ = glossary.lookup("F/K nedir?")
+    assert entry["term"] == "F/K Oranı"
+
+
+def test_chunk_duplicates_keep_the_typed_copy():
+    text = "Temettü, şirketin dağıtılabilir kârının bir kısmını ortaklarına nakit olarak ödemesidir."
+    chunks = [text, text]
+    metadata = [{"type": "section_content"}, {"type": "financial_term"}]
+
+    kept, kept_metadata, report = dedupe_chunks(chunks, metadata)
+
+    assert kept == [text]
+    assert kept_metadata == [{"type": "financial_term"}]
+    assert report["removed"]["exact"] == 1
+
+
+def test_deduplicated_build_keeps_glossary_and_type_filter(site_root, make_chatbot):
+    bot = make_chatbot(similarity_threshold=-1.0)
+    snapshot = bot.build_index(load_site(site_root))
+
+    assert snapshot.glossary.lookup("F/K nedir?") is not None
+    documents, _, metadata = bot.search("Temettü", top_k=5, filters={"type": "financial_term"})
+    assert len(documents) == 2
+    assert all(meta["type"] == "financial_term" for meta in metadata)
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from data_loader import SiteContentLoader
+from document_store import DocumentStore, migrate_json, write_document_store
+
+TEXTS = ["F/K oranı nedir", "", "Temettü verimi – yüzde"]
+METADATA = [{"type": "financial_term", "term": "F/K Oranı"}, {}, {"type": "financial_term", "chunk_id": 2}]
+
+
+def test_round_trip_reads_texts_and_metadata_by_position(tmp_path):
+    path = tmp_path / "documents.bin"
+    write_document_store(path, TEXTS, METADATA)
+
+    store = DocumentStore(path)
+
+    assert len(store) == 3
+    assert list(store.texts) == TEXTS
+    assert list(store.metadata) == METADATA
+    assert store.texts[-1] == TEXTS[-1]
+    assert store.metadata[1:] == METADATA[1:]
+    with pytest.raises(IndexError):
+        store.texts[3]
+
+
+def test_rejects_files_without_the_magic_header(tmp_path):
+    path = tmp_path / "documents.bin"
+    path.write_bytes(b"not a store at all")
+
+    with pytest.raises(ValueError):
+        DocumentStore(path)
+
+
+def test_migrate_converts_json_once(tmp_path):
+    (tmp_path / "documents.json").write_text(json.dumps(TEXTS), encoding="utf-8")
+    (tmp_path / "metadata.json").write_text(json.dumps(METADATA), encoding="utf-8")
+
+    assert migrate_json(tmp_path)
+    assert not migrate_json(tmp_path)
+    assert list(DocumentStore(tmp_path / "documents.bin").texts) == TEXTS
+
+
+def test_index_saved_as_json_loads_after_migration(site_root, make_chatbot, tmp_path):
+    documents = SiteContentLoader(str(site_root)).load_html_files(["index.html"])
+    built = make_chatbot().build_index(documents)
+
+    index_path = tmp_path / "index"
+    (index_path / "documents.json").write_text(json.dumps(list(built.documents)), encoding="utf-8")
+    (index_path / "metadata.json").write_text(json.dumps(list(built.metadata)), encoding="utf-8")
+    (index_path / "documents.bin").unlink()
+
+    bot = make_chatbot()
+    bot.ensure_index_loaded()
+
+    assert (index_path / "documents.bin").exists()
+    assert list(bot._snapshot.documents) == list(built.documents)
+    docs, _, _ = bot.search("F/K oranı", top_k=1)
+    assert docs[0] in built.documents
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from conftest import HashEmbeddingBackend
+from embedding_batcher import EmbeddingBatcher
+
+
+def test_concurrent_queries_share_one_encoder_call_and_get_their_own_rows():
+    backend = HashEmbeddingBackend()
+    calls = []
+    batcher = EmbeddingBatcher(lambda texts: calls.append(len(texts)) or backend.encode(texts), max_batch=8, max_wait_ms=200)
+
+    texts = [f"soru {i}" for i in range(8)]
+    futures = [batcher.submit(text) for text in texts]
+
+    for text, future in zip(texts, futures):
+        np.testing.assert_allclose(future.result(timeout=5), backend.encode([text])[0])
+    assert calls == [8]
+    assert batcher.stats()["largest_batch"] == 8
+
+
+def test_max_batch_splits_the_queue():
+    backend = HashEmbeddingBackend()
+    calls = []
+    batcher = EmbeddingBatcher(lambda texts: calls.append(len(texts)) or backend.encode(texts), max_batch=3, max_wait_ms=50)
+
+    futures = [batcher.submit(f"soru {i}") for i in range(7)]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert sum(calls) == 7 and max(calls) <= 3
+
+
+def test_encoder_errors_reach_every_caller_in_the_batch():
+    def encode(texts):
+        raise RuntimeError("model unloaded")
+
+    batcher = EmbeddingBatcher(encode, max_batch=4, max_wait_ms=20)
+    futures = [batcher.submit("a"), batcher.submit("b")]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model unloaded"):
+            future.result(timeout=5)
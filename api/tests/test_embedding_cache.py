@@ -0,0 +1,40 @@
+import numpy as np
+
+from embedding_cache import QueryEmbeddingCache
+
+
+def test_lookups_ignore_case_and_spacing_and_evict_least_recent():
+    cache = QueryEmbeddingCache("model", max_entries=2)
+    cache.put("Temettü nedir?", np.ones(4))
+    cache.put("F/K nedir?", np.zeros(4))
+
+    assert cache.get("  temettü   NEDIR? ") is not None
+    cache.put("Borsa nedir?", np.ones(4))
+
+    assert cache.get("F/K nedir?") is None
+    assert cache.get("Temettü nedir?") is not None
+
+
+def test_persisted_cache_reloads_for_the_same_model_only(tmp_path):
+    path = tmp_path / "query_cache.npz"
+    cache = QueryEmbeddingCache("model-a", persist_path=str(path))
+    cache.put("Temettü nedir?", np.arange(4, dtype="float32"))
+    cache.save()
+
+    reloaded = QueryEmbeddingCache("model-a", persist_path=str(path))
+    np.testing.assert_array_equal(reloaded.get("Temettü nedir?"), np.arange(4, dtype="float32"))
+    assert QueryEmbeddingCache("model-b", persist_path=str(path)).get("Temettü nedir?") is None
+
+
+def test_repeated_queries_skip_the_encoder(make_chatbot):
+    bot = make_chatbot(embedding_batch_size=1)
+    calls = []
+    encode = bot._embedding_model.encode
+    bot._embedding_model.encode = lambda texts, **kwargs: calls.append(list(texts)) or encode(texts, **kwargs)
+
+    first = bot.embed_query("Temettü nedir?")
+    again = bot.embed_query("temettü  nedir?")
+    bot.embed_queries(["Temettü nedir?", "F/K nedir?"])
+
+    np.testing.assert_array_equal(first, again)
+    assert calls == [["Temettü nedir?"], ["F/K nedir?"]]
@@ -0,0 +1,65 @@
+import pytest
+
+from data_loader import SiteContentLoader
+from glossary import TermGlossary, asked_term, fold
+
+TERMS = [
+    ("Fiyat/Kazanç oranı ...", {"type": "financial_term", "term": "F/K Oranı", "chunk_id": 0}),
+    ("Temettü, kârın ortaklara dağıtılmasıdır.", {"type": "financial_term", "term": "Temettü"}),
+    ("Halka arz, hisselerin ilk kez satışıdır.", {"type": "financial_term", "term": "Halka Arz (IPO)"}),
+    ("Hafta 1 dersi", {"type": "education_content", "term": "Ders"}),
+]
+
+
+@pytest.fixture
+def glossary():
+    return TermGlossary.build(TERMS)
+
+
+def test_fold_handles_turkish_case_and_abbreviations():
+    assert fold("F/K'nın ORANI") == "fk orani"
+    assert fold("İŞLEM Iğdır") == "islem igdir"
+
+
+def test_only_definition_questions_are_looked_up(glossary):
+    assert asked_term("F/K oranı nedir?") == "fk orani"
+    assert asked_term("F/K oranı yüksek hisseler hangileri?") is None
+    assert glossary.lookup("Temettü ne zaman ödenir?") is None
+
+
+@pytest.mark.parametrize("question, term, match", [
+    ("F/K nedir?", "F/K Oranı", "exact"),
+    ("IPO nedir?", "Halka Arz (IPO)", "exact"),
+    ("Temettünün anlamı nedir?", "Temettü", "stem"),
+    ("what is temettu", "Temettü", "exact"),
+    ("Temetü nedir?", "Temettü", "fuzzy"),
+])
+def test_lookup_matches_term_cards(glossary, question, term, match):
+    entry, match_type, score = glossary.lookup(question)
+
+    assert entry["term"] == term
+    assert match_type == match
+    assert 0.85 <= score <= 1.0
+    assert "chunk_id" not in entry["metadata"]
+
+
+def test_build_skips_non_term_documents_and_save_load_round_trips(glossary, tmp_path):
+    assert [entry["term"] for entry in glossary.entries] == ["F/K Oranı", "Temettü", "Halka Arz (IPO)"]
+
+    glossary.save(tmp_path / "glossary.json")
+    loaded = TermGlossary.load(tmp_path / "glossary.json")
+
+    assert loaded.lookup("F/K nedir?")[0] == glossary.lookup("F/K nedir?")[0]
+
+
+def test_definition_question_is_answered_without_retrieval(site_root, make_chatbot):
+    bot = make_chatbot()
+    bot.build_index(SiteContentLoader(str(site_root)).load_html_files(["index.html"]))
+    bot.search = None
+
+    result = bot.chat("F/K nedir?")
+
+    assert result["source_type"] == "glossary"
+    assert result["glossary_match"] == "exact"
+    assert "hisse başına net kâr" in result["answer"]
+    assert bot.glossary_stats.stats()["hits"] == 1
@@ -0,0 +1,21 @@
+from data_loader import SiteContentLoader
+from incremental_index import chunk_key
+
+
+def test_chunk_key_ignores_extraction_time():
+    meta = {"source": "index.html", "type": "financial_term", "extracted_at": "2024-01-01T10:00:00"}
+    reloaded = {**meta, "extracted_at": "2024-01-02T10:00:00"}
+
+    assert chunk_key("metin", meta) == chunk_key("metin", reloaded)
+    assert chunk_key("metin", meta) != chunk_key("metin", {**meta, "type": "section_content"})
+
+
+def test_reloading_unchanged_site_is_a_no_op(site_root, make_chatbot):
+    loader = SiteContentLoader(str(site_root))
+    bot = make_chatbot()
+
+    first = bot.build_index(loader.load_html_files(["index.html"]))
+    second = bot.build_index(loader.load_html_files(["index.html"]))
+
+    assert second is first
+    assert second.generation == first.generation
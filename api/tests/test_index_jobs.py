@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from data_loader import SiteContentLoader
+from index_jobs import IndexJobConflictError, IndexJobManager
+
+
+def wait_for(job, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if not job.is_active:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job still {job.status}")
+
+
+def test_one_rebuild_at_a_time_with_progress_and_result():
+    manager = IndexJobManager()
+    gate = threading.Event()
+
+    def rebuild(progress):
+        progress("embedding", 0.5)
+        gate.wait()
+        return {"chunks": 3}
+
+    job = manager.submit(rebuild, {"pages": ["index.html"]})
+    with pytest.raises(IndexJobConflictError) as conflict:
+        manager.submit(rebuild)
+    assert conflict.value.job is job
+
+    gate.set()
+    assert wait_for(job).to_dict()["status"] == "succeeded"
+    assert (job.progress, job.result) == (1.0, {"chunks": 3})
+    assert manager.submit(lambda progress: {}) is not None
+
+
+def test_failed_rebuild_records_its_error():
+    manager = IndexJobManager()
+
+    def rebuild(progress):
+        raise RuntimeError("site unreachable")
+
+    job = wait_for(manager.submit(rebuild))
+    assert (job.status, job.error) == ("failed", "site unreachable")
+
+
+def test_rebuild_swaps_in_while_a_search_holds_the_old_snapshot(site_root, make_chatbot):
+    documents = SiteContentLoader(str(site_root)).load_html_files(["index.html"])
+    bot = make_chatbot()
+    bot.build_index(documents[:-1])
+
+    with bot._use_snapshot() as pinned:
+        bot.build_index(documents)
+        assert bot.snapshot_stats()["retired_snapshots"] == 1
+        assert bot._snapshot is not pinned and pinned.generation == 1
+        assert pinned.documents[0]
+
+    stats = bot.snapshot_stats()
+    assert (stats["generation"], stats["retired_snapshots"]) == (2, 0)
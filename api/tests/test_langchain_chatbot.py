@@ -0,0 +1,66 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from data_loader import SiteContentLoader
+from langchain_chatbot import EnhancedFinansChatbot
+
+QUESTION = "Portföy nasıl çeşitlendirilir?"
+WEB_RESULTS = [{"title": "Çeşitlendirme", "url": "https://example.com", "snippet": "Farklı varlık sınıflarına yayılın.", "is_trusted": False}]
+
+
+@pytest.fixture
+def make_enhanced(site_root, make_chatbot, monkeypatch):
+    """Indexed hybrid chatbot whose web search, embedding and retrieval calls are recorded in order"""
+    def make(**kwargs):
+        bot = make_chatbot(chatbot_class=EnhancedFinansChatbot, answer_cache_enabled=False, **kwargs)
+        bot.build_index(SiteContentLoader(str(site_root)).load_html_files(["index.html"]))
+        bot.events = []
+
+        def web_search(query, max_results=5):
+            bot.events.append(("search", threading.current_thread().name))
+            return WEB_RESULTS
+
+        submit, embed_query, retrieve = bot._web_search_pool.submit, bot.embed_query, bot.retrieve
+        monkeypatch.setattr(bot, "web_search", web_search)
+        monkeypatch.setattr(bot._web_search_pool, "submit", lambda fn, *args: bot.events.append("submit") or submit(fn, *args))
+        monkeypatch.setattr(bot, "embed_query", lambda *args: bot.events.append("embed") or embed_query(*args))
+        monkeypatch.setattr(bot, "retrieve", lambda *args: bot.events.append("retrieve") or retrieve(*args))
+        return bot
+
+    return make
+
+
+def test_default_path_searches_the_web_alongside_retrieval(make_enhanced):
+    bot = make_enhanced(web_search_threshold=2.0)
+
+    plan = bot._plan_answer(QUESTION, False, None, datetime.now())
+
+    assert [event for event in bot.events if isinstance(event, str)] == ["submit", "embed", "retrieve"]
+    assert [event for event in bot.events if isinstance(event, tuple)][0][1].startswith("web-search")
+    assert plan["need_web_search"] and plan["web_results"] == WEB_RESULTS
+
+
+def test_speculative_results_are_ignored_when_site_content_is_enough(make_enhanced):
+    bot = make_enhanced(web_search_threshold=-1.0)
+
+    plan = bot._plan_answer(QUESTION, False, None, datetime.now())
+
+    assert bot.events[0] == "submit"
+    assert not plan["need_web_search"] and plan["web_results"] == []
+
+
+def test_without_speculation_the_web_is_searched_only_after_a_low_score(make_enhanced):
+    bot = make_enhanced(web_search_speculative=False, web_search_threshold=2.0)
+
+    bot._plan_answer(QUESTION, False, None, datetime.now())
+
+    assert [event if isinstance(event, str) else event[0] for event in bot.events] == ["embed", "retrieve", "search"]
+    assert not bot.events[2][1].startswith("web-search")
+
+
+def test_cache_refreshes_do_not_share_the_request_pool(make_chatbot):
+    bot = make_chatbot(chatbot_class=EnhancedFinansChatbot)
+
+    assert bot.web_search_cache.refresh_executor is not bot._web_search_pool
@@ -0,0 +1,40 @@
+import asyncio
+
+from llm_client import MIN_HEDGE_SAMPLES, AsyncLLMClient, LatencyTracker
+
+
+def test_censored_samples_keep_the_percentile_from_collapsing():
+    # 80 fast answers; the 20 slow calls were all cut short by a hedge at 0.5s
+    tracker = LatencyTracker()
+    for _ in range(80):
+        tracker.record(0.1)
+    for _ in range(20):
+        tracker.record(0.5, censored=True)
+
+    # Only successes would put p95 at 0.1s; the slow calls are known to exceed 0.5s
+    assert tracker.percentile(95) == 0.5
+
+
+def test_percentile_matches_plain_quantile_without_censoring():
+    tracker = LatencyTracker()
+    for i in range(1, 101):
+        tracker.record(i / 100)
+
+    assert tracker.percentile(50) == 0.5
+    assert tracker.percentile(95) == 0.95
+
+
+def test_hedge_records_the_cancelled_loser():
+    client = AsyncLLMClient(api_key="test", model="test", hedge=True, hedge_min_delay=0.01)
+    for _ in range(MIN_HEDGE_SAMPLES):
+        client.latency.record(0.01)
+    delays = iter([1.0, 0.0])
+
+    async def attempt():
+        await asyncio.sleep(next(delays))
+        return "ok"
+
+    assert asyncio.run(client._hedged(attempt, client.latency)) == "ok"
+
+    samples = list(client.latency._samples)[MIN_HEDGE_SAMPLES:]
+    assert sorted(censored for _, censored in samples) == [False, True]
@@ -0,0 +1,46 @@
+import pytest
+
+from data_loader import SiteContentLoader
+from metadata_filters import infer_filters
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("Hafta 3'te neler anlatıldı?", {"week": "3"}),
+    ("3. hafta konuları", {"week": "3"}),
+    ("Gün 2 özeti", {"day": "2"}),
+    ("2. günde hangi grafikler işlendi?", {"day": "2"}),
+    ("Hafta 1, 2. gün ödevi", {"week": "1", "day": "2"}),
+])
+def test_lesson_references_become_filters(question, expected):
+    assert infer_filters(question) == expected
+
+
+@pytest.mark.parametrize("question", [
+    "30 gün vadeli mevduat faizi nasıl hesaplanır",
+    "son 5 günde hisse neden düştü",
+    "3 haftalık hareketli ortalama nedir",
+    "Bir haftada 2 kez işlem yapılır mı?",
+    "günde 3 saat ekran başında",
+])
+def test_durations_are_not_lesson_references(question):
+    assert infer_filters(question) == {}
+
+
+def test_scoped_search_without_context_falls_back_to_the_whole_index(site_root, make_chatbot):
+    bot = make_chatbot(auto_filters=True, similarity_threshold=1.01)
+    bot.build_index(SiteContentLoader(str(site_root)).load_html_files(["index.html"]))
+    scopes = []
+    search = bot.search
+
+    def recording_search(question, **kwargs):
+        scopes.append(kwargs.get("filters"))
+        return search(question, **kwargs)
+
+    bot.search = recording_search
+    bot.retrieve("Hafta 1'de borsa nasıl anlatıldı?")
+
+    assert scopes == [{"week": "1"}, None]
+
+
+def test_auto_filters_are_opt_in(make_chatbot):
+    assert make_chatbot().auto_filters is False
@@ -0,0 +1,44 @@
+import pytest
+
+from metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    registry = MetricsRegistry()
+    latency = registry.histogram("stage_seconds", "Stage latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, stage="llm")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP stage_seconds Stage latency", "# TYPE stage_seconds histogram"]
+    assert lines[2:] == [
+        'stage_seconds_bucket{stage="llm",le="0.1"} 1',
+        'stage_seconds_bucket{stage="llm",le="1.0"} 2',
+        'stage_seconds_bucket{stage="llm",le="+Inf"} 3',
+        'stage_seconds_sum{stage="llm"} 5.55',
+        'stage_seconds_count{stage="llm"} 3',
+    ]
+
+
+def test_counters_and_gauge_callbacks_render_per_label_set():
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors", ["component"])
+    backlog = registry.gauge("backlog_rows", "Backlog")
+    errors.inc(component="llm")
+    errors.inc(2, component='web "search"')
+    backlog.set_function(lambda: 7)
+
+    rendered = registry.render()
+    assert 'errors_total{component="llm"} 1' in rendered
+    assert 'errors_total{component="web \\"search\\""} 2' in rendered
+    assert "backlog_rows 7" in rendered
+
+
+def test_labels_and_names_are_checked():
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors", ["component"])
+
+    with pytest.raises(ValueError):
+        errors.inc(stage="llm")
+    with pytest.raises(ValueError):
+        registry.counter("errors_total", "Errors again")
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+
+from ann_index import IndexConfig
+from data_loader import SiteContentLoader
+
+
+@pytest.mark.parametrize("index_type,quantization", [("flat", "none"), ("hnsw", "int8"), ("ivf", "none")])
+def test_mmap_index_searches_and_extends(site_root, make_chatbot, index_type, quantization):
+    config = IndexConfig(index_type=index_type, quantization=quantization, nlist=1, recall_report=False)
+    documents = SiteContentLoader(str(site_root)).load_html_files(["index.html"])
+    make_chatbot(index_config=config).build_index(documents[:-1])
+
+    bot = make_chatbot(index_config=config, index_mmap=True)
+    bot.ensure_index_loaded()
+    query = bot.documents[0]
+    assert bot.search(query, top_k=1)[0][0] == query
+
+    # Incremental builds extend a writable copy, not the mapped index
+    before = len(bot.documents)
+    snapshot = bot.build_index(documents)
+    assert snapshot.build_stats["mode"] == "incremental"
+    added = bot.documents[len(bot.documents) - 1]
+    assert len(bot.documents) > before
+    assert bot.search(added, top_k=1)[0][0] == added
+
+    # ...and the extended index is served mapped from the file it was saved to
+    if Path("/proc/self/maps").exists():
+        index_file = str(bot.faiss_index_path / "index.faiss")
+        mapped = [line.split(None, 5)[-1].strip() for line in open("/proc/self/maps") if index_file in line]
+        assert index_file in mapped
+
+
+class UnreadableMetadata:
+    """Stands in for the lazy metadata store; any access fails the test"""
+
+    def __getitem__(self, position):
+        raise AssertionError("metadata decoded")
+
+    def __iter__(self):
+        raise AssertionError("metadata decoded")
+
+    def __len__(self):
+        raise AssertionError("metadata decoded")
+
+
+def test_index_stats_use_partition_counts_saved_at_build(site_root, make_chatbot):
+    documents = SiteContentLoader(str(site_root)).load_html_files(["index.html"])
+    built = make_chatbot().build_index(documents)
+    expected = built.partition_summary()
+    assert expected["type"]["financial_term"] == 2
+
+    bot = make_chatbot()
+    bot.ensure_index_loaded()
+    bot._snapshot.metadata = UnreadableMetadata()
+
+    assert bot.snapshot_stats()["partitions"] == expected
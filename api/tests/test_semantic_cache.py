@@ -0,0 +1,42 @@
+import time
+
+import numpy as np
+
+from semantic_cache import SemanticAnswerCache
+
+RESULT = {"answer": "Temettü, kârın ortaklara dağıtılmasıdır.", "source_type": "site_content"}
+
+
+def unit(*values):
+    vector = np.array(values, dtype="float32")
+    return vector / np.linalg.norm(vector)
+
+
+def test_near_identical_questions_hit_and_others_miss():
+    cache = SemanticAnswerCache(embedding_dim=3, similarity_threshold=0.95)
+    cache.store("Temettü nedir?", unit(1, 0, 0), RESULT)
+
+    hit = cache.lookup(unit(1, 0.1, 0))
+    assert hit["answer"] == RESULT["answer"] and hit["cached_question"] == "Temettü nedir?"
+    assert cache.lookup(unit(1, 1, 0)) is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_expired_and_evicted_answers_are_not_served():
+    cache = SemanticAnswerCache(embedding_dim=3, max_entries=1, ttl_seconds=0.05)
+    cache.store("a", unit(1, 0, 0), RESULT)
+    cache.store("b", unit(0, 1, 0), RESULT)
+    assert cache.lookup(unit(1, 0, 0)) is None
+
+    time.sleep(0.1)
+    assert cache.lookup(unit(0, 1, 0)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_answers_built_before_a_clear_are_dropped():
+    cache = SemanticAnswerCache(embedding_dim=3)
+    generation = cache.generation
+    cache.clear()
+    cache.store("Temettü nedir?", unit(1, 0, 0), RESULT, generation=generation)
+
+    assert cache.lookup(unit(1, 0, 0)) is None
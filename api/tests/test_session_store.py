@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from session_store import MemorySessionBackend, SQLiteSessionBackend, SessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_backend(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "sqlite":
+            return SQLiteSessionBackend(str(tmp_path / "sessions.db"), **kwargs)
+        return MemorySessionBackend(**kwargs)
+    return make
+
+
+def test_history_is_capped_to_the_newest_turns(make_backend):
+    store = SessionStore(make_backend(), max_turns=2, max_tokens=1000, max_message_chars=10)
+    for turn in range(4):
+        store.append_turn("s", f"soru {turn} " + "x" * 50, f"cevap {turn}")
+
+    history = store.get_history("s")
+    assert [msg["content"] for msg in history] == ["soru 2 xxx", "cevap 2", "soru 3 xxx", "cevap 3"]
+
+
+def test_token_cap_drops_whole_exchanges(make_backend):
+    store = SessionStore(make_backend(), max_turns=5, max_tokens=30)
+    store.append_turn("s", "a" * 80, "b" * 20)
+    store.append_turn("s", "c" * 40, "d" * 20)
+
+    assert [msg["content"][0] for msg in store.get_history("s")] == ["c", "d"]
+
+
+def test_least_recently_used_sessions_are_evicted(make_backend):
+    backend = make_backend(max_sessions=2)
+    store = SessionStore(backend)
+    store.append_turn("old", "soru", "cevap")
+    store.append_turn("kept", "soru", "cevap")
+    store.get_history("old")
+    store.append_turn("new", "soru", "cevap")
+
+    assert store.get_history("kept") == []
+    assert store.get_history("old") and store.get_history("new")
+
+
+def test_expired_sessions_are_forgotten(make_backend):
+    store = SessionStore(make_backend(ttl_seconds=0.05))
+    store.append_turn("s", "soru", "cevap")
+    time.sleep(0.1)
+
+    assert store.get_history("s") == []
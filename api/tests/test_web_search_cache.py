@@ -0,0 +1,41 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from web_search_cache import WebSearchCache, is_time_sensitive
+
+
+@pytest.mark.parametrize("query", ["Dolar kuru son durum", "Altının gram fiyatı", "borsada bugün", "Bitcoin'in değeri"])
+def test_inflected_freshness_terms_are_time_sensitive(query):
+    assert is_time_sensitive(query)
+
+
+@pytest.mark.parametrize("query", ["Kurum nedir?", "Kurs ücreti ne kadar?", "Yönetim kurulu kararı", "Portföy nedir?"])
+def test_words_sharing_a_prefix_are_not_time_sensitive(query):
+    assert not is_time_sensitive(query)
+
+
+def test_failed_refresh_backs_off_and_keeps_serving_stale_results():
+    pool = ThreadPoolExecutor(max_workers=1)
+    cache = WebSearchCache(ttl_seconds=0, stale_seconds=0.05, refresh_backoff_seconds=60, refresh_executor=pool)
+    calls = []
+
+    def search():
+        calls.append(time.monotonic())
+        if len(calls) > 1:
+            raise ConnectionError("rate limited")
+        return [{"title": "ok"}]
+
+    assert cache.get("Portföy nedir?", 5, search) == [{"title": "ok"}]
+    time.sleep(0.01)
+    assert cache.get("Portföy nedir?", 5, search) == [{"title": "ok"}]
+    pool.shutdown(wait=True)
+    assert len(calls) == 2
+
+    # Past the stale window, but within the backoff: served without searching again
+    time.sleep(0.1)
+    for _ in range(5):
+        assert cache.get("Portföy nedir?", 5, search) == [{"title": "ok"}]
+    assert len(calls) == 2
+    assert cache.stats()["refresh_failures"] == 1
@@ -0,0 +1,223 @@
+"""
+Finans Akademi - Web Search Cache
+TTL cache of DuckDuckGo results keyed on the normalized query, with
+stale-while-revalidate refreshes
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from embedding_cache import normalize_query
+from metrics import CACHE_LOOKUPS
+
+# Queries about prices, rates and news get the short TTL
+FRESHNESS_TERMS = (
+    "son durum", "son dakika", "bugün", "şu an", "şimdi", "anlık", "canlı", "güncel", "haber",
+    "kur", "fiyat", "dolar", "euro", "avro", "sterlin", "altın", "gram", "borsa", "bist",
+    "endeks", "faiz", "enflasyon", "bitcoin", "kripto",
+)
+# Turkish inflections a term may carry: plural, possessive, case and "-ki"
+# endings ("kuru", "fiyatları", "altının", "borsada", "bugünkü"), optionally
+# after an apostrophe. Anything else ends the match, so "kurum", "kurs" and
+# "kurul" do not count as "kur".
+_TURKISH_SUFFIX = (
+    r"(?:['’]?"
+    r"(?:l[ae]r)?"
+    r"(?:[ıiuü]|s[ıiuü]|[ıiuü]n|n[ıiuü]n|s[ıiuü]n[ıiuü]n|y?[ae]|n?[dt][ae]n?|y?l[ae]|k[iü])?"
+    r")"
+)
+_FRESHNESS_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(term) for term in FRESHNESS_TERMS) + ")" + _TURKISH_SUFFIX + r"\b"
+)
+
+WebResults = List[Dict[str, Any]]
+
+
+def is_time_sensitive(query: str) -> bool:
+    """Whether the answer to query changes within minutes (prices, rates, news)"""
+    return _FRESHNESS_PATTERN.search(normalize_query(query)) is not None
+
+
+class WebSearchCache:
+    """
+    Thread-safe LRU + TTL cache of web search results
+
+    Results expire after ttl_seconds, or fresh_ttl_seconds for
+    time-sensitive queries. Within stale_seconds after expiry an entry is
+    still served and refreshed once in the background on refresh_executor
+    (stale-while-revalidate); after that a lookup waits for a new search.
+    A refresh that fails or comes back empty keeps the old results
+    servable and is not retried for refresh_backoff_seconds. Concurrent
+    misses for the same query share one search. Empty results (failed
+    searches) are not cached.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 600,
+        fresh_ttl_seconds: float = 60,
+        stale_seconds: float = 300,
+        max_entries: int = 500,
+        refresh_backoff_seconds: float = 30,
+        refresh_executor: Optional[Executor] = None
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.fresh_ttl_seconds = fresh_ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.refresh_backoff_seconds = refresh_backoff_seconds
+        self.refresh_executor = refresh_executor
+
+        self._lock = threading.Lock()
+        # key -> (fetched_at, ttl, results, retry_at); retry_at is set by a failed refresh
+        self._entries: "OrderedDict[Tuple[str, int], tuple]" = OrderedDict()
+        # key -> search in flight (misses and refreshes)
+        self._pending: Dict[Tuple[str, int], Future] = {}
+
+        self._hits = 0
+        self._stale_hits = 0
+        self._coalesced = 0
+        self._misses = 0
+        self._evictions = 0
+        self._searches = 0
+        self._search_seconds = 0.0
+        self._refreshes = 0
+        self._refresh_failures = 0
+
+    def get(self, query: str, max_results: int, search: Callable[[], WebResults]) -> WebResults:
+        """
+        Cached results for query, calling search() on a miss
+
+        search() runs on the calling thread for a miss and on
+        refresh_executor for a stale entry; its exceptions propagate to
+        the callers waiting on it.
+        """
+        key = (normalize_query(query), max_results)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                fetched_at, ttl, results, retry_at = entry
+                age = now - fetched_at
+                if age <= ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    CACHE_LOOKUPS.inc(cache="web_search", result="hit")
+                    return results
+                if (age <= ttl + self.stale_seconds or now < retry_at) and self.refresh_executor is not None:
+                    self._entries.move_to_end(key)
+                    self._stale_hits += 1
+                    CACHE_LOOKUPS.inc(cache="web_search", result="stale")
+                    if key not in self._pending and now >= retry_at:
+                        self._start_refresh(key, query, search)
+                    return results
+
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = Future()
+                owner = True
+                self._misses += 1
+                CACHE_LOOKUPS.inc(cache="web_search", result="miss")
+            else:
+                owner = False
+                self._coalesced += 1
+                CACHE_LOOKUPS.inc(cache="web_search", result="coalesced")
+
+        if not owner:
+            return pending.result()
+
+        try:
+            results = self._search(key, query, search)
+        except BaseException as e:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.set_exception(e)
+            raise
+        pending.set_result(results)
+        return results
+
+    def _start_refresh(self, key: Tuple[str, int], query: str, search: Callable[[], WebResults]):
+        """Search again for a stale entry in the background (called with the lock held)"""
+        pending = self._pending[key] = Future()
+        self._refreshes += 1
+
+        def refresh():
+            try:
+                results = self._search(key, query, search)
+                if not results:
+                    with self._lock:
+                        self._back_off(key)
+                pending.set_result(results)
+            except Exception as e:
+                with self._lock:
+                    self._pending.pop(key, None)
+                    self._back_off(key)
+                pending.set_exception(e)
+                logger.warning(f"Web search refresh failed for '{query}': {e}")
+
+        try:
+            self.refresh_executor.submit(refresh)
+        except RuntimeError:
+            # Executor shut down: the entry stays stale until it expires
+            self._pending.pop(key, None)
+
+    def _back_off(self, key: Tuple[str, int]):
+        """
+        Record a failed refresh (called with the lock held): the stale
+        entry stays servable, without new refreshes, for the backoff
+        """
+        self._refresh_failures += 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            fetched_at, ttl, results, _ = entry
+            self._entries[key] = (fetched_at, ttl, results, time.monotonic() + self.refresh_backoff_seconds)
+
+    def _search(self, key: Tuple[str, int], query: str, search: Callable[[], WebResults]) -> WebResults:
+        """Run search() and store its results (non-empty ones) under key"""
+        start = time.perf_counter()
+        results = search()
+        elapsed = time.perf_counter() - start
+        ttl = self.fresh_ttl_seconds if is_time_sensitive(query) else self.ttl_seconds
+
+        with self._lock:
+            self._searches += 1
+            self._search_seconds += elapsed
+            self._pending.pop(key, None)
+            if results:
+                self._entries[key] = (time.monotonic(), ttl, results, 0.0)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, current size and live search latency"""
+        with self._lock:
+            lookups = self._hits + self._stale_hits + self._coalesced + self._misses
+            served = self._hits + self._stale_hits + self._coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "fresh_ttl_seconds": self.fresh_ttl_seconds,
+                "stale_seconds": self.stale_seconds,
+                "refresh_backoff_seconds": self.refresh_backoff_seconds,
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "coalesced": self._coalesced,
+                "misses": self._misses,
+                "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "searches": self._searches,
+                "avg_search_ms": round(self._search_seconds / self._searches * 1000, 1) if self._searches else 0.0,
+                "refreshes": self._refreshes,
+                "refresh_failures": self._refresh_failures,
+            }
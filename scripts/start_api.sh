@@ -49,14 +49,19 @@ API_HOST="${API_HOST:-0.0.0.0}"
 API_PORT="${API_PORT:-8000}"
 API_WORKERS="${API_WORKERS:-4}"
 API_RELOAD="${API_RELOAD:-false}"
+API_PRELOAD="${API_PRELOAD:-false}"
 
 # Start server
 echo "📡 Starting server on http://${API_HOST}:${API_PORT}"
 echo "🔄 Workers: ${API_WORKERS}"
 echo "🔧 Reload: ${API_RELOAD}"
+echo "📦 Preload: ${API_PRELOAD}"
 echo ""
 
-if [ "$API_RELOAD" = "true" ]; then
+if [ "$API_PRELOAD" = "true" ]; then
+    # Production mode: load model + index once, fork workers sharing them
+    python3 api/serve.py
+elif [ "$API_RELOAD" = "true" ]; then
     # Development mode with auto-reload
     uvicorn api.api:app \
         --host "$API_HOST" \